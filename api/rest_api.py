@@ -9,31 +9,65 @@ VoiceForge REST API Server
 - /chat      - AI对话
 - /complete  - 完整流程 (ASR+LLM+TTS)
 - /voices    - 获取音色列表
+- /session   - 会话历史（session.enabled 时）
+- /metrics   - Prometheus 监控指标
+- /health/*  - 存活 / 就绪检查
+- /ws/voice  - 全双工语音 WebSocket（ASGI 模式且 streaming.enabled 时）
 
 启动方式：
     python api/rest_api.py
 
+    system.server 设为 asgi 时使用 uvicorn 运行（准入控制、过载快速拒绝）
+
 或使用脚本：
     ..\scripts\start_api.bat
 """
 
+import io
 import os
 import sys
 import json
+import time
+import shutil
 import tempfile
 import subprocess
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import quote
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 import yaml
 
 # 导入插件
 from plugins.asr.sensevoice import SenseVoiceASR
 from plugins.tts.cosyvoice import CosyVoiceTTS
+from plugins.llm.ollama import OllamaLLM
+from core.admission import AdmissionController, Overloaded
+from core.audio import (
+    audio_duration,
+    encode_wav,
+    float_to_pcm16,
+    pcm16_to_float,
+    resample,
+    wav_header,
+)
+from core.batcher import MicroBatcher
+from core.metrics import MetricsRegistry, process_memory
+from core.plugin_manager import PluginManager
+from core.pipeline import stream_reply
+from core.router import BackendBusy, RemoteBackend, build_router
+from core.session_manager import SessionManager
+from core.startup import StartupManager
+from core.tracing import Tracer, detach, mark, span
+from core.vad import VAD
+from core.voice_session import VoiceSession
+from core.workers import TTSWorkerPool
+from api.voice_ws import VoiceWebSocket
 
 # ==================== 加载配置 ====================
 
@@ -72,6 +106,21 @@ def resolve_paths(config, root_path):
             if path not in sys.path:
                 sys.path.insert(0, paths["libs"][key])
 
+    # 处理缓存目录
+    cache = config.get("advanced", {}).get("cache", {})
+    if cache.get("directory") and not os.path.isabs(cache["directory"]):
+        cache["directory"] = os.path.join(root_path, cache["directory"])
+
+    # 处理追踪输出路径
+    tracing = config.get("advanced", {}).get("tracing", {})
+    if tracing.get("path") and not os.path.isabs(tracing["path"]):
+        tracing["path"] = os.path.join(root_path, tracing["path"])
+
+    # 处理会话持久化路径
+    session = config.get("session", {})
+    if session.get("path") and not os.path.isabs(session["path"]):
+        session["path"] = os.path.join(root_path, session["path"])
+
     return config
 
 
@@ -80,6 +129,7 @@ config = load_config()
 system_config = config.get("system", {})
 models_config = config.get("models", {})
 paths_config = config.get("paths", {})
+advanced_config = config.get("advanced", {})
 
 # ==================== 初始化 Flask ====================
 
@@ -92,14 +142,49 @@ print(f"🚀 VoiceForge API Server")
 print(f"   版本: {system_config.get('version', '1.0.0-preview')}")
 print("=" * 60)
 
+# 启动编排：ASR / TTS / LLM 并行加载，加载完成后立即预热
+startup = StartupManager(advanced_config.get("startup", {}))
+warmup_config = startup.warmup_config
+
+# 插件生命周期：lazy 模式下首次使用时加载，空闲超时卸载，按内存预算 LRU 淘汰
+plugins_config = config.get("plugins", {})
+gpu_config = advanced_config.get("gpu", {})
+plugin_manager = PluginManager(
+    {
+        "lazy": plugins_config.get("lazy", False),
+        "idle_timeout": plugins_config.get("idle_timeout", 0),
+        "memory_fraction": gpu_config.get("memory_fraction", 0),
+        "memory_budget_mb": gpu_config.get("memory_budget_mb", 0),
+    }
+)
+plugin_manager.register("asr", "sensevoice", SenseVoiceASR)
+plugin_manager.register("tts", "cosyvoice", CosyVoiceTTS)
+
+
+def add_startup(name, load, warmup=None):
+    """注册启动组件（lazy 模式下的插件不在启动时加载）"""
+    if not plugin_manager.lazy:
+        startup.add(name, load, warmup)
+
 # 加载 ASR
 asr_model = None
 if models_config.get("asr", {}).get("enabled", True):
     print("\n🔄 加载 ASR 模型...")
     asr_config = models_config["asr"].copy()
     asr_config["model_path"] = paths_config.get("models", {}).get("asr")
-    asr_model = SenseVoiceASR(asr_config)
-    asr_model.load(asr_config)
+    asr_config["sample_rate"] = advanced_config.get("audio", {}).get(
+        "input_sample_rate", 16000
+    )
+    # 流式识别参数（transcribe_stream）与长音频识别参数（transcribe_long）
+    asr_config["streaming"] = config.get("streaming", {})
+    asr_config["long_audio"] = advanced_config.get("long_audio", {})
+    asr_config["vad"] = config.get("interruption", {}).get("vad") or {}
+    asr_model = plugin_manager.load("asr", "sensevoice", asr_config)
+    add_startup(
+        "asr",
+        asr_model.load,
+        lambda: asr_model.warmup(warmup_config.get("asr_seconds", 1.0)),
+    )
 else:
     print("\n⚠️ ASR 已禁用")
 
@@ -110,19 +195,440 @@ if models_config.get("tts", {}).get("enabled", True):
     tts_config = models_config["tts"].copy()
     tts_config["model_path"] = paths_config.get("models", {}).get("tts")
     tts_config["cosyvoice_lib"] = paths_config.get("libs", {}).get("cosyvoice")
-    tts_model = CosyVoiceTTS(tts_config)
-    tts_model.load(tts_config)
+    tts_config["cache"] = advanced_config.get("cache", {})
+    tts_workers_config = advanced_config.get("tts_workers", {})
+    tts_warmup = lambda: tts_model.warmup(
+        warmup_config.get("voices") or None, warmup_config.get("text", "你好。")
+    )
+    if tts_workers_config.get("enabled", False):
+        # 多副本工作池：并发请求分发到 K 个 CosyVoice 副本
+        tts_model = TTSWorkerPool(
+            "plugins.tts.cosyvoice:CosyVoiceTTS",
+            tts_config,
+            {
+                "timeout": advanced_config.get("concurrency", {}).get("timeout", 60),
+                **tts_workers_config,
+            },
+        )
+        startup.add("tts", tts_model.load, tts_warmup)
+    else:
+        tts_model = plugin_manager.load("tts", "cosyvoice", tts_config)
+        add_startup("tts", tts_model.load, tts_warmup)
 else:
     print("\n⚠️ TTS 已禁用")
 
-# LLM 配置
+# 加载 LLM
 llm_config = models_config.get("llm", {})
 ollama_config = llm_config.get("ollama", {})
+llm_model = None
+if llm_config.get("enabled", True):
+    print("\n🔄 连接 LLM 服务...")
+    llm_model = OllamaLLM(ollama_config)
+    # 启用预热时由预热阶段预加载模型，避免重复请求
+    llm_warmup = startup.warmup_enabled and warmup_config.get("llm", True)
+    startup.add(
+        "llm",
+        lambda: llm_model.load(
+            {**ollama_config, "preload": False} if llm_warmup else ollama_config
+        ),
+        llm_model.warmup if llm_warmup else None,
+    )
+else:
+    print("\n⚠️ LLM 已禁用")
+
+if startup.background:
+    # 后台加载：服务立即开始监听，就绪前 /health/ready 返回 503
+    startup.start()
+    print("\n🔄 模型在后台加载中，就绪状态见 /health/ready")
+else:
+    startup.run()
+
+# 路由：本机与其他 VoiceForge 节点之间分发 TTS 请求
+router = None
+router_config = advanced_config.get("router", {})
+if router_config.get("enabled", False):
+    router = build_router(router_config, {"tts": tts_model})
+    router.start()
+    print(f"\n✅ 路由已启用: {', '.join(router.backends)}")
+
+# 会话：服务端保存多轮对话历史（LRU/TTL 淘汰，可持久化）
+session_manager = None
+session_config = config.get("session", {})
+if session_config.get("enabled", False):
+    session_manager = SessionManager(session_config, llm=llm_model)
+    print(f"\n✅ 会话管理已启用（最大 {session_manager.max_history} 轮）")
+
+# 准入控制：各阶段并发上限 + 有界排队，过载时快速返回 429/503
+admission = AdmissionController(advanced_config.get("concurrency", {}))
 
 print("\n" + "=" * 60)
-print("✅ 模型加载完成")
+print("✅ 模型加载完成" if startup.is_done() else "✅ 服务初始化完成")
 print("=" * 60)
 
+# ==================== ASR 调用 ====================
+
+
+def transcribe_grouped(items):
+    """
+    批量识别，同一批次中按语言分组调用 transcribe_batch
+
+    Args:
+        items: [(audio, language), ...]
+
+    Returns:
+        list: 与输入等长的识别结果
+    """
+    results = [None] * len(items)
+    groups = {}
+    for index, (audio, language) in enumerate(items):
+        groups.setdefault(language, []).append(index)
+
+    for language, indices in groups.items():
+        batch_results = asr_model.transcribe_batch(
+            [items[i][0] for i in indices], language
+        )
+        for i, result in zip(indices, batch_results):
+            results[i] = result
+    return results
+
+
+def run_asr(audio, language="auto"):
+    """
+    执行语音识别（启用合批时经由合批队列）
+
+    Args:
+        audio: 音频输入
+        language: 语言代码
+
+    Returns:
+        dict: 识别结果
+    """
+    if not isinstance(audio, str):
+        audio_seconds.inc(len(audio) / asr_model.sample_rate, direction="in")
+        if asr_vad is not None:
+            # 识别前裁剪首尾静音：送入 ASR 的音频越短，计算量越小
+            trimmed, _ = asr_vad.trim(audio)
+            asr_trimmed_seconds.inc((len(audio) - len(trimmed)) / asr_model.sample_rate)
+            if len(trimmed) == 0:
+                return {"success": True, "text": "", "language": language}
+            audio = trimmed
+
+    return decode_asr(audio, language)
+
+
+def decode_asr(audio, language="auto"):
+    """单次识别（占用 ASR 名额，启用合批时经由合批队列），不做裁剪和输入统计"""
+    with observe_stage("asr"):
+        if asr_batcher is None:
+            return asr_model.transcribe(audio, language)
+        return asr_batcher.submit((audio, language)).result(timeout=admission.remaining())
+
+
+def decode_asr_batch(audio_list, language="auto"):
+    """
+    长音频识别的一批片段
+
+    每批占用一个 ASR 名额并单独计算截止时间（长音频总耗时可能超过请求超时）；
+    不经过合批队列，片段已按时长排序组批
+    """
+    token = admission.begin()
+    try:
+        with observe_stage("asr"):
+            return asr_model.transcribe_batch(audio_list, language)
+    finally:
+        admission.end(token)
+
+
+def decode_asr_step(audio, language="auto"):
+    """
+    流式识别的一次解码
+
+    流可能持续很久，每次解码单独计算截止时间；
+    失败（含过载）时返回错误结果，流式识别记录错误后继续
+    """
+    token = admission.begin()
+    try:
+        return decode_asr(audio, language)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    finally:
+        admission.end(token)
+
+
+long_audio_config = advanced_config.get("long_audio", {})
+
+# VAD：识别前裁剪首尾静音（interruption.vad.trim）
+vad_config = config.get("interruption", {}).get("vad") or {}
+asr_vad = None
+if asr_model and vad_config.get("enabled", True) and vad_config.get("trim", True):
+    asr_vad = VAD(asr_model.sample_rate, vad_config)
+
+# ASR 合批：并发的 /asr、/complete 请求合并为一次批量推理
+asr_batcher = None
+asr_batching_config = advanced_config.get("asr_batching", {})
+# 后台加载时 ASR 尚未就绪，先创建合批器（请求入口会检查 is_loaded）
+if (
+    asr_model
+    and (asr_model.is_loaded() or not startup.is_done())
+    and asr_batching_config.get("enabled", False)
+):
+    asr_batcher = MicroBatcher(
+        transcribe_grouped,
+        max_batch_size=asr_batching_config.get("max_batch_size", 8),
+        max_wait_ms=asr_batching_config.get("max_wait_ms", 10),
+        name="asr-batcher",
+    )
+    asr_batcher.start()
+    print(
+        f"\n✅ ASR 合批已启用 (batch={asr_batcher.max_batch_size}, "
+        f"wait={asr_batching_config.get('max_wait_ms', 10)}ms)"
+    )
+
+
+# ==================== 监控指标 ====================
+
+metrics = MetricsRegistry()
+http_requests = metrics.counter("voiceforge_http_requests_total", "HTTP 请求数")
+http_latency = metrics.histogram(
+    "voiceforge_http_request_duration_seconds", "HTTP 请求耗时（流式响应为首包前耗时）"
+)
+http_in_flight = metrics.gauge("voiceforge_http_requests_in_flight", "处理中的 HTTP 请求数")
+stage_latency = metrics.histogram("voiceforge_stage_duration_seconds", "ASR/LLM/TTS 阶段耗时")
+stage_errors = metrics.counter("voiceforge_stage_errors_total", "ASR/LLM/TTS 阶段失败次数")
+tts_rtf = metrics.histogram(
+    "voiceforge_tts_rtf",
+    "TTS 实时率（合成耗时 / 音频时长）",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5),
+)
+audio_seconds = metrics.counter(
+    "voiceforge_audio_seconds_total", "处理的音频时长（in: ASR 输入，out: TTS 输出）"
+)
+asr_trimmed_seconds = metrics.counter(
+    "voiceforge_asr_trimmed_seconds_total", "识别前 VAD 裁掉的静音时长"
+)
+admission_wait = metrics.histogram(
+    "voiceforge_admission_wait_seconds", "ASR/LLM/TTS 阶段排队等待耗时"
+)
+admission_rejected = metrics.counter(
+    "voiceforge_admission_rejected_total", "过载拒绝的请求数（429 队列已满 / 503 排队超时）"
+)
+
+
+@contextmanager
+def observe_stage(stage):
+    """
+    在阶段并发限制内执行，记录排队耗时、阶段耗时和失败次数（启用追踪时同时记录 span）
+
+    Raises:
+        Overloaded: 阶段队列已满或排队超时
+    """
+    queued = time.perf_counter()
+    with admission.stage(stage):
+        start = time.perf_counter()
+        admission_wait.observe(start - queued, stage=stage)
+        try:
+            with span(stage):
+                yield
+        except Exception:
+            stage_errors.inc(stage=stage)
+            raise
+        finally:
+            stage_latency.observe(time.perf_counter() - start, stage=stage)
+
+
+def admitted(stage, chunks):
+    """
+    流式响应在开始生成时占用阶段名额，直到流结束才释放
+
+    用于单次合成的流式输出（/tts?stream=1）；多句回复逐句占用名额见 admitted_step
+    """
+    with admission.stage(stage):
+        yield from chunks
+
+
+def admitted_step(stage, chunks):
+    """
+    流式回复中的一步（如一句合成）占用阶段名额，这一步结束即释放
+
+    每步单独计算截止时间：长回复的总耗时可能超过请求超时，后面的句子不应因此被拒绝
+    """
+    token = admission.begin()
+    try:
+        with admission.stage(stage):
+            yield from chunks
+    finally:
+        admission.end(token)
+
+
+def meter_tts(chunks):
+    """
+    包装 TTS 音频片段迭代器，合成结束后记录耗时、RTF 和输出时长
+
+    只统计生成片段本身的耗时，不包含调用方写出响应的时间
+    """
+    elapsed = 0.0
+    samples = 0
+    iterator = iter(chunks)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            samples += len(chunk)
+            yield chunk
+    except Exception:
+        stage_errors.inc(stage="tts")
+        raise
+    finally:
+        stage_latency.observe(elapsed, stage="tts")
+        record_tts_output(samples, elapsed)
+
+
+def record_tts_output(samples, elapsed, duration=None):
+    """记录 TTS 输出时长和实时率（已知时长时 samples 可为 None）"""
+    if duration is None:
+        duration = samples / tts_model.sample_rate
+    if duration > 0:
+        audio_seconds.inc(duration, direction="out")
+        tts_rtf.observe(elapsed / duration)
+
+
+def collect_runtime_metrics():
+    """抓取时采集：就绪状态、队列深度、缓存命中、进程内存"""
+    families = [
+        ("voiceforge_ready", "gauge", "模型是否已加载并预热完成",
+         [({}, 1 if startup.is_ready() else 0)])
+    ]
+    if asr_batcher is not None:
+        stats = asr_batcher.get_stats()
+        families.append(
+            ("voiceforge_asr_queue_depth", "gauge", "ASR 合批队列等待数",
+             [({}, stats["pending"])])
+        )
+        families.append(
+            ("voiceforge_asr_batches_total", "counter", "ASR 批次数",
+             [({}, stats["batches"])])
+        )
+        families.append(
+            ("voiceforge_asr_batch_items_total", "counter", "ASR 合批处理条数",
+             [({}, stats["items"])])
+        )
+
+    if tts_model is not None and tts_model.cache is not None:
+        stats = tts_model.cache.get_stats()
+        families.append(
+            ("voiceforge_tts_cache_lookups_total", "counter", "TTS 缓存查询次数",
+             [({"result": "memory_hit"}, stats["memory_hits"]),
+              ({"result": "disk_hit"}, stats["disk_hits"]),
+              ({"result": "miss"}, stats["misses"])])
+        )
+        families.append(
+            ("voiceforge_tts_cache_hit_rate", "gauge", "TTS 缓存命中率",
+             [({}, stats["hit_rate"])])
+        )
+
+    stages = admission.get_stats()["stages"]
+    families.append(
+        ("voiceforge_admission_active", "gauge", "各阶段执行中的请求数",
+         [({"stage": name}, stats["active"]) for name, stats in stages.items()])
+    )
+    families.append(
+        ("voiceforge_admission_queue_depth", "gauge", "各阶段排队等待的请求数",
+         [({"stage": name}, stats["waiting"]) for name, stats in stages.items()])
+    )
+
+    memory = process_memory()
+    if "rss_bytes" in memory:
+        families.append(
+            ("voiceforge_process_resident_memory_bytes", "gauge", "进程常驻内存",
+             [({}, memory["rss_bytes"])])
+        )
+    if "torch_allocated_bytes" in memory:
+        families.append(
+            ("voiceforge_torch_memory_bytes", "gauge", "torch CUDA 显存",
+             [({"kind": "allocated"}, memory["torch_allocated_bytes"]),
+              ({"kind": "reserved"}, memory["torch_reserved_bytes"])])
+        )
+    return families
+
+
+metrics.add_collector(collect_runtime_metrics)
+
+
+def route_label():
+    """指标中的路由标签（使用路由规则，避免路径参数导致标签爆炸）"""
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+# ==================== 请求追踪 ====================
+
+tracer = Tracer(advanced_config.get("tracing", {}))
+if tracer.enabled:
+    print(f"\n✅ 请求追踪已启用 (采样率={tracer.sample_rate}, 输出={tracer.path})")
+
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.metrics_route = route_label()
+    http_in_flight.inc(route=g.metrics_route)
+    # 截止时间从请求进入时开始计算，排队超时返回 503
+    g.admission_token = admission.begin()
+
+    # 请求头 X-Trace: 1 强制追踪；X-Trace-Id 沿用调用方的追踪 ID
+    trace = tracer.start(
+        g.metrics_route,
+        force=request.headers.get("X-Trace", "0") == "1",
+        trace_id=request.headers.get("X-Trace-Id"),
+        method=request.method,
+    )
+    if trace is not None:
+        g.trace = trace
+        g.trace_token = trace.attach()
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get("metrics_start")
+    if start is not None:
+        route = g.metrics_route
+        http_requests.inc(route=route, method=request.method, status=response.status_code)
+        http_latency.observe(time.perf_counter() - start, route=route)
+    if g.get("trace") is not None:
+        response.headers["X-Trace-Id"] = g.trace.trace_id
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # 流式响应在传输结束后才会触发 teardown
+    route = g.pop("metrics_route", None)
+    if route is not None:
+        http_in_flight.dec(route=route)
+    admission.end(g.pop("admission_token", None))
+
+    trace = g.pop("trace", None)
+    if trace is not None:
+        # 流式响应的追踪由响应生成器结束时导出
+        if not g.pop("trace_deferred", False):
+            trace.finish()
+        detach(g.pop("trace_token", None))
+
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(error):
+    """过载：返回 429（队列已满）/ 503（排队超时）和 Retry-After"""
+    admission_rejected.inc(stage=error.stage, status=error.status)
+    response = jsonify({"success": False, "stage": error.stage, "error": error.reason})
+    response.status_code = error.status
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
 # ==================== API 路由 ====================
 
 
@@ -134,16 +640,30 @@ def index():
             "success": True,
             "status": "running",
             "version": system_config.get("version", "1.0.0-preview"),
+            # 供其他节点的路由器探测负载（不含本次请求）
+            "load": {"in_flight": max(0, int(http_in_flight.total()) - 1)},
+            "startup": startup.get_status(),
+            "plugins": plugin_manager.get_stats(),
+            "admission": admission.get_stats(),
+            "router": router.get_stats() if router else None,
+            "sessions": session_manager.get_stats() if session_manager else None,
             "services": {
                 "asr": {
                     "enabled": models_config.get("asr", {}).get("enabled", False),
                     "loaded": asr_model.is_loaded() if asr_model else False,
                     "type": models_config.get("asr", {}).get("type", "none"),
+                    "batching": asr_batcher.get_stats() if asr_batcher else None,
                 },
                 "tts": {
                     "enabled": models_config.get("tts", {}).get("enabled", False),
                     "loaded": tts_model.is_loaded() if tts_model else False,
                     "type": models_config.get("tts", {}).get("type", "none"),
+                    "cache": tts_model.cache is not None if tts_model else False,
+                    "workers": (
+                        tts_model.get_stats()
+                        if isinstance(tts_model, TTSWorkerPool)
+                        else None
+                    ),
                 },
                 "llm": {
                     "enabled": llm_config.get("enabled", False),
@@ -154,15 +674,54 @@ def index():
             "endpoints": {
                 "GET /": "服务状态",
                 "GET /voices": "获取音色列表",
+                "GET /cache/stats": "TTS缓存统计",
+                "GET /metrics": "Prometheus 监控指标",
+                "GET /health/live": "存活检查",
+                "GET /health/ready": "就绪检查（模型加载并预热完成）",
                 "POST /asr": "语音识别 (form-data: audio)",
                 "POST /tts": "语音合成 (json: {text, voice})",
-                "POST /chat": "AI对话 (json: {message})",
-                "POST /complete": "完整流程 (form-data: audio)",
+                "POST /tts?stream=1": "流式语音合成 (format=wav|pcm)",
+                "POST /chat": "AI对话 (json: {message, session_id})",
+                "GET /session/<id>": "获取会话历史",
+                "DELETE /session/<id>": "删除会话",
+                "POST /complete": "完整流程 (form-data: audio, session_id)",
+                "POST /complete?stream=1": "流水线完整流程 (边生成边合成)",
+                **(
+                    {"WS /ws/voice": "全双工语音 (上传 PCM 帧，返回 PCM 音频)"}
+                    if voice_ws is not None
+                    else {}
+                ),
             },
         }
     )
 
 
+@app.route("/health/live", methods=["GET"])
+def health_live():
+    """存活检查：进程可响应即返回 200"""
+    return jsonify({"success": True, "status": "alive"})
+
+
+@app.route("/health/ready", methods=["GET"])
+def health_ready():
+    """就绪检查：所有模型加载并预热完成后返回 200，否则 503"""
+    status = startup.get_status()
+    if status["ready"]:
+        return jsonify({"success": True, "status": "ready", **status})
+
+    response = jsonify(
+        {
+            "success": False,
+            "status": "starting" if not status["done"] else "failed",
+            **status,
+        }
+    )
+    response.status_code = 503
+    if not status["done"]:
+        response.headers["Retry-After"] = "5"
+    return response
+
+
 @app.route("/voices", methods=["GET"])
 def get_voices():
     """获取音色列表"""
@@ -176,6 +735,22 @@ def get_voices():
         return jsonify({"success": False, "error": str(e), "voices": []}), 500
 
 
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """TTS 音频缓存统计（命中/未命中/淘汰计数）"""
+    if not tts_model or tts_model.cache is None:
+        return jsonify({"success": True, "enabled": False})
+    return jsonify(
+        {"success": True, "enabled": True, "stats": tts_model.cache.get_stats()}
+    )
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus 文本格式监控指标"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/asr", methods=["POST"])
 def asr():
     """
@@ -185,17 +760,40 @@ def asr():
         - audio: 音频文件
         - language: 语言代码 (optional, default: auto)
 
+    Query:
+        - stream: 1 启用流式识别 (optional, default: 0)
+        - long: 1 使用长音频识别 (optional, default: 0；超过 long_audio.auto_seconds 时自动使用)
+        - language: 流式识别的语言代码 (optional, default: auto)
+        - sample_rate: 流式上传 PCM 的采样率 (optional, default: ASR 采样率)
+
+    stream=1 时请求体可以是 16bit 单声道裸 PCM（可分块上传，边上传边识别），
+    也可以是 multipart 音频文件
+
+    长音频识别按静音切分后并行解码，结果额外包含 segments（每段的 start / end / text）；
+    同时指定 stream=1 时每识别完一段输出一行，最后一行为完整结果
+
     Response (json):
         {
             "success": bool,
             "text": str,
             "language": str
         }
+        stream=1 时为 NDJSON，每行一条结果（格式见 transcribe_stream），最后一行 final 为 true
     """
     # 检查模型
     if not asr_model or not asr_model.is_loaded():
         return jsonify({"success": False, "error": "ASR模型未加载"}), 503
 
+    stream = request.args.get("stream", "0").lower() in ("1", "true", "yes")
+    long_mode = request.args.get("long", "0").lower() in ("1", "true", "yes")
+    if stream and not long_mode:
+        try:
+            sample_rate = int(request.args.get("sample_rate", asr_model.sample_rate))
+        except ValueError:
+            return jsonify({"success": False, "error": "sample_rate 必须是整数"}), 400
+        admission.check("asr")
+        return stream_asr_response(request.args.get("language", "auto"), sample_rate)
+
     # 检查文件
     if "audio" not in request.files:
         return jsonify(
@@ -203,22 +801,36 @@ def asr():
         ), 400
 
     audio_file = request.files["audio"]
-    language = request.form.get("language", "auto")
+    language = request.form.get("language") or request.args.get("language", "auto")
 
-    # 保存临时文件
-    temp_path = os.path.join(tempfile.gettempdir(), audio_file.filename)
-    audio_file.save(temp_path)
+    # 长音频：按静音切分、并行解码（只读取文件头判断时长）
+    # 直接从上传文件流逐块解码（werkzeug 已将大文件缓存到临时文件），不整段读入内存；
+    # ASGI 模式下请求体同样边接收边解析（core/admission.asgi_app）
+    auto_seconds = long_audio_config.get("auto_seconds", 60)
+    if long_mode or auto_seconds:
+        try:
+            duration = audio_duration(audio_file.stream)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        if long_mode or duration > auto_seconds:
+            admission.check("asr")
+            audio_seconds.inc(duration, direction="in")
+            return long_asr_response(audio_file.stream, language, stream)
+
+    # 在内存中解码上传的音频（不写临时文件）
+    try:
+        audio = asr_model.prepare_audio(audio_file.read())
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
     try:
         # 执行识别
-        result = asr_model.transcribe(temp_path, language)
+        result = run_asr(audio, language)
         return jsonify(result)
+    except Overloaded:
+        raise
     except Exception as e:
         return jsonify({"success": False, "error": f"识别失败: {str(e)}"}), 500
-    finally:
-        # 清理临时文件
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
 
 @app.route("/tts", methods=["POST"])
@@ -232,8 +844,13 @@ def tts():
             "voice": "音色名称" (optional)
         }
 
+    Query:
+        - stream: 1 启用流式输出 (optional, default: 0)
+        - format: 流式输出格式 wav/pcm (optional, default: wav)
+
     Response:
         - audio/wav 文件
+        - stream=1 时分块返回音频（wav: 流式WAV头 + PCM；pcm: 16bit 单声道裸PCM）
     """
     # 检查模型
     if not tts_model or not tts_model.is_loaded():
@@ -250,21 +867,381 @@ def tts():
     if not text:
         return jsonify({"success": False, "error": "文本不能为空"}), 400
 
+    if request.args.get("stream", "0").lower() in ("1", "true", "yes"):
+        audio_format = request.args.get("format", "wav").lower()
+        if audio_format not in ("wav", "pcm"):
+            return jsonify(
+                {"success": False, "error": f"不支持的流式格式: {audio_format}"}
+            ), 400
+        admission.check("tts")
+        return stream_tts_response(text, voice, audio_format)
+
     try:
-        # 执行合成
-        audio_path = tts_model.synthesize(text, voice)
+        # 执行合成（内存中完成，不落盘）
+        wav_bytes = synthesize_wav(text, voice)
 
         # 返回音频文件
         return send_file(
-            audio_path,
+            io.BytesIO(wav_bytes),
             mimetype="audio/wav",
             as_attachment=True,
             download_name="tts_output.wav",
         )
+    except Overloaded:
+        raise
     except Exception as e:
         return jsonify({"success": False, "error": f"合成失败: {str(e)}"}), 500
 
 
+def synthesize_wav(text, voice):
+    """
+    内存合成 WAV 字节并记录 TTS 指标
+
+    Returns:
+        bytes: WAV 文件内容
+    """
+    # 启用路由时分发到负载最低的节点（其他节点转发来的请求直接本地处理）
+    if router is not None and not request.headers.get(RemoteBackend.FORWARDED_HEADER):
+        voice = voice or models_config.get("tts", {}).get("default_voice")
+        start = time.perf_counter()
+        try:
+            with observe_stage("tts"):
+                wav_bytes = router.call("tts", "synthesize_bytes", text, voice, key=voice)
+        except BackendBusy as e:
+            # 所有节点都在限流：向客户端透传 Retry-After
+            raise Overloaded("tts", "所有节点繁忙", 429, e.retry_after)
+        # 远程节点的采样率可能不同：按 WAV 文件头计算时长
+        record_tts_output(None, time.perf_counter() - start, audio_duration(wav_bytes))
+        return wav_bytes
+
+    start = time.perf_counter()
+    with observe_stage("tts"):
+        audio = tts_model.synthesize_array(text, voice)
+    record_tts_output(len(audio), time.perf_counter() - start)
+    return encode_wav(audio, tts_model.sample_rate)
+
+
+def stream_tts_response(text, voice, audio_format="wav"):
+    """
+    构造流式合成响应
+
+    每生成一个音频块立即写入 HTTP 响应，首包延迟为第一个块的生成时间
+
+    Args:
+        text: 要合成的文本
+        voice: 音色名称
+        audio_format: wav（带流式头）或 pcm（裸数据）
+
+    Returns:
+        Response: 分块传输的音频响应
+    """
+    return stream_audio_response(
+        admitted("tts", meter_tts(tts_model.synthesize_stream(text, voice))), audio_format
+    )
+
+
+def read_pcm_stream(stream, sample_rate, block_ms=100):
+    """
+    按块读取上传的 16bit PCM（分块上传时边收边产出）
+
+    Args:
+        stream: 请求体输入流
+        sample_rate: 上传音频的采样率（与 ASR 采样率不同时重采样）
+        block_ms: 每次读取的时长（毫秒）
+
+    Yields:
+        np.ndarray: float32 音频块，采样率为 asr_model.sample_rate
+    """
+    block = max(2, int(sample_rate * block_ms / 1000) * 2)
+    rest = b""
+    while True:
+        data = stream.read(block)
+        if not data:
+            break
+        data = rest + data
+        # 分块边界可能落在采样中间，多出的字节留到下一块
+        even = len(data) - len(data) % 2
+        data, rest = data[:even], data[even:]
+        if not data:
+            continue
+        audio = pcm16_to_float(data)
+        if sample_rate != asr_model.sample_rate:
+            audio = resample(audio, sample_rate, asr_model.sample_rate)
+        audio_seconds.inc(len(audio) / asr_model.sample_rate, direction="in")
+        yield audio
+
+
+def stream_asr_response(language="auto", sample_rate=None):
+    """
+    构造流式识别响应
+
+    每新增 streaming.chunk_size 毫秒音频输出一行部分结果，停顿处确认已识别的文本
+
+    Args:
+        language: 语言代码
+        sample_rate: 上传 PCM 的采样率
+
+    Returns:
+        Response: NDJSON 分块响应
+    """
+    if request.files.get("audio") is not None:
+        # 上传的是完整音频文件：解码后按步长切块，同样逐步输出结果
+        try:
+            audio = asr_model.prepare_audio(request.files["audio"].read())
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        audio_seconds.inc(len(audio) / asr_model.sample_rate, direction="in")
+        step = max(1, int(asr_model.sample_rate * 0.1))
+        chunks = (audio[i : i + step] for i in range(0, len(audio), step))
+    else:
+        chunks = read_pcm_stream(request.stream, sample_rate or asr_model.sample_rate)
+    return ndjson_response(
+        asr_model.transcribe_stream(
+            chunks, language, decode=lambda audio: decode_asr_step(audio, language)
+        )
+    )
+
+
+def long_asr_response(audio, language="auto", stream=False):
+    """
+    长音频识别响应
+
+    音频逐块解码、按静音切分，片段按时长排序组批后并行识别
+
+    Args:
+        audio: 上传文件流（或路径 / 字节）
+        language: 语言代码
+        stream: 是否每识别完一段输出一行（NDJSON）
+
+    Returns:
+        Response: 完整结果（json），或 NDJSON 分块响应
+    """
+    def transcribe(source):
+        return asr_model.transcribe_long(
+            source,
+            language,
+            decode_batch=lambda audio_list: decode_asr_batch(audio_list, language),
+        )
+
+    if stream:
+        # 视图返回时 Flask 会关闭上传文件，而流式响应在之后才读取：
+        # 先按块转存到独立的临时文件（不占内存），流结束时关闭
+        spool = tempfile.TemporaryFile()
+        shutil.copyfileobj(audio, spool)
+        spool.seek(0)
+
+        def results():
+            try:
+                yield from transcribe(spool)
+            finally:
+                spool.close()
+
+        return ndjson_response(results())
+
+    results = transcribe(audio)
+
+    try:
+        result = None
+        for result in results:
+            pass
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Overloaded:
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "error": f"识别失败: {str(e)}"}), 500
+
+
+def ndjson_response(results):
+    """
+    将识别结果迭代器包装为 NDJSON 分块响应（每条结果一行）
+
+    Args:
+        results: 结果字典迭代器，最后一条 final 为 True
+
+    Returns:
+        Response: 分块传输的 NDJSON 响应
+    """
+    trace = g.get("trace")
+    if trace is not None:
+        g.trace_deferred = True
+
+    def generate():
+        with trace.activate() if trace is not None else nullcontext():
+            try:
+                for result in results:
+                    mark("response.first_asr_result")
+                    yield json.dumps(result, ensure_ascii=False) + "\n"
+            except Exception as e:
+                # 响应头已发送，以最后一行返回错误
+                print(f"❌ 流式识别失败: {e}")
+                yield json.dumps(
+                    {"success": False, "final": True, "error": str(e)}, ensure_ascii=False
+                ) + "\n"
+            finally:
+                if trace is not None:
+                    trace.finish()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+def stream_complete_response(
+    recognized_text, voice, audio_format="wav", session_id=None, history=None
+):
+    """
+    构造流水线式完整流程响应
+
+    LLM 流式生成的同时逐句合成，第 1 句的音频在 LLM 生成后续内容时即开始返回
+
+    Args:
+        recognized_text: 识别出的用户文本
+        voice: 音色名称
+        audio_format: wav（带流式头）或 pcm（裸数据）
+        session_id: 服务端会话ID（回复完成后写入会话）
+        history: 历史对话
+
+    Returns:
+        Response: 分块传输的音频响应
+    """
+
+    # 包装插件以分别记录 LLM 与逐句 TTS 的阶段指标；
+    # 逐句占用 TTS 名额，等待 LLM 生成下一句时不占用，多个请求的回复按句交替合成
+    llm = SimpleNamespace(stream_chat=meter_llm_stream)
+    sentences = []
+
+    def synthesize_stream(text, voice=None, **kwargs):
+        sentences.append(text)
+        return admitted_step(
+            "tts", meter_tts(tts_model.synthesize_stream(text, voice, **kwargs))
+        )
+
+    tts = SimpleNamespace(synthesize_stream=synthesize_stream)
+
+    def chunks():
+        for sentence, chunk in stream_reply(llm, tts, recognized_text, voice, history):
+            yield chunk
+        remember(session_id, recognized_text, "".join(sentences))
+        print("✅ 流程完成")
+
+    headers = {"X-ASR-Text": quote(recognized_text)}
+    if session_id:
+        headers["X-Session-Id"] = session_id
+    return stream_audio_response(chunks(), audio_format, headers=headers)
+
+
+def meter_llm_stream(message, history=None, **kwargs):
+    """流式 LLM 调用，生成结束后记录 LLM 阶段耗时"""
+    with observe_stage("llm"):
+        yield from llm_model.stream_chat(message, history, **kwargs)
+
+
+def stream_audio_response(chunks, audio_format="wav", headers=None):
+    """
+    将音频片段迭代器包装为分块传输响应
+
+    Args:
+        chunks: float32 音频片段迭代器（采样率为 tts_model.sample_rate）
+        audio_format: wav（带流式头）或 pcm（裸数据）
+        headers: 额外响应头
+
+    Returns:
+        Response: 分块传输的音频响应
+    """
+    sample_rate = tts_model.sample_rate
+    trace = g.get("trace")
+    if trace is not None:
+        g.trace_deferred = True
+
+    def generate():
+        # 生成器在视图函数返回后才执行，需要重新激活追踪上下文
+        with trace.activate() if trace is not None else nullcontext():
+            try:
+                if audio_format == "wav":
+                    yield wav_header(sample_rate)
+                for chunk in chunks:
+                    mark("response.first_audio_chunk")
+                    yield float_to_pcm16(chunk)
+            except Exception as e:
+                # 响应头已发送，只能记录错误并结束流
+                print(f"❌ 流式输出失败: {e}")
+            finally:
+                if trace is not None:
+                    trace.finish()
+
+    if audio_format == "wav":
+        mimetype = "audio/wav"
+    else:
+        mimetype = f"audio/L16;rate={sample_rate};channels=1"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={
+            "X-Sample-Rate": str(sample_rate),
+            "X-Audio-Channels": "1",
+            "Cache-Control": "no-cache",
+            **(headers or {}),
+        },
+    )
+
+
+HISTORY_ROLES = ("user", "assistant", "system")
+
+
+def validate_history(history):
+    """
+    校验客户端提供的对话历史
+
+    每条必须是 {"role": "user" / "assistant" / "system", "content": str}
+
+    Returns:
+        str: 错误信息（合法时为 None）
+    """
+    if not isinstance(history, list):
+        return "history 必须是列表"
+    for index, msg in enumerate(history):
+        if not isinstance(msg, dict):
+            return f"history[{index}] 必须是对象"
+        if not isinstance(msg.get("role"), str) or msg["role"] not in HISTORY_ROLES:
+            return f"history[{index}].role 必须是 {' / '.join(HISTORY_ROLES)}"
+        if not isinstance(msg.get("content"), str):
+            return f"history[{index}].content 必须是字符串"
+    return None
+
+
+def resolve_session(session_id=None, history=None):
+    """
+    服务端会话：已有会话使用保存的历史，否则新建会话（可用客户端历史作为初始上下文）
+
+    Args:
+        session_id: 客户端提供的会话ID（可选）
+        history: 已校验的客户端历史（可选）
+
+    Returns:
+        tuple: (session_id, history)；未启用会话管理时为 (None, 客户端历史)
+    """
+    history = history or []
+    if session_manager is None:
+        return None, history
+    if session_id and session_manager.has_session(session_id):
+        return session_id, session_manager.get_context(session_id)
+    session_id = session_manager.create_session(session_id)
+    for msg in history[-session_manager.max_messages :]:
+        session_manager.add_message(session_id, msg["role"], msg["content"])
+    return session_id, history
+
+
+def remember(session_id, message, reply):
+    """将一轮对话写入服务端会话（未启用会话时忽略）"""
+    if session_id and reply:
+        session_manager.add_message(session_id, "user", message)
+        session_manager.add_message(session_id, "assistant", reply)
+
+
 @app.route("/chat", methods=["POST"])
 def chat():
     """
@@ -273,16 +1250,18 @@ def chat():
     Request (application/json):
         {
             "message": "用户消息",
-            "history": [] (optional)
+            "history": [] (optional),
+            "session_id": "会话ID" (optional，session.enabled 时由服务端保存历史)
         }
 
     Response (json):
         {
             "success": bool,
-            "response": str
+            "response": str,
+            "session_id": str (session.enabled 时)
         }
     """
-    if not llm_config.get("enabled", True):
+    if not llm_model or not llm_model.is_loaded():
         return jsonify({"success": False, "error": "LLM 已禁用"}), 503
 
     # 获取参数
@@ -294,60 +1273,64 @@ def chat():
     if not message:
         return jsonify({"success": False, "error": "消息不能为空"}), 400
 
+    history = data.get("history") or []
+    error = validate_history(history)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    session_id = data.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        return jsonify({"success": False, "error": "session_id 必须是字符串"}), 400
+
+    session_id, history = resolve_session(session_id, history)
+
     # 获取配置
     max_tokens = ollama_config.get("max_tokens", 80)
-    system_prompt = ollama_config.get(
-        "system_prompt", "请用简洁的语言回答，确保意思完整。回答要简短精炼，不要冗长。"
-    )
 
     try:
-        # 使用 Chat API 和 System Message
-        import requests
-
-        payload = {
-            "model": ollama_config.get("model", "gemma3:4b"),
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": message},
-            ],
-            "stream": False,
-            "options": {
-                "temperature": ollama_config.get("temperature", 0.7),
-                "top_p": ollama_config.get("top_p", 0.9),
-                "num_predict": max_tokens,
-            },
-        }
-
-        response = requests.post(
-            f"{ollama_config.get('url', 'http://localhost:11434')}/api/chat",
-            json=payload,
-            timeout=ollama_config.get("timeout", 60),
+        # 使用 Chat API 和 System Message（经由共享连接池）
+        with observe_stage("llm"):
+            ai_response = llm_model.chat(message, history, max_tokens=max_tokens)
+        remember(session_id, message, ai_response)
+        return jsonify(
+            {
+                "success": True,
+                "response": ai_response,
+                "model": llm_model.model,
+                "max_tokens": max_tokens,
+                "session_id": session_id,
+            }
         )
-
-        if response.status_code == 200:
-            response_data = response.json()
-            ai_response = response_data.get("message", {}).get("content", "")
-            return jsonify(
-                {
-                    "success": True,
-                    "response": ai_response,
-                    "model": ollama_config.get("model"),
-                    "max_tokens": max_tokens,
-                }
-            )
-        else:
-            return jsonify(
-                {
-                    "success": False,
-                    "error": f"Ollama 调用失败: HTTP {response.status_code}",
-                }
-            ), 500
-
+    except Overloaded:
+        raise
     except Exception as e:
         return jsonify({"success": False, "error": f"Ollama 调用失败: {str(e)}"}), 500
 
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/session/<session_id>", methods=["GET", "DELETE"])
+def session_history(session_id):
+    """
+    会话历史
+
+    GET 返回会话历史，DELETE 删除会话
+    """
+    if session_manager is None:
+        return jsonify({"success": False, "error": "会话管理未启用"}), 503
+
+    if not session_manager.has_session(session_id):
+        return jsonify({"success": False, "error": "会话不存在或已过期"}), 404
+
+    if request.method == "DELETE":
+        session_manager.delete_session(session_id)
+        return jsonify({"success": True, "session_id": session_id})
+
+    return jsonify(
+        {
+            "success": True,
+            "session_id": session_id,
+            "history": session_manager.get_history(session_id),
+        }
+    )
 
 
 @app.route("/complete", methods=["POST"])
@@ -358,29 +1341,35 @@ def complete():
     Request (multipart/form-data):
         - audio: 音频文件
         - voice: 音色名称 (optional)
+        - session_id: 会话ID (optional，session.enabled 时由服务端保存历史)
+
+    Query:
+        - stream: 1 启用流水线模式 (optional, default: 0)
+          LLM 流式生成，每完成一句立即合成并返回音频
+        - format: 流式输出格式 wav/pcm (optional, default: wav)
 
     Response:
         - audio/wav 文件
+        - stream=1 时分块返回音频，识别文本在 X-ASR-Text 头中（URL 编码）
+        - session.enabled 时会话ID在 X-Session-Id 头中
     """
-    temp_files = []
-
     try:
         # Step 1: ASR
         print("\n[1/3] 语音识别...")
         if "audio" not in request.files:
             return jsonify({"success": False, "error": "未提供音频文件"}), 400
 
-        # 保存音频
-        audio_file = request.files["audio"]
-        temp_audio = os.path.join(tempfile.gettempdir(), audio_file.filename)
-        audio_file.save(temp_audio)
-        temp_files.append(temp_audio)
-
         # 识别
         if not asr_model or not asr_model.is_loaded():
             return jsonify({"success": False, "error": "ASR模型未加载"}), 503
 
-        asr_result = asr_model.transcribe(temp_audio, "auto")
+        # 在内存中解码上传的音频（不写临时文件）
+        try:
+            audio = asr_model.prepare_audio(request.files["audio"].read())
+        except ValueError as e:
+            return jsonify({"success": False, "stage": "ASR", "error": str(e)}), 400
+
+        asr_result = run_asr(audio, "auto")
         if not asr_result.get("success"):
             return jsonify(
                 {
@@ -395,54 +1384,39 @@ def complete():
 
         # Step 2: LLM
         print("[2/3] AI对话...")
-        if not llm_config.get("enabled", True):
+        if not llm_model or not llm_model.is_loaded():
             return jsonify(
                 {"success": False, "stage": "LLM", "error": "LLM 已禁用"}
             ), 503
 
-        # 获取配置
-        max_tokens = ollama_config.get("max_tokens", 80)
-        system_prompt = ollama_config.get(
-            "system_prompt",
-            "请用简洁的语言回答，确保意思完整。回答要简短精炼，不要冗长。",
+        voice = request.form.get("voice")
+        session_id, history = resolve_session(
+            request.form.get("session_id") or request.args.get("session_id")
         )
 
-        # 使用 Chat API
-        try:
-            import requests
-
-            payload = {
-                "model": ollama_config.get("model", "gemma3:4b"),
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": recognized_text},
-                ],
-                "stream": False,
-                "options": {
-                    "temperature": ollama_config.get("temperature", 0.7),
-                    "num_predict": max_tokens,
-                },
-            }
-
-            response = requests.post(
-                f"{ollama_config.get('url', 'http://localhost:11434')}/api/chat",
-                json=payload,
-                timeout=ollama_config.get("timeout", 60),
+        # 流水线模式：LLM 边生成边合成
+        if request.args.get("stream", "0").lower() in ("1", "true", "yes"):
+            if not tts_model or not tts_model.is_loaded():
+                return jsonify(
+                    {"success": False, "stage": "TTS", "error": "TTS模型未加载"}
+                ), 503
+            audio_format = request.args.get("format", "wav").lower()
+            if audio_format not in ("wav", "pcm"):
+                return jsonify(
+                    {"success": False, "error": f"不支持的流式格式: {audio_format}"}
+                ), 400
+            admission.check("llm", "tts")
+            return stream_complete_response(
+                recognized_text, voice, audio_format, session_id, history
             )
 
-            if response.status_code != 200:
-                return jsonify(
-                    {
-                        "success": False,
-                        "stage": "LLM",
-                        "error": f"LLM 调用失败: HTTP {response.status_code}",
-                    }
-                ), 500
-
-            llm_data = response.json()
-            ai_response = llm_data.get("message", {}).get("content", "")
+        # 使用 Chat API（经由共享连接池）
+        try:
+            with observe_stage("llm"):
+                ai_response = llm_model.chat(recognized_text, history)
             print(f"   AI回复: {ai_response[:50]}...")
-
+        except Overloaded:
+            raise
         except Exception as e:
             return jsonify(
                 {"success": False, "stage": "LLM", "error": f"LLM 调用失败: {str(e)}"}
@@ -455,29 +1429,95 @@ def complete():
                 {"success": False, "stage": "TTS", "error": "TTS模型未加载"}
             ), 503
 
-        voice = request.form.get("voice")
-        audio_path = tts_model.synthesize(ai_response, voice)
+        wav_bytes = synthesize_wav(ai_response, voice)
+        remember(session_id, recognized_text, ai_response)
 
         print("✅ 流程完成")
 
         # 返回音频
-        return send_file(
-            audio_path,
+        response = send_file(
+            io.BytesIO(wav_bytes),
             mimetype="audio/wav",
             as_attachment=True,
             download_name="response.wav",
         )
+        if session_id:
+            response.headers["X-Session-Id"] = session_id
+        return response
 
+    except Overloaded:
+        raise
     except Exception as e:
         import traceback
 
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
-    finally:
-        # 清理临时文件
-        for f in temp_files:
-            if os.path.exists(f):
-                os.remove(f)
+
+
+# ==================== 全双工语音 ====================
+
+streaming_config = config.get("streaming", {})
+voice_first_audio = metrics.histogram(
+    "voiceforge_voice_first_audio_seconds", "全双工语音：说完一句话到首个回复音频块的耗时"
+)
+
+
+def synthesize_sentence(text, voice=None):
+    """整句合成并记录 TTS 指标（streaming.tts_streaming 为 false 时使用）"""
+    start = time.perf_counter()
+    with observe_stage("tts"):
+        audio = tts_model.synthesize_array(text, voice)
+    record_tts_output(len(audio), time.perf_counter() - start)
+    return audio
+
+
+def create_voice_session(params):
+    """
+    按 /ws/voice 连接参数创建语音会话
+
+    Args:
+        params: 连接参数（voice / session_id / language）
+
+    Returns:
+        VoiceSession: 语音会话
+    """
+    language = params.get("language", "auto")
+    tts = SimpleNamespace(
+        # 逐句占用 TTS 名额，多个连接的回复按句交替合成
+        synthesize_stream=lambda text, voice=None, **kwargs: admitted(
+            "tts", meter_tts(tts_model.synthesize_stream(text, voice, **kwargs))
+        ),
+        synthesize_array=synthesize_sentence,
+    )
+    asr_stream = None
+    if streaming_config.get("asr_streaming", False):
+        # 说话期间输出部分识别结果
+        asr_stream = lambda chunks: asr_model.transcribe_stream(
+            chunks, language, decode=lambda audio: decode_asr_step(audio, language)
+        )
+    return VoiceSession(
+        asr=lambda audio: run_asr(audio, language),
+        llm=SimpleNamespace(stream_chat=meter_llm_stream),
+        tts=tts,
+        voice=params.get("voice") or models_config.get("tts", {}).get("default_voice"),
+        sessions=session_manager,
+        session_id=params.get("session_id"),
+        max_history=session_config.get("max_history", 10),
+        tts_streaming=streaming_config.get("tts_streaming", True),
+        asr_stream=asr_stream,
+    )
+
+
+voice_ws = None
+if streaming_config.get("enabled", False) and asr_model and tts_model and llm_model:
+    voice_ws = VoiceWebSocket(
+        create_voice_session,
+        sample_rate=asr_model.sample_rate,
+        output_sample_rate=tts_model.sample_rate,
+        config=config.get("interruption", {}),
+        is_ready=startup.is_ready,
+        on_first_audio=voice_first_audio.observe,
+    )
 
 
 # ==================== 启动服务 ====================
@@ -486,9 +1526,38 @@ if __name__ == "__main__":
     port = system_config.get("port", 7861)
     debug = system_config.get("debug", False)
 
+    server = system_config.get("server", "flask")
+
     print(f"\n🌐 启动 API 服务...")
     print(f"   地址: http://0.0.0.0:{port}")
+    print(f"   服务模式: {server}")
     print(f"   调试模式: {debug}")
     print("\n按 Ctrl+C 停止服务\n")
 
-    app.run(host="0.0.0.0", port=port, debug=debug)
+    if server == "asgi":
+        # 生产模式：uvicorn 事件循环接收连接，请求在 max_workers 个工作线程中处理，
+        # 超出 max_workers + max_queue 的请求直接返回 429
+        try:
+            import uvicorn
+
+            asgi_app = admission.asgi_app(
+                app, websockets={"/ws/voice": voice_ws} if voice_ws is not None else None
+            )
+        except ImportError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(
+            f"   工作线程: {admission.max_workers}，排队上限: {admission.max_queue}，"
+            f"截止时间: {admission.timeout:g}s"
+        )
+        uvicorn.run(
+            asgi_app,
+            host="0.0.0.0",
+            port=port,
+            lifespan="off",
+            log_level=system_config.get("log_level", "INFO").lower(),
+        )
+    else:
+        if voice_ws is not None:
+            print("⚠️ /ws/voice 需要 ASGI 模式（system.server: asgi），开发服务器不提供")
+        app.run(host="0.0.0.0", port=port, debug=debug, threaded=True)
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+VoiceForge 全双工语音 WebSocket 接口（/ws/voice）
+
+需要 ASGI 模式（system.server: asgi）和 streaming.enabled: true
+
+连接参数（query string）：
+    voice        音色名称（可选）
+    session_id   会话ID（可选，session.enabled 时沿用服务端会话）
+    sample_rate  上传 PCM 的采样率（可选，默认 advanced.audio.input_sample_rate）
+    language     识别语言（可选，默认 auto）
+
+客户端 -> 服务端：
+    二进制消息   16bit 单声道 PCM 帧（建议每帧 20~100ms）
+    {"type": "end"}                     立即结束当前一句（不等待静音）
+    {"type": "cancel"}                  打断当前回复
+    {"type": "config", "voice": "..."}  切换音色
+
+服务端 -> 客户端：
+    {"type": "ready", "sample_rate": 22050, ...}   连接就绪，sample_rate 为返回音频的采样率
+    {"type": "speech_start"}                        检测到开始说话
+    {"type": "asr_partial", "text": "...", "committed": "...", "partial": "..."}
+                                                    说话期间的部分识别结果（streaming.asr_streaming）
+    {"type": "asr", "text": "..."}                  一句话的识别结果
+    {"type": "sentence", "text": "..."}             开始播报的回复句子
+    {"type": "audio_start", "latency": 0.42}        首个音频块（latency 为说完到首个音频块的秒数）
+    二进制消息                                       16bit 单声道 PCM 音频块
+    {"type": "done", "text": "..."}                 回复结束
+    {"type": "interrupted"}                         回复被打断
+    {"type": "error", "error": "..."}
+"""
+
+import asyncio
+import contextvars
+import json
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qsl
+
+from core.audio import pcm16_to_float, resample
+from core.vad import Endpointer
+
+
+class VoiceWebSocket:
+    """
+    /ws/voice ASGI 处理器
+
+    接收音频、端点检测在事件循环中完成；识别、生成与合成在后台线程中进行，
+    音频块一生成就通过同一连接返回，上传与回复互不阻塞
+    """
+
+    def __init__(
+        self,
+        create_session: Callable[[Dict[str, str]], Any],
+        sample_rate: int,
+        output_sample_rate: int,
+        config: dict = None,
+        is_ready: Callable[[], bool] = None,
+        on_first_audio: Callable[[float], None] = None,
+    ):
+        """
+        初始化处理器
+
+        Args:
+            create_session: 按连接参数创建 VoiceSession
+            sample_rate: ASR 输入采样率
+            output_sample_rate: 返回音频的采样率（TTS 采样率）
+            config: 配置字典（interruption）
+            is_ready: 服务是否就绪（未就绪时拒绝连接）
+            on_first_audio: 首个音频块回调，参数为说完到首个音频块的秒数
+        """
+        self.create_session = create_session
+        self.sample_rate = sample_rate
+        self.output_sample_rate = output_sample_rate
+        self.config = config or {}
+        self.interruption = self.config.get("enabled", False)
+        self.vad_config = self.config.get("vad") or {}
+        self.is_ready = is_ready
+        self.on_first_audio = on_first_audio
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        if message["type"] != "websocket.connect":
+            return
+        if self.is_ready is not None and not self.is_ready():
+            # 1013: Try Again Later
+            await send({"type": "websocket.close", "code": 1013})
+            return
+
+        params = dict(parse_qsl(scope.get("query_string", b"").decode("latin1")))
+        try:
+            sample_rate = int(params.get("sample_rate", self.sample_rate))
+            session = self.create_session(params)
+        except Exception as e:
+            print(f"❌ 语音会话创建失败: {e}")
+            await send({"type": "websocket.close", "code": 1011})
+            return
+
+        await send({"type": "websocket.accept"})
+        connection = _Connection(self, session, send, sample_rate)
+        await connection.send_json(
+            {
+                "type": "ready",
+                "session_id": session.session_id,
+                "input_sample_rate": sample_rate,
+                "sample_rate": self.output_sample_rate,
+                "interruption": self.interruption,
+            }
+        )
+
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    await connection.on_audio(message["bytes"])
+                elif message.get("text") is not None:
+                    await connection.on_control(message["text"])
+        finally:
+            connection.close()
+
+
+class _Connection:
+    """单个 WebSocket 连接的状态"""
+
+    def __init__(self, handler: VoiceWebSocket, session, send, sample_rate: int):
+        self.handler = handler
+        self.session = session
+        self._send = send
+        self.sample_rate = sample_rate
+        # 会话支持流式识别时，说话期间的音频同步送入识别线程
+        self.streaming = getattr(session, "asr_stream", None) is not None
+        self.endpointer = Endpointer(
+            sample_rate, handler.vad_config, stream_audio=self.streaming
+        )
+        self.closed = False
+        self._reply: Optional[asyncio.Task] = None
+        self._cancel: Optional[threading.Event] = None
+        self._chunks: Optional[queue.Queue] = None
+        self._transcript: Optional[asyncio.Future] = None
+
+    async def send_json(self, data: dict):
+        if not self.closed:
+            await self._send(
+                {"type": "websocket.send", "text": json.dumps(data, ensure_ascii=False)}
+            )
+
+    async def send_bytes(self, data: bytes):
+        if not self.closed:
+            await self._send({"type": "websocket.send", "bytes": data})
+
+    async def on_audio(self, data: bytes):
+        for event, audio in self.endpointer.feed(pcm16_to_float(data)):
+            if event == "speech_start":
+                if self.handler.interruption:
+                    await self.interrupt()
+                await self.send_json({"type": "speech_start"})
+                if self.streaming:
+                    self.start_transcription()
+            elif event == "speech":
+                if self._chunks is not None:
+                    self._chunks.put(self._resample(audio))
+            else:
+                self.start_reply(audio)
+
+    async def on_control(self, text: str):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            await self.send_json({"type": "error", "error": "控制消息必须是 JSON"})
+            return
+
+        kind = message.get("type")
+        if kind == "end":
+            audio = self.endpointer.flush()
+            if audio is not None:
+                self.start_reply(audio)
+        elif kind == "cancel":
+            await self.interrupt()
+        elif kind == "config":
+            if message.get("voice"):
+                self.session.voice = message["voice"]
+        else:
+            await self.send_json({"type": "error", "error": f"未知的消息类型: {kind}"})
+
+    def start_transcription(self):
+        """开始一句话的流式识别（部分结果随时返回，最终结果交给回复）"""
+        loop = asyncio.get_running_loop()
+        chunks: queue.Queue = queue.Queue()
+        transcript = loop.create_future()
+
+        def finish(result):
+            if not transcript.done():
+                transcript.set_result(result)
+
+        def audio():
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    return
+                yield chunk
+
+        def pump():
+            final = None
+            try:
+                for result in self.session.transcribe_stream(audio()):
+                    if result.get("final"):
+                        # 最终结果识别失败时交给 respond 整句重新识别
+                        final = result if result.get("success") else None
+                    elif result.get("success") and not self.closed:
+                        asyncio.run_coroutine_threadsafe(
+                            self.send_json(
+                                {
+                                    "type": "asr_partial",
+                                    "text": result["text"],
+                                    "committed": result["committed"],
+                                    "partial": result["partial"],
+                                }
+                            ),
+                            loop,
+                        )
+            except Exception as e:
+                # 流式识别失败时回退为整句识别
+                print(f"⚠️ 流式识别失败: {e}")
+            finally:
+                loop.call_soon_threadsafe(finish, final)
+
+        threading.Thread(
+            target=contextvars.copy_context().run, args=(pump,), name="voice-asr", daemon=True
+        ).start()
+        self._chunks, self._transcript = chunks, transcript
+
+    def start_reply(self, audio):
+        """处理一句话（上一条回复未结束时排在其后）"""
+        transcript = None
+        if self._chunks is not None:
+            self._chunks.put(None)
+            transcript = self._transcript
+            self._chunks = self._transcript = None
+        audio = self._resample(audio)
+        self._cancel = threading.Event()
+        self._reply = asyncio.ensure_future(
+            self._run_reply(
+                audio, self._cancel, self._reply, time.perf_counter(), transcript
+            )
+        )
+
+    async def interrupt(self):
+        """打断正在进行的回复"""
+        if self._reply is not None and not self._reply.done() and not self._cancel.is_set():
+            self._cancel.set()
+            await self.send_json({"type": "interrupted"})
+
+    def close(self):
+        self.closed = True
+        if self._chunks is not None:
+            self._chunks.put(None)
+            self._chunks = None
+        if self._cancel is not None:
+            self._cancel.set()
+
+    def _resample(self, audio):
+        if self.sample_rate != self.handler.sample_rate:
+            return resample(audio, self.sample_rate, self.handler.sample_rate)
+        return audio
+
+    async def _run_reply(
+        self, audio, cancel: threading.Event, previous, ended: float, transcript=None
+    ):
+        # 流式识别的最终结果（识别失败时为 None，由 respond 重新识别）
+        result = await transcript if transcript is not None else None
+        if previous is not None:
+            await asyncio.wait([previous])
+        if cancel.is_set() or self.closed:
+            return
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def pump():
+            try:
+                for event in self.session.respond(audio, cancel, result):
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait, ("error", str(e)))
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+        threading.Thread(
+            target=contextvars.copy_context().run, args=(pump,), name="voice-reply", daemon=True
+        ).start()
+
+        first_audio = True
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            if cancel.is_set():
+                # 已打断：丢弃剩余事件，等待后台线程结束
+                continue
+
+            event, data = item
+            if event == "audio":
+                if first_audio:
+                    first_audio = False
+                    latency = time.perf_counter() - ended
+                    if self.handler.on_first_audio is not None:
+                        self.handler.on_first_audio(latency)
+                    await self.send_json({"type": "audio_start", "latency": round(latency, 3)})
+                await self.send_bytes(data)
+            elif event == "error":
+                await self.send_json({"type": "error", "error": data})
+            else:
+                await self.send_json({"type": event, "text": data})
@@ -7,6 +7,19 @@ VoiceForge - 核心框架模块
 - pipeline: 处理管道
 - router: 智能路由
 - plugin_manager: 插件系统
+- audio: 音频工具
+- cache: 音频缓存
+- batcher: 请求合批
+- segmenter: 流式断句
+- metrics: 性能统计
+- tracing: 请求追踪
+- workers: TTS 多副本工作池
+- startup: 启动编排（并行加载与预热）
+- admission: 准入控制（并发限制与过载拒绝）
+- voice_session: 全双工语音会话（端点检测与流式回复）
+- vad: 语音活动检测（静音裁剪、断句、长录音切分）
+- asr_stream: 流式识别（部分结果与稳定前缀）
+- longform: 长音频识别（VAD 切分、排序合批、并行解码）
 
 注意：方案A（技术预览版）中这些模块为预留框架，
       功能在方案B/C中逐步实现。
@@ -18,4 +31,17 @@ __all__ = [
     "pipeline",
     "router",
     "plugin_manager",
+    "audio",
+    "cache",
+    "batcher",
+    "segmenter",
+    "metrics",
+    "tracing",
+    "workers",
+    "startup",
+    "admission",
+    "voice_session",
+    "vad",
+    "asr_stream",
+    "longform",
 ]
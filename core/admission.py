@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+Admission - 准入控制模块
+
+功能：
+- 分阶段并发限制：ASR / TTS / LLM 各自的并发上限（如单个 CosyVoice 同时只合成 1 句）
+- 有界排队：超出并发上限的请求在阶段队列中等待，队列满时立即拒绝（429）
+- 截止时间：请求从进入服务起计时，排队超过 advanced.concurrency.timeout 返回 503
+- Retry-After：按阶段平均处理耗时和排队长度估算客户端重试间隔
+- ASGI 入口限流：在线程池之前按处理中请求数快速拒绝，过载时不再拖慢所有请求
+- ASGI 桥接：请求体边接收边交给 WSGI 应用读取，响应分块经有界队列发送，均不整体缓冲
+
+对应配置 advanced.concurrency：
+    max_workers: 16      # 同时处理的请求数（ASGI 模式下为工作线程数）
+    max_queue: 32        # 等待工作线程的请求数上限，超出返回 429（ASGI 模式）
+    send_queue: 8        # 每个响应待发送的分块数上限，客户端读取慢时生成端等待（ASGI 模式）
+    timeout: 60          # 请求截止时间（秒），排队超时返回 503
+    stages:
+      asr: {concurrency: 8, queue: 16}   # ASR 并发不小于合批大小
+      tts: {concurrency: 2, queue: 8}
+      llm: {concurrency: 4, queue: 16}
+"""
+
+import contextvars
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# 当前请求的截止时间（time.monotonic()），由请求入口设置
+_deadline: contextvars.ContextVar = contextvars.ContextVar("admission_deadline", default=None)
+
+
+class Overloaded(Exception):
+    """
+    服务过载，请求被拒绝
+
+    Attributes:
+        stage: 拒绝请求的阶段（asr/tts/llm/server）
+        reason: 拒绝原因
+        status: HTTP 状态码（429 队列已满 / 503 排队超时）
+        retry_after: 建议的重试间隔（秒）
+    """
+
+    def __init__(self, stage: str, reason: str, status: int = 429, retry_after: int = 1):
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """
+    单个阶段的并发限制器
+
+    最多 concurrency 个请求同时执行，最多 max_queue 个请求排队等待，
+    更多的请求直接拒绝，不再排队拖慢其他请求
+
+    Example:
+        limiter = StageLimiter("tts", concurrency=1, max_queue=4)
+        limiter.acquire(deadline)
+        try:
+            ...
+        finally:
+            limiter.release()
+    """
+
+    def __init__(self, name: str, concurrency: int = 1, max_queue: int = 0):
+        """
+        初始化阶段限制器
+
+        Args:
+            name: 阶段名称
+            concurrency: 并发上限
+            max_queue: 排队上限（0 表示不排队，并发已满时直接拒绝）
+        """
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.max_queue = max(0, int(max_queue))
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._service_time = None  # 处理耗时的指数移动平均
+        self._stats = {"admitted": 0, "rejected": 0, "timeouts": 0, "wait_time": 0.0}
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """
+        获取执行名额（阻塞直到有空闲名额或到达截止时间）
+
+        Args:
+            deadline: 截止时间（time.monotonic()），None 表示不限
+
+        Returns:
+            float: 排队等待的秒数
+
+        Raises:
+            Overloaded: 队列已满（429）或等待超过截止时间（503）
+        """
+        start = time.monotonic()
+        with self._cond:
+            if self._active < self.concurrency and not self._waiting:
+                self._active += 1
+                self._stats["admitted"] += 1
+                return 0.0
+
+            if self._waiting >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise Overloaded(self.name, "请求过多，队列已满", 429, self._retry_after())
+
+            self._waiting += 1
+            try:
+                while self._active >= self.concurrency:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise Overloaded(self.name, "排队超时", 503, self._retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            self._active += 1
+            waited = time.monotonic() - start
+            self._stats["admitted"] += 1
+            self._stats["wait_time"] += waited
+            return waited
+
+    def release(self, elapsed: Optional[float] = None):
+        """
+        释放执行名额
+
+        Args:
+            elapsed: 本次处理耗时（用于估算 Retry-After）
+        """
+        with self._cond:
+            self._active -= 1
+            if elapsed is not None:
+                if self._service_time is None:
+                    self._service_time = elapsed
+                else:
+                    self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._cond.notify()
+
+    def is_full(self) -> bool:
+        """并发和队列是否都已占满（新请求会被拒绝）"""
+        with self._cond:
+            return self._active >= self.concurrency and self._waiting >= self.max_queue
+
+    def _retry_after(self) -> int:
+        """估算队列排空所需时间（调用方需持有锁）"""
+        service_time = self._service_time or 1.0
+        rounds = (self._waiting + self._active) / self.concurrency
+        return max(1, math.ceil(service_time * rounds))
+
+    def retry_after(self) -> int:
+        """建议的重试间隔（秒）"""
+        with self._cond:
+            return self._retry_after()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+
+        Returns:
+            dict: 并发/排队上限、当前执行数、排队数、累计拒绝与超时次数
+        """
+        with self._cond:
+            return {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "waiting": self._waiting,
+                "service_time": round(self._service_time or 0.0, 3),
+                **self._stats,
+            }
+
+
+class AdmissionController:
+    """
+    准入控制器：管理请求截止时间和各阶段限制器
+
+    Example:
+        admission = AdmissionController(config["advanced"]["concurrency"])
+        token = admission.begin()           # 请求开始
+        with admission.stage("tts"):        # 占用 TTS 名额
+            audio = tts.synthesize_array(text)
+        admission.end(token)                # 请求结束
+    """
+
+    DEFAULT_STAGES = {
+        "asr": {"concurrency": 8, "queue": 16},
+        "tts": {"concurrency": 2, "queue": 8},
+        "llm": {"concurrency": 4, "queue": 16},
+    }
+
+    def __init__(self, config: dict = None):
+        """
+        初始化准入控制器
+
+        Args:
+            config: 配置字典（advanced.concurrency）
+        """
+        self.config = config or {}
+        self.timeout = float(self.config.get("timeout", 60) or 0)
+        self.max_workers = max(1, int(self.config.get("max_workers", 16)))
+        self.max_queue = max(0, int(self.config.get("max_queue", 32)))
+        self.send_queue = max(1, int(self.config.get("send_queue", 8)))
+
+        stages = {**self.DEFAULT_STAGES, **(self.config.get("stages") or {})}
+        self.limiters: Dict[str, StageLimiter] = {
+            name: StageLimiter(
+                name,
+                stage_config.get("concurrency", 1),
+                stage_config.get("queue", 0),
+            )
+            for name, stage_config in stages.items()
+        }
+
+        # ASGI 入口统计（只在事件循环线程中修改）
+        self.in_flight = 0
+        self.server_rejected = 0
+
+    # ==================== 截止时间 ====================
+
+    def begin(self, timeout: Optional[float] = None) -> contextvars.Token:
+        """
+        设置当前请求的截止时间
+
+        Args:
+            timeout: 超时秒数（默认 advanced.concurrency.timeout，0 表示不限）
+
+        Returns:
+            Token: 传给 end() 以恢复上下文
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return _deadline.set(time.monotonic() + timeout if timeout else None)
+
+    def end(self, token: Optional[contextvars.Token]):
+        """清除当前请求的截止时间"""
+        if token is None:
+            return
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # 在其他上下文中结束（如流式响应在另一线程中收尾）
+            _deadline.set(None)
+
+    def deadline(self) -> Optional[float]:
+        """
+        当前请求的截止时间
+
+        不在请求上下文中时（如后台线程）从现在起按 timeout 计算，避免无限等待
+        """
+        deadline = _deadline.get()
+        if deadline is None and self.timeout:
+            deadline = time.monotonic() + self.timeout
+        return deadline
+
+    def remaining(self) -> Optional[float]:
+        """
+        距截止时间的剩余秒数
+
+        Raises:
+            Overloaded: 已超过截止时间（503）
+        """
+        deadline = self.deadline()
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise Overloaded("server", "请求超时", 503, 1)
+        return remaining
+
+    # ==================== 阶段限制 ====================
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        在阶段限制内执行（未配置的阶段不限制）
+
+        Raises:
+            Overloaded: 队列已满或排队超时
+        """
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            yield
+            return
+
+        limiter.acquire(self.deadline())
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            limiter.release(time.perf_counter() - start)
+
+    def check(self, *names: str):
+        """
+        预检查阶段是否已满
+
+        流式响应在开始生成时才占用名额，此时响应头已发送，无法再返回 429，
+        因此在返回响应前先检查
+
+        Raises:
+            Overloaded: 任一阶段的并发和队列都已占满（429）
+        """
+        for name in names:
+            limiter = self.limiters.get(name)
+            if limiter is not None and limiter.is_full():
+                raise Overloaded(name, "请求过多，队列已满", 429, limiter.retry_after())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+
+        Returns:
+            dict: 截止时间配置、ASGI 入口统计和各阶段统计
+        """
+        return {
+            "timeout": self.timeout,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.server_rejected,
+            "stages": {name: limiter.get_stats() for name, limiter in self.limiters.items()},
+        }
+
+    # ==================== ASGI 入口 ====================
+
+    def asgi_app(self, wsgi_app, exempt=("/health", "/metrics"), websockets=None):
+        """
+        构造 ASGI 应用：WSGI 应用运行在 max_workers 个工作线程中，
+        处理中的请求数达到 max_workers + max_queue 时直接返回 429
+
+        请求体不预先读入内存：工作线程读取 wsgi.input 时才从连接接收下一块，
+        分块上传的音频可以边上传边处理；响应分块经长度为 send_queue 的队列发送，
+        客户端读取慢时生成端阻塞等待，不在内存中堆积
+
+        Args:
+            wsgi_app: WSGI 应用（Flask app）
+            exempt: 不受限制的路径前缀（健康检查、监控指标）
+            websockets: WebSocket 路由 {路径: ASGI 处理器}（在事件循环中运行，不占用工作线程）
+
+        Returns:
+            ASGI 应用
+        """
+        try:
+            from a2wsgi import WSGIMiddleware
+        except ImportError:
+            raise ImportError("ASGI 模式需要 a2wsgi: pip install a2wsgi")
+
+        return AdmissionMiddleware(
+            WSGIMiddleware(
+                _input_terminated(wsgi_app),
+                workers=self.max_workers,
+                send_queue_size=self.send_queue,
+            ),
+            self,
+            exempt,
+            websockets,
+        )
+
+
+def _input_terminated(wsgi_app):
+    """
+    标记请求体以 EOF 结束
+
+    ASGI 服务器已处理分块传输编码，请求体读完时返回空字节；没有 Content-Length 的
+    分块上传（如 /asr?stream=1 的裸 PCM）需要该标记，否则 werkzeug 视为空请求体
+    """
+
+    def app(environ, start_response):
+        environ["wsgi.input_terminated"] = True
+        return wsgi_app(environ, start_response)
+
+    return app
+
+
+class AdmissionMiddleware:
+    """
+    ASGI 入口限流中间件
+
+    在事件循环中计数，过载时不占用工作线程即可返回 429，
+    拒绝耗时与后端负载无关
+    """
+
+    def __init__(self, app, controller: AdmissionController, exempt=(), websockets=None):
+        self.app = app
+        self.controller = controller
+        self.exempt = tuple(exempt)
+        self.websockets = websockets or {}
+        self.limit = controller.max_workers + controller.max_queue
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            handler = self.websockets.get(scope["path"])
+            if handler is None:
+                await receive()
+                await send({"type": "websocket.close", "code": 1008})
+                return
+            await handler(scope, receive, send)
+            return
+
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        if controller.in_flight >= self.limit:
+            controller.server_rejected += 1
+            await self._reject(send, controller.timeout)
+            return
+
+        controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
+
+    async def _reject(self, send, timeout):
+        body = json.dumps(
+            {"success": False, "stage": "server", "error": "服务繁忙，请稍后重试"},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        retry_after = max(1, int(min(timeout or 1, 5)))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
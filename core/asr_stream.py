@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+ASR Stream - 流式识别模块
+
+功能：
+- 边说边识别：音频块持续输入，每新增 chunk_size 毫秒音频就对当前窗口重新解码，输出部分结果
+- 稳定前缀：检测到停顿（或窗口达到上限）时把窗口内的音频定稿识别，结果追加到已确认文本，
+  已确认文本之后不会再改变，部分结果只在其后的未确认部分变化
+- 有界窗口：未确认音频不超过 window_s，超长时在后半段能量最低处切开，解码耗时不随说话时长增长
+- 静音跳过：窗口内没有语音时不解码
+
+适用于 SenseVoice 这类非自回归模型：单次解码很快，重复解码一个短窗口的代价很低
+
+对应配置 streaming：
+    asr_streaming: true   # false 时收完全部音频后只识别一次（不输出部分结果）
+    chunk_size: 1024      # 部分结果的解码步长（毫秒）
+    asr_window_s: 10      # 未确认音频窗口上限（秒）
+    commit_silence_ms: 300  # 停顿超过该时长时确认当前窗口
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from .audio import concat_audio, pcm16_to_float, to_numpy
+from .vad import VAD
+
+
+def join_text(left: str, right: str) -> str:
+    """拼接两段识别文本（两侧都是非中日韩字符时加空格）"""
+    if not left:
+        return right
+    if not right:
+        return left
+    if left[-1] < "\u2e80" and right[0] < "\u2e80" and not left[-1].isspace():
+        return f"{left} {right}"
+    return left + right
+
+
+class StreamingTranscriber:
+    """
+    流式识别器
+
+    Example:
+        transcriber = StreamingTranscriber(asr.transcribe, 16000, config["streaming"])
+        for result in transcriber.run(chunks):
+            print(result["committed"], result["partial"], result["final"])
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[np.ndarray], Dict[str, Any]],
+        sample_rate: int = 16000,
+        config: dict = None,
+        vad_config: dict = None,
+    ):
+        """
+        初始化流式识别器
+
+        Args:
+            decode: 识别函数，输入 float32 数组，返回 transcribe 格式的结果
+            sample_rate: 输入采样率
+            config: 配置字典（streaming）
+            vad_config: 停顿检测参数（interruption.vad）
+        """
+        config = config or {}
+        self.decode = decode
+        self.sample_rate = sample_rate
+        self.enabled = config.get("asr_streaming", True)
+        self.step = int(sample_rate * float(config.get("chunk_size", 1024)) / 1000)
+        self.window = int(sample_rate * float(config.get("asr_window_s", 10)))
+        self.vad = VAD(sample_rate, vad_config)
+        self.commit_frames = max(
+            1, int(config.get("commit_silence_ms", 300)) // VAD.FRAME_MS
+        )
+        # 开口前保留的音频，其余的前导静音直接丢弃
+        self.pre_roll = (self.vad.pre_roll_frames + self.vad.min_speech_frames) * self.vad.frame_size
+
+    def run(self, chunks: Iterable) -> Iterator[Dict[str, Any]]:
+        """
+        流式识别
+
+        Args:
+            chunks: 音频块迭代器（float32 数组，或 16bit PCM 字节），采样率为 sample_rate
+
+        Yields:
+            dict: 识别结果
+            {
+                "success": bool,
+                "final": bool,        # 最后一条为 True
+                "text": str,          # committed + partial
+                "committed": str,     # 已确认文本（只会追加）
+                "partial": str,       # 未确认部分（后续可能改变）
+                "language": str
+            }
+            识别失败的条目 success 为 False 并带 error；最后一段识别失败时最终结果同样如此
+        """
+        if not self.enabled:
+            audio = concat_audio([self._to_array(chunk) for chunk in chunks])
+            result = self.decode(audio) if len(audio) else {"success": True, "text": ""}
+            if result.get("success"):
+                yield self._result(result.get("text", "").strip(), "", result, final=True)
+            else:
+                yield self._error("", result, final=True)
+            return
+
+        stream = self.vad.stream()
+        buffer: List[np.ndarray] = []
+        buffered = 0
+        since_decode = 0
+        speech = False
+        silence_run = 0
+        committed = ""
+        last = {"success": True, "language": ""}
+
+        for chunk in chunks:
+            audio = self._to_array(chunk)
+            if not len(audio):
+                continue
+            buffer.append(audio)
+            buffered += len(audio)
+            since_decode += len(audio)
+
+            mask = stream.feed(audio)
+            if mask.any():
+                speech = True
+                silence_run = len(mask) - 1 - int(np.flatnonzero(mask)[-1])
+            else:
+                silence_run += len(mask)
+
+            if not speech:
+                # 还没开口：只保留 pre_roll，窗口不会被前导静音占满
+                if buffered > self.pre_roll:
+                    tail = concat_audio(buffer)[-self.pre_roll :]
+                    buffer, buffered = [tail], len(tail)
+                continue
+
+            if silence_run >= self.commit_frames or buffered >= self.window:
+                # 停顿或窗口已满：定稿当前窗口（窗口满时在后半段最安静处切开）
+                audio = concat_audio(buffer)
+                cut = len(audio)
+                if silence_run < self.commit_frames:
+                    cut = self.vad.quietest(audio, len(audio) // 2, len(audio))
+                last = self.decode(audio[:cut])
+                if last.get("success"):
+                    committed = join_text(committed, last.get("text", "").strip())
+                    yield self._result(committed, "", last)
+                else:
+                    yield self._error(committed, last)
+                rest = audio[cut:]
+                buffer, buffered = ([rest], len(rest)) if len(rest) else ([], 0)
+                speech = silence_run < self.commit_frames
+                since_decode = 0
+            elif since_decode >= self.step:
+                since_decode = 0
+                last = self.decode(concat_audio(buffer))
+                if last.get("success"):
+                    yield self._result(committed, last.get("text", "").strip(), last)
+                else:
+                    yield self._error(committed, last)
+
+        if speech and buffered:
+            last = self.decode(concat_audio(buffer))
+            if not last.get("success"):
+                # 最后一段识别失败：最终结果带上错误，已确认的文本照常返回
+                yield self._error(committed, last, final=True)
+                return
+            committed = join_text(committed, last.get("text", "").strip())
+        yield self._result(committed, "", last, final=True)
+
+    def _to_array(self, chunk) -> np.ndarray:
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            return pcm16_to_float(bytes(chunk))
+        return to_numpy(chunk)
+
+    @staticmethod
+    def _result(committed: str, partial: str, result: dict, final: bool = False) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "final": final,
+            "text": join_text(committed, partial),
+            "committed": committed,
+            "partial": partial,
+            "language": result.get("language", ""),
+        }
+
+    @staticmethod
+    def _error(committed: str, result: dict, final: bool = False) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "final": final,
+            "error": result.get("error", "识别失败"),
+            "text": committed,
+            "committed": committed,
+            "partial": "",
+            "language": result.get("language", ""),
+        }
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Audio - 音频工具模块
+
+功能：
+- PCM 转换：浮点采样 <-> 16bit PCM
+- WAV 头部：支持流式（长度未知）WAV 输出
+- 内存编码：拼接音频片段并编码为 WAV 字节，无需落盘
+- 内存解码：上传的音频字节直接解码、重采样为 NumPy 数组
+- 分块解码：长音频逐块解码、重采样，内存占用与总时长无关
+"""
+
+import io
+import struct
+
+import numpy as np
+
+# 流式 WAV 头部中长度未知时使用的占位值（大多数播放器会读取到流结束）
+STREAMING_DATA_SIZE = 0xFFFFFFFF
+
+
+def to_numpy(audio) -> np.ndarray:
+    """
+    将音频数据转换为一维 float32 NumPy 数组
+
+    Args:
+        audio: torch.Tensor / np.ndarray / list
+
+    Returns:
+        np.ndarray: 一维 float32 数组
+    """
+    if hasattr(audio, "detach"):
+        audio = audio.detach().cpu().numpy()
+    return np.asarray(audio, dtype=np.float32).reshape(-1)
+
+
+def float_to_pcm16(audio) -> bytes:
+    """
+    浮点音频 [-1, 1] 转换为 16bit 小端 PCM
+
+    Args:
+        audio: 浮点音频数据
+
+    Returns:
+        bytes: PCM 字节
+    """
+    samples = to_numpy(audio)
+    samples = np.clip(samples, -1.0, 1.0)
+    return (samples * 32767.0).astype("<i2").tobytes()
+
+
+def pcm16_to_float(data: bytes) -> np.ndarray:
+    """
+    16bit 小端 PCM 转换为浮点音频 [-1, 1]
+
+    Args:
+        data: PCM 字节（奇数长度时丢弃最后一个字节）
+
+    Returns:
+        np.ndarray: 一维 float32 数组
+    """
+    samples = np.frombuffer(data, dtype="<i2", count=len(data) // 2)
+    return samples.astype(np.float32) / 32768.0
+
+
+def wav_header(
+    sample_rate: int, num_channels: int = 1, bits: int = 16, data_size: int = None
+) -> bytes:
+    """
+    生成 PCM WAV 文件头
+
+    Args:
+        sample_rate: 采样率
+        num_channels: 声道数
+        bits: 采样位数
+        data_size: 音频数据字节数（None 表示流式输出，长度未知）
+
+    Returns:
+        bytes: 44 字节 WAV 头
+    """
+    block_align = num_channels * bits // 8
+    byte_rate = sample_rate * block_align
+
+    if data_size is None:
+        data_size = STREAMING_DATA_SIZE
+        riff_size = STREAMING_DATA_SIZE
+    else:
+        riff_size = 36 + data_size
+
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        riff_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        num_channels,
+        sample_rate,
+        byte_rate,
+        block_align,
+        bits,
+        b"data",
+        data_size,
+    )
+
+
+def concat_audio(chunks) -> np.ndarray:
+    """
+    拼接音频片段到一块预分配的连续缓冲区
+
+    Args:
+        chunks: 一维音频片段列表
+
+    Returns:
+        np.ndarray: 一维 float32 数组
+    """
+    chunks = [to_numpy(c) for c in chunks]
+    total = sum(len(c) for c in chunks)
+    audio = np.empty(total, dtype=np.float32)
+    offset = 0
+    for c in chunks:
+        audio[offset : offset + len(c)] = c
+        offset += len(c)
+    return audio
+
+
+def encode_wav(audio, sample_rate: int) -> bytes:
+    """
+    浮点音频编码为完整的 16bit PCM WAV 字节
+
+    Args:
+        audio: 浮点音频数据
+        sample_rate: 采样率
+
+    Returns:
+        bytes: WAV 文件内容
+    """
+    pcm = float_to_pcm16(audio)
+    return wav_header(sample_rate, data_size=len(pcm)) + pcm
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    重采样
+
+    优先使用 librosa（高质量），未安装时退化为线性插值
+
+    Args:
+        audio: 一维浮点音频
+        orig_sr: 原采样率
+        target_sr: 目标采样率
+
+    Returns:
+        np.ndarray: 一维 float32 音频
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if orig_sr == target_sr or len(audio) == 0:
+        return audio
+
+    try:
+        import librosa
+
+        return librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr).astype(
+            np.float32
+        )
+    except ImportError:
+        target_len = int(round(len(audio) * target_sr / orig_sr))
+        positions = np.linspace(0, len(audio) - 1, num=target_len)
+        return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def decode_audio(data: bytes, target_sr: int = 16000) -> np.ndarray:
+    """
+    从内存字节解码音频（不写临时文件）
+
+    多声道会混合为单声道，并一次性重采样到目标采样率
+
+    Args:
+        data: 音频文件内容（wav/flac/ogg 等 soundfile 支持的格式）
+        target_sr: 目标采样率
+
+    Returns:
+        np.ndarray: 一维 float32 音频
+
+    Raises:
+        ValueError: 无法解码
+    """
+    import soundfile as sf
+
+    try:
+        audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except Exception as e:
+        raise ValueError(f"无法解码音频: {e}")
+
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return resample(audio, sr, target_sr)
+
+
+def iter_audio_blocks(source, target_sr: int = 16000, block_seconds: float = 30):
+    """
+    逐块解码音频（长音频不必整段载入内存）
+
+    Args:
+        source: 音频文件路径 / 文件对象（可 seek，如上传文件的 stream）/
+                音频文件字节 / float32 数组（数组按 target_sr 解释）
+        target_sr: 目标采样率
+        block_seconds: 每块时长（秒，按原始采样率计）
+
+    Yields:
+        np.ndarray: 一维 float32 音频块（单声道，采样率为 target_sr）
+
+    Raises:
+        ValueError: 无法解码
+    """
+    if not isinstance(source, (str, bytes, bytearray, memoryview)) and not hasattr(
+        source, "read"
+    ):
+        audio = to_numpy(source)
+        block = max(1, int(target_sr * block_seconds))
+        for i in range(0, len(audio), block):
+            yield audio[i : i + block]
+        return
+
+    import soundfile as sf
+
+    try:
+        f = sf.SoundFile(_audio_file(source))
+    except Exception as e:
+        raise ValueError(f"无法解码音频: {e}")
+
+    with f:
+        block = max(1, int(f.samplerate * block_seconds))
+        for audio in f.blocks(block, dtype="float32", always_2d=True):
+            audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+            yield resample(audio, f.samplerate, target_sr)
+
+
+def audio_duration(source) -> float:
+    """
+    读取音频时长（只解析文件头，不解码）
+
+    Args:
+        source: 音频文件路径 / 文件对象（读取后回到原位置）/ 音频文件字节
+
+    Returns:
+        float: 时长（秒）
+
+    Raises:
+        ValueError: 无法解析
+    """
+    import soundfile as sf
+
+    source = _audio_file(source)
+    position = source.tell() if hasattr(source, "tell") else None
+    try:
+        info = sf.info(source)
+    except Exception as e:
+        raise ValueError(f"无法解码音频: {e}")
+    finally:
+        if position is not None:
+            source.seek(position)
+    return info.frames / info.samplerate
+
+
+def _audio_file(source):
+    """路径和文件对象原样交给 soundfile，字节包装为内存文件"""
+    if isinstance(source, str) or hasattr(source, "read"):
+        return source
+    return io.BytesIO(bytes(source))
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Batcher - 请求合批模块
+
+功能：
+- 请求合并：收集并发请求，凑成一批统一推理
+- 延迟上限：最多等待 max_wait_ms 毫秒
+- 批量上限：最多 max_batch_size 条
+- 结果分发：通过 Future 将结果返回给各自的调用方
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+
+class MicroBatcher:
+    """
+    微批处理器
+
+    后台线程从队列中取请求：取到第一条后，在 max_wait_ms 内继续收集，
+    直到凑满 max_batch_size 条或超时，然后调用一次 batch_fn
+
+    Example:
+        batcher = MicroBatcher(lambda items: [x * 2 for x in items])
+        batcher.start()
+        batcher.submit(21).result()  # 42
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10,
+        name: str = "batcher",
+    ):
+        """
+        初始化微批处理器
+
+        Args:
+            batch_fn: 批处理函数，输入列表，返回等长结果列表
+            max_batch_size: 单批最大条数
+            max_wait_ms: 凑批最长等待时间（毫秒）
+            name: 名称（用于线程名和日志）
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._running = False
+        self._stats = {"batches": 0, "items": 0, "max_batch": 0}
+
+    def start(self):
+        """启动后台线程"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.name}-worker", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程（队列中剩余请求会被处理完）"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        self._thread.join()
+
+    def submit(self, item: Any) -> Future:
+        """
+        提交请求
+
+        Args:
+            item: 请求数据
+
+        Returns:
+            Future: 结果
+        """
+        if not self._running:
+            raise RuntimeError(f"{self.name} 未启动")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def get_stats(self) -> dict:
+        """
+        获取合批统计
+
+        Returns:
+            dict: 批次数、条数、平均/最大批大小
+        """
+        stats = dict(self._stats)
+        stats["avg_batch"] = (
+            stats["items"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    def _collect(self):
+        """收集一批请求；返回 None 表示收到停止信号且队列已空"""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                entry = (
+                    self._queue.get(timeout=timeout)
+                    if timeout > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if entry is None:
+                # 停止信号放回，处理完当前批次后退出
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        """后台线程主循环"""
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+
+            # 跳过已被调用方取消的请求
+            batch = [(item, f) for item, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name} 批处理结果数量不匹配: {len(results)} != {len(items)}"
+                    )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+            self._stats["batches"] += 1
+            self._stats["items"] += len(items)
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(items))
@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""
+Cache - 音频缓存模块
+
+功能：
+- 内容寻址：按 文本/音色/指令/语速/模型/采样率 的哈希作为键
+- 两级缓存：内存 LRU + 磁盘存储
+- 淘汰策略：按容量（LRU）和过期时间（TTL）淘汰
+- 统计信息：命中/未命中/淘汰计数
+- 图片缓存：多模态对话的图片按 路径/大小/修改时间 只编码一次（ImageCache）
+
+对应配置 advanced.cache：
+    enabled: true
+    directory: ./cache
+    max_size_mb: 1024      # 磁盘缓存上限
+    memory_size_mb: 64     # 内存缓存上限
+    ttl: 3600              # 过期时间（秒），0 表示不过期
+"""
+
+import base64
+import io
+import os
+import time
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 随 Gradio 安装；缺失时图片按原样编码
+    Image = None
+
+
+class AudioCache:
+    """
+    TTS 音频缓存
+
+    内存层保存最近使用的音频数组，磁盘层保存 .npy 文件，
+    磁盘命中后会回填内存层
+    """
+
+    def __init__(self, config=None):
+        """
+        初始化缓存
+
+        Args:
+            config: 配置字典（advanced.cache）
+        """
+        self.config = config or {}
+        self.directory = self.config.get("directory", "./cache")
+        self.max_disk_bytes = int(self.config.get("max_size_mb", 1024) * 1024 * 1024)
+        self.max_memory_bytes = int(
+            self.config.get("memory_size_mb", 64) * 1024 * 1024
+        )
+        self.ttl = self.config.get("ttl", 3600) or 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (audio, created_at)
+        self._memory_bytes = 0
+        self._disk = OrderedDict()  # key -> (size, created_at)，按最近访问排序
+        self._disk_bytes = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "expired": 0,
+        }
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._scan_disk()
+
+    @staticmethod
+    def make_key(
+        text: str,
+        voice: str = "",
+        instruction: str = "",
+        speed: float = 1.0,
+        model_id: str = "",
+        sample_rate: int = 0,
+    ) -> str:
+        """
+        生成缓存键
+
+        文本会先做空白归一化，保证仅空白不同的请求命中同一条目
+
+        Returns:
+            str: sha256 十六进制摘要
+        """
+        normalized = " ".join(text.split())
+        payload = json.dumps(
+            [normalized, voice or "", instruction or "", float(speed), model_id, sample_rate],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            np.ndarray 或 None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                audio, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return audio
+                self._drop_memory(key)
+                self._stats["expired"] += 1
+
+            disk_entry = self._disk.get(key)
+            if disk_entry is None:
+                self._stats["misses"] += 1
+                return None
+            if self._is_expired(disk_entry[1], now):
+                self._drop_disk(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._disk.move_to_end(key)
+
+        try:
+            audio = np.load(self._path(key))
+        except Exception:
+            with self._lock:
+                if key in self._disk:
+                    self._drop_disk(key)
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._put_memory(key, audio, disk_entry[1])
+        return audio
+
+    def put(self, key: str, audio):
+        """
+        写入缓存（内存 + 磁盘）
+
+        Args:
+            key: 缓存键
+            audio: 一维 float32 音频
+        """
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        created_at = time.time()
+
+        # 先写临时文件再原子替换，避免并发读到半个文件
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, audio)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"⚠️ 音频缓存写入失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            size = None
+
+        with self._lock:
+            self._stats["stores"] += 1
+            self._put_memory(key, audio, created_at)
+            if size is not None:
+                if key in self._disk:
+                    self._disk_bytes -= self._disk.pop(key)[0]
+                self._disk[key] = (size, created_at)
+                self._disk_bytes += size
+                self._evict_disk()
+
+    def cleanup_expired(self):
+        """清理所有过期条目"""
+        if not self.ttl:
+            return
+        now = time.time()
+        with self._lock:
+            for key in [k for k, v in self._memory.items() if self._is_expired(v[1], now)]:
+                self._drop_memory(key)
+                self._stats["expired"] += 1
+            for key in [k for k, v in self._disk.items() if self._is_expired(v[1], now)]:
+                self._drop_disk(key)
+                self._stats["expired"] += 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for key in list(self._disk.keys()):
+                self._drop_disk(key)
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中/未命中/淘汰计数及占用
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["disk_entries"] = len(self._disk)
+            stats["disk_bytes"] = self._disk_bytes
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        total = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = hits / total if total else 0.0
+        return stats
+
+    # ==================== 内部方法 ====================
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - created_at > self.ttl
+
+    def _put_memory(self, key, audio, created_at):
+        """写入内存层并按容量淘汰（需持有锁）"""
+        if audio.nbytes > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._drop_memory(key)
+        self._memory[key] = (audio, created_at)
+        self._memory_bytes += audio.nbytes
+        while self._memory_bytes > self.max_memory_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self._stats["memory_evictions"] += 1
+
+    def _drop_memory(self, key):
+        audio, _ = self._memory.pop(key)
+        self._memory_bytes -= audio.nbytes
+
+    def _evict_disk(self):
+        """按 LRU 淘汰磁盘条目直到低于上限（需持有锁）"""
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            oldest = next(iter(self._disk))
+            self._drop_disk(oldest)
+            self._stats["disk_evictions"] += 1
+
+    def _drop_disk(self, key):
+        size, _ = self._disk.pop(key)
+        self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _scan_disk(self):
+        """启动时扫描磁盘缓存目录，重建索引"""
+        entries = []
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if filename.endswith(".tmp"):
+                # 上次异常退出遗留的临时文件
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not filename.endswith(".npy"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, filename[: -len(".npy")], st.st_size))
+
+        for mtime, key, size in sorted(entries):
+            self._disk[key] = (size, mtime)
+            self._disk_bytes += size
+
+        self.cleanup_expired()
+        with self._lock:
+            self._evict_disk()
+
+
+class ImageCache:
+    """
+    图片编码缓存（多模态对话）
+
+    每张图片缩放到最大边长并重新编码为 JPEG 后转 base64，
+    按 (路径, 文件大小, 修改时间) 缓存，文件被替换时自动失效；
+    内存占用按 LRU 限制在 max_size_mb 以内
+    """
+
+    def __init__(self, config=None):
+        """
+        初始化图片缓存
+
+        Args:
+            config: 配置字典
+                - max_size: 最大边长（像素），0 表示不缩放（默认 1024）
+                - quality: JPEG 质量（默认 85）
+                - cache_size_mb: 缓存上限（默认 64）
+        """
+        self.config = config or {}
+        self.max_size = int(self.config.get("max_size", 1024) or 0)
+        self.quality = int(self.config.get("quality", 85))
+        self.max_bytes = int(self.config.get("cache_size_mb", 64) * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (path, size, mtime) -> base64 str
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "errors": 0}
+
+    def get(self, path: str):
+        """
+        获取图片的 base64 编码（未缓存时编码并缓存）
+
+        Args:
+            path: 图片路径
+
+        Returns:
+            str 或 None（文件不存在或无法解码）
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return encoded
+            self._stats["misses"] += 1
+
+        try:
+            encoded = base64.b64encode(self._encode(path)).decode("ascii")
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            print(f"⚠️ 图片编码失败 {path}: {e}")
+            return None
+
+        with self._lock:
+            if key not in self._entries and len(encoded) <= self.max_bytes:
+                self._entries[key] = encoded
+                self._bytes += len(encoded)
+                while self._bytes > self.max_bytes:
+                    _, oldest = self._entries.popitem(last=False)
+                    self._bytes -= len(oldest)
+                    self._stats["evictions"] += 1
+        return encoded
+
+    def _encode(self, path: str) -> bytes:
+        """读取图片，超过最大边长时缩放并重新编码"""
+        if Image is None:
+            with open(path, "rb") as f:
+                return f.read()
+
+        with Image.open(path) as img:
+            needs_resize = self.max_size and max(img.size) > self.max_size
+            if not needs_resize and img.format in ("JPEG", "PNG", "WEBP"):
+                # 尺寸已达标且格式可直接使用，跳过重新编码
+                with open(path, "rb") as f:
+                    return f.read()
+
+            img = ImageOps.exif_transpose(img)
+            if needs_resize:
+                img.thumbnail((self.max_size, self.max_size), Image.LANCZOS)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=self.quality)
+            return buffer.getvalue()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Long Form - 长音频识别模块
+
+功能：
+- 分块解码：音频逐块解码（core/audio.iter_audio_blocks），不整段载入内存
+- VAD 切分：按静音切成不超过 max_segment_s 的片段，片段边界落在停顿处，不切断句子
+- 排序合批：每攒够一组片段按时长排序后组批，同批长度接近，补齐的无效计算最少
+- 并行解码：批次交给线程池并行识别，片段结果完成一个返回一个
+- 拼接：按时间顺序拼接全文，每个片段附带起止时间
+- 内存平稳：缓冲的音频和在途批次都有上限，峰值内存与音频总时长无关
+
+对应配置 advanced.long_audio：
+    auto_seconds: 60    # /asr 上传的音频超过该时长时自动使用长音频识别（0 表示仅 long=1 时使用）
+    max_segment_s: 30   # 片段最长时长（秒）
+    batch_size: 8       # 每批片段数
+    workers: 2          # 并行解码的线程数
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from .asr_stream import join_text
+from .audio import concat_audio
+from .vad import VAD
+
+# 片段：(序号, 起始采样点, 音频)
+Segment = Tuple[int, int, np.ndarray]
+
+
+class LongFormTranscriber:
+    """
+    长音频识别器
+
+    Example:
+        transcriber = LongFormTranscriber(asr.transcribe_batch, 16000, config["long_audio"])
+        for result in transcriber.run(iter_audio_blocks(data, 16000)):
+            print(result["start"], result["end"], result["text"])
+    """
+
+    def __init__(
+        self,
+        decode_batch: Callable[[List[np.ndarray]], List[Dict[str, Any]]],
+        sample_rate: int = 16000,
+        config: dict = None,
+        vad_config: dict = None,
+    ):
+        """
+        初始化长音频识别器
+
+        Args:
+            decode_batch: 批量识别函数，输入 float32 数组列表，返回等长的 transcribe 格式结果
+            sample_rate: 输入采样率
+            config: 配置字典（advanced.long_audio）
+            vad_config: 切分参数（interruption.vad）
+        """
+        config = config or {}
+        self.decode_batch = decode_batch
+        self.sample_rate = sample_rate
+        self.vad = VAD(sample_rate, vad_config)
+        self.max_segment = int(sample_rate * float(config.get("max_segment_s", 30)))
+        self.batch_size = max(1, int(config.get("batch_size", 8)))
+        self.workers = max(1, int(config.get("workers", 2)))
+        # 静音超过该长度时，之前的片段不会再与后续语音合并，可以提前送去识别
+        self.gap = self.vad.min_silence_frames * self.vad.frame_size + self.vad.pad
+
+    # ==================== 切分 ====================
+
+    def segments(self, blocks: Iterable[np.ndarray]) -> Iterator[Segment]:
+        """
+        边解码边切分
+
+        缓冲区只保留最后一个可能未结束的片段，长度不超过 max_segment_s 加一个块
+
+        Args:
+            blocks: 音频块迭代器（采样率为 sample_rate）
+
+        Yields:
+            tuple: (序号, 起始采样点, 片段音频)
+        """
+        buffer = np.zeros(0, dtype=np.float32)
+        offset = 0  # buffer[0] 在整段音频中的位置
+        index = 0
+        iterator = iter(blocks)
+        done = False
+
+        while not done:
+            block = next(iterator, None)
+            done = block is None
+            if not done:
+                buffer = concat_audio([buffer, block])
+                if len(buffer) < self.max_segment:
+                    continue
+
+            spans = self.vad.split(buffer, self.max_segment / self.sample_rate)
+            if not done:
+                # 最后一个片段之后的静音不够长时，它可能延续到下一块，留到下次切分
+                if spans and len(buffer) - spans[-1][1] < self.gap:
+                    keep = spans.pop()[0]
+                else:
+                    keep = max(spans[-1][1] if spans else 0, len(buffer) - self.gap)
+            for start, end in spans:
+                yield index, offset + start, buffer[start:end].copy()
+                index += 1
+            if not done:
+                buffer = buffer[keep:].copy()
+                offset += keep
+
+    # ==================== 识别 ====================
+
+    def run(self, blocks: Iterable[np.ndarray]) -> Iterator[Dict[str, Any]]:
+        """
+        长音频识别
+
+        片段结果按完成顺序输出（不一定按时间顺序），最后输出按时间顺序拼接的全文
+
+        Args:
+            blocks: 音频块迭代器（采样率为 sample_rate）
+
+        Yields:
+            dict: 片段结果
+            {
+                "success": bool,
+                "final": False,
+                "index": int,       # 片段序号（按时间顺序）
+                "start": float,     # 起始时间（秒）
+                "end": float,       # 结束时间（秒）
+                "text": str,
+                "language": str
+            }
+            最后一条为完整结果
+            {
+                "success": bool,
+                "final": True,
+                "text": str,        # 按时间顺序拼接的全文
+                "language": str,
+                "segments": [{"index", "start", "end", "text", ...}, ...],
+                "duration": float   # 送入识别的语音总时长（秒）
+            }
+        """
+        results: Dict[int, Dict[str, Any]] = {}
+        group: List[Segment] = []
+        pending = set()
+        # 在途批次上限（每个线程一批，外加一批排队）：解码跟不上时暂停读取，
+        # 缓冲的音频不会随时长增长
+        max_pending = self.workers + 1
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="asr-long") as executor:
+            for segment in self.segments(blocks):
+                group.append(segment)
+                if len(group) < self.batch_size * self.workers:
+                    continue
+                for batch in self._batches(group):
+                    while len(pending) >= max_pending:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        yield from self._collect(finished, results)
+                    pending.add(executor.submit(self._decode, batch))
+                group = []
+
+            for batch in self._batches(group):
+                pending.add(executor.submit(self._decode, batch))
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from self._collect(finished, results)
+
+        segments = [results[i] for i in sorted(results)]
+        text = ""
+        for segment in segments:
+            if segment["success"]:
+                text = join_text(text, segment["text"])
+        languages = [s["language"] for s in segments if s["success"] and s["language"]]
+        yield {
+            "success": all(s["success"] for s in segments),
+            "final": True,
+            "text": text,
+            "language": max(set(languages), key=languages.count) if languages else "",
+            "segments": segments,
+            "duration": round(sum(s["end"] - s["start"] for s in segments), 3),
+        }
+
+    def _batches(self, group: List[Segment]) -> List[List[Segment]]:
+        """按时长排序后组批（长的先解码）"""
+        group = sorted(group, key=lambda segment: len(segment[2]), reverse=True)
+        return [group[i : i + self.batch_size] for i in range(0, len(group), self.batch_size)]
+
+    def _decode(self, batch: List[Segment]) -> List[Dict[str, Any]]:
+        """识别一批片段，单批失败不影响其他批次"""
+        try:
+            outputs = self.decode_batch([audio for _, _, audio in batch])
+        except Exception as e:
+            outputs = [{"success": False, "error": str(e)}] * len(batch)
+
+        results = []
+        for (index, start, audio), output in zip(batch, outputs):
+            result = {
+                "success": bool(output.get("success")),
+                "final": False,
+                "index": index,
+                "start": round(start / self.sample_rate, 3),
+                "end": round((start + len(audio)) / self.sample_rate, 3),
+                "text": (output.get("text") or "").strip(),
+                "language": output.get("language", ""),
+            }
+            if not result["success"]:
+                result["error"] = output.get("error", "识别失败")
+            results.append(result)
+        return results
+
+    @staticmethod
+    def _collect(finished, results: Dict[int, Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for future in finished:
+            for result in future.result():
+                results[result["index"]] = {k: v for k, v in result.items() if k != "final"}
+                yield result
@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics - 性能统计模块
+
+功能：
+- 延迟直方图：对数分桶，固定内存，O(1) 记录，输出 p50/p90/p99/max
+- 滑动窗口吞吐：按秒环形计数，输出最近 N 秒的每秒请求数
+- Prometheus 导出：计数器/仪表/直方图注册表，输出文本格式（零依赖）
+"""
+
+import math
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+
+class LatencyHistogram:
+    """
+    对数分桶延迟直方图（HDR 风格）
+
+    桶边界按固定比例递增，每个十倍区间 buckets_per_decade 个桶，
+    分位数相对误差约为 10^(1/buckets_per_decade) - 1（默认约 6%）
+    内存固定，与记录次数无关
+
+    Example:
+        hist = LatencyHistogram()
+        hist.record(0.123)
+        hist.percentile(99)
+    """
+
+    def __init__(
+        self,
+        min_value: float = 1e-4,
+        max_value: float = 1e3,
+        buckets_per_decade: int = 20,
+    ):
+        """
+        初始化直方图
+
+        Args:
+            min_value: 最小可区分值（秒），更小的值计入第一个桶
+            max_value: 最大可区分值（秒），更大的值计入溢出桶
+            buckets_per_decade: 每个十倍区间的桶数
+        """
+        self.min_value = min_value
+        self.max_value = max_value
+        self._scale = buckets_per_decade / math.log(10)
+        self._ratio = 10 ** (1.0 / buckets_per_decade)
+        # 桶 0: < min_value；桶 1..n: 对数区间；最后一个桶：>= max_value
+        n = int(math.ceil(math.log(max_value / min_value) * self._scale))
+        self._counts = [0] * (n + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        """记录一个值（调用方负责加锁）"""
+        if value < self.min_value:
+            index = 0
+        elif value >= self.max_value:
+            index = len(self._counts) - 1
+        else:
+            index = int(math.log(value / self.min_value) * self._scale) + 1
+        self._counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def upper_bound(self, index: int) -> float:
+        """桶 index 的上边界"""
+        if index >= len(self._counts) - 1:
+            return math.inf
+        return self.min_value * self._ratio ** index
+
+    def percentile(self, p: float) -> float:
+        """
+        计算分位数
+
+        Args:
+            p: 百分位（0-100）
+
+        Returns:
+            float: 分位数估计值（桶的几何中点，不超过实际最大值）
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(self.count * p / 100.0)))
+        seen = 0
+        for index, n in enumerate(self._counts):
+            seen += n
+            if seen >= rank:
+                if index == 0:
+                    return min(self.min_value, self.max)
+                if index == len(self._counts) - 1:
+                    return self.max
+                return min(self.min_value * self._ratio ** (index - 0.5), self.max)
+        return self.max
+
+    def buckets(self, bounds: Iterable[float]) -> List[Tuple[float, int]]:
+        """
+        按给定边界输出累计计数（用于导出到 Prometheus 等外部格式）
+
+        Args:
+            bounds: 升序上边界列表
+
+        Returns:
+            list: [(上边界, 小于等于该边界的累计计数), ...]
+                  边界落在桶内时按桶上边界归属，误差在一个桶以内
+        """
+        result = []
+        index = 0
+        seen = 0
+        for bound in bounds:
+            while index < len(self._counts) and self.upper_bound(index) <= bound:
+                seen += self._counts[index]
+                index += 1
+            result.append((bound, seen))
+        return result
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        获取统计摘要
+
+        Returns:
+            dict: count/avg/p50/p90/p99/max（秒）
+        """
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+    def reset(self):
+        """清空"""
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class RateWindow:
+    """
+    滑动窗口计数器
+
+    按秒分槽的环形数组，记录最近 size 秒内每秒的事件数
+
+    Example:
+        rate = RateWindow()
+        rate.add()
+        rate.rate(10)  # 最近 10 秒的每秒事件数
+    """
+
+    def __init__(self, size: int = 300):
+        """
+        Args:
+            size: 窗口总长度（秒）
+        """
+        self.size = size
+        self._seconds = [0] * size
+        self._counts = [0] * size
+
+    def add(self, n: int = 1, now: float = None):
+        """记录 n 个事件（调用方负责加锁）"""
+        second = int(now if now is not None else time.monotonic())
+        slot = second % self.size
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._counts[slot] = 0
+        self._counts[slot] += n
+
+    def rate(self, window: int, now: float = None) -> float:
+        """
+        最近 window 秒的平均每秒事件数
+
+        Args:
+            window: 窗口长度（秒，不超过 size）
+
+        Returns:
+            float: 每秒事件数
+        """
+        window = max(1, min(window, self.size))
+        current = int(now if now is not None else time.monotonic())
+        oldest = current - window
+        total = sum(
+            n for second, n in zip(self._seconds, self._counts) if oldest < second <= current
+        )
+        return total / window
+
+    def reset(self):
+        """清空"""
+        self._seconds = [0] * self.size
+        self._counts = [0] * self.size
+
+
+class StageStats:
+    """
+    单个处理阶段的统计：调用次数、错误数、进行中请求数、延迟分布、吞吐
+
+    线程安全，记录开销为一次加锁 + 常数次算术运算
+    """
+
+    # 吞吐统计窗口（秒）
+    WINDOWS = (10, 60, 300)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.throughput = RateWindow(max(self.WINDOWS))
+        self.errors = 0
+        self.in_flight = 0
+
+    @property
+    def count(self) -> int:
+        return self.latency.count
+
+    @property
+    def total_time(self) -> float:
+        return self.latency.total
+
+    def begin(self):
+        """阶段开始处理一条数据"""
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, elapsed: float, ok: bool = True):
+        """
+        阶段处理完一条数据
+
+        Args:
+            elapsed: 耗时（秒）
+            ok: 是否成功
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.latency.record(elapsed)
+            self.throughput.add()
+            if not ok:
+                self.errors += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        获取统计快照（数值均为秒或每秒次数）
+
+        Returns:
+            dict: count/errors/in_flight/total_time/avg_time/p50/p90/p99/max
+                  以及 throughput_10s/throughput_60s/throughput_300s
+        """
+        with self._lock:
+            latency = self.latency.snapshot()
+            now = time.monotonic()
+            stats = {
+                "count": latency["count"],
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "total_time": self.latency.total,
+                "avg_time": latency["avg"],
+                "p50": latency["p50"],
+                "p90": latency["p90"],
+                "p99": latency["p99"],
+                "max": latency["max"],
+            }
+            for window in self.WINDOWS:
+                stats[f"throughput_{window}s"] = self.throughput.rate(window, now)
+        return stats
+
+    def reset(self):
+        """清空统计（进行中请求数保留）"""
+        with self._lock:
+            self.latency.reset()
+            self.throughput.reset()
+            self.errors = 0
+
+
+# ==================== Prometheus 导出 ====================
+
+# 默认直方图导出边界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """带标签的指标基类"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, str]):
+        return tuple(sorted(labels.items()))
+
+    def samples(self):
+        """返回 [(后缀, 标签元组, 值), ...]"""
+        with self._lock:
+            return [("", key, value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    """只增计数器"""
+
+    type = "counter"
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def dec(self, value: float = 1, **labels):
+        self.inc(-value, **labels)
+
+    def total(self) -> float:
+        """所有标签组合的值之和"""
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Histogram(_Metric):
+    """直方图（内部使用 LatencyHistogram，导出时折算到固定边界）"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.bounds = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            hist = self._values.get(key)
+            if hist is None:
+                hist = self._values[key] = LatencyHistogram()
+            hist.record(value)
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, hist in self._values.items():
+                for bound, count in hist.buckets(self.bounds):
+                    result.append(("_bucket", key + (("le", _format_value(bound)),), count))
+                result.append(("_bucket", key + (("le", "+Inf"),), hist.count))
+                result.append(("_sum", key, hist.total))
+                result.append(("_count", key, hist.count))
+        return result
+
+
+class MetricsRegistry:
+    """
+    指标注册表，输出 Prometheus 文本格式（无需 prometheus_client）
+
+    Example:
+        registry = MetricsRegistry()
+        requests = registry.counter("app_requests_total", "请求数")
+        requests.inc(route="/tts", status="200")
+        registry.add_collector(lambda: [("app_queue_depth", "gauge", "队列长度", [({}, 3)])])
+        text = registry.render()
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, buckets=buckets)
+
+    def add_collector(self, collector):
+        """
+        注册采集函数（抓取时调用）
+
+        Args:
+            collector: 无参函数，返回
+                [(name, type, help, [(labels_dict, value), ...]), ...]
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        生成 Prometheus 文本格式
+
+        Returns:
+            str: text/plain; version=0.0.4 格式的指标
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(
+                    f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+                )
+
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"⚠️ 指标采集失败: {e}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(
+                        f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def process_memory() -> Dict[str, float]:
+    """
+    进程内存占用
+
+    Returns:
+        dict: rss_bytes（常驻内存），以及已加载 torch 且有 CUDA 时的
+              torch_allocated_bytes / torch_reserved_bytes
+    """
+    stats = {}
+    try:
+        import psutil
+
+        stats["rss_bytes"] = psutil.Process().memory_info().rss
+    except ImportError:
+        try:
+            # Linux：/proc/self/statm 第 2 列为常驻页数
+            with open("/proc/self/statm") as f:
+                stats["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    # 只在 torch 已被导入时采集，避免为了监控加载 torch
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            if torch.cuda.is_available():
+                stats["torch_allocated_bytes"] = torch.cuda.memory_allocated()
+                stats["torch_reserved_bytes"] = torch.cuda.memory_reserved()
+        except Exception:
+            pass
+    return stats
+
+
+def total_memory(device: str = "cpu") -> int:
+    """
+    设备总内存
+
+    Args:
+        device: cuda / cpu
+
+    Returns:
+        int: 字节数（无法获取时为 0）
+    """
+    if device == "cuda":
+        torch = sys.modules.get("torch")
+        try:
+            if torch is not None and torch.cuda.is_available():
+                return torch.cuda.get_device_properties(0).total_memory
+        except Exception:
+            pass
+        return 0
+
+    try:
+        import psutil
+
+        return psutil.virtual_memory().total
+    except ImportError:
+        try:
+            return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        except (OSError, ValueError, AttributeError):
+            return 0
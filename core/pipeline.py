@@ -8,21 +8,87 @@ Pipeline - 处理管道模块
 - 异步处理：非阻塞IO
 - 智能调度：优先级队列
 
-方案A状态：预留框架，暂未实现
+当前状态：
+- Pipeline.process_stream：多阶段线程流水线（有界队列背压、取消）
+- AsyncPipeline：asyncio 流水线（协程阶段 + 线程池/进程池阶段）
+- stream_reply：LLM→TTS 逐句流水线
+
+API 服务（/complete、/ws/voice）只使用 stream_reply：逐句 TTS 需要把同一句的
+音频块边合成边返回，不适合“每条输入产出一个结果”的阶段模型。
+Pipeline / AsyncPipeline 是供嵌入和批处理脚本使用的库接口，服务端不会创建，
+行为由 tests/test_pipeline.py 覆盖
 """
 
+import asyncio
+import contextvars
+import functools
+import heapq
+import queue
+import threading
 import time
-from typing import Generator, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Generator, Iterable, Optional
+
+from .metrics import StageStats
+
+# 阶段队列中的结束标记
+_END = object()
+
+
+class PipelineCancelled(Exception):
+    """管道运行被取消"""
+
+
+class _Run:
+    """一次 process_stream 运行的共享状态"""
+
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        self.error = None
+        self.lock = threading.Lock()
+
+    def fail(self, error):
+        with self.lock:
+            if self.error is None:
+                self.error = error
+        self.cancel_event.set()
+
+    def put(self, q, item, poll=0.1):
+        """阻塞写入（下游队列满时形成背压），取消时返回 False"""
+        while not self.cancel_event.is_set():
+            try:
+                q.put(item, timeout=poll)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q, poll=0.1):
+        """阻塞读取，取消时返回 _END"""
+        while not self.cancel_event.is_set():
+            try:
+                return q.get(timeout=poll)
+            except queue.Empty:
+                continue
+        return _END
 
 
 class Pipeline:
     """
     处理管道
 
-    未来功能：
-    - 流式ASR：边录音边识别
-    - 流式TTS：边生成边播放
-    - 流水线并行
+    - process: 串行处理单条数据
+    - process_stream: 多阶段流水线，每个阶段在独立线程中运行，
+      阶段之间通过有界队列连接，阶段 N 处理第 k+1 条数据的同时
+      阶段 N+1 处理第 k 条数据
+
+    Example:
+        pipeline = Pipeline({"queue_size": 4})
+        pipeline.add_stage("asr", asr_fn)
+        pipeline.add_stage("llm", llm_fn, concurrency=2)
+        pipeline.add_stage("tts", tts_fn)
+        for result in pipeline.process_stream(audio_iter):
+            play(result)
     """
 
     def __init__(self, config=None):
@@ -31,23 +97,31 @@ class Pipeline:
 
         Args:
             config: 配置字典
+                - queue_size: 阶段间队列默认容量（默认 8）
+                - ordered: 是否按输入顺序输出（默认 True）
         """
         self.config = config or {}
         self.stages = []
+        self._runs = set()
+        self._runs_lock = threading.Lock()
 
-    def add_stage(self, name, processor):
+    def add_stage(self, name, processor, concurrency=1, queue_size=None):
         """
         添加处理阶段
 
         Args:
             name: 阶段名称
             processor: 处理器函数/类
+            concurrency: 该阶段并发工作线程数
+            queue_size: 该阶段输入队列容量（默认使用 config.queue_size）
         """
         self.stages.append(
             {
                 "name": name,
                 "processor": processor,
-                "stats": {"count": 0, "total_time": 0},
+                "concurrency": max(1, int(concurrency)),
+                "queue_size": queue_size,
+                "stats": StageStats(),
             }
         )
 
@@ -62,67 +136,481 @@ class Pipeline:
         Returns:
             处理结果
         """
-        # 方案A：简单串行处理
         result = data
         for stage in self.stages:
-            start = time.time()
-            result = stage["processor"](result, **kwargs)
-            elapsed = time.time() - start
-            stage["stats"]["count"] += 1
-            stage["stats"]["total_time"] += elapsed
+            result = self._run_stage(stage, result, **kwargs)
         return result
 
-    def process_stream(self, data_stream, **kwargs) -> Generator:
+    def process_stream(self, data_stream: Iterable, **kwargs) -> Generator:
         """
-        流式处理（方案C实现）
+        流式处理（多阶段流水线）
 
         Args:
-            data_stream: 数据流
-            **kwargs: 额外参数
+            data_stream: 输入数据迭代器
+            **kwargs: 传给每个处理器的额外参数
 
         Yields:
-            处理结果片段
+            每条输入数据经过全部阶段后的结果（ordered=True 时保持输入顺序）
+
+        Raises:
+            任一阶段抛出的异常（其余阶段随即取消）
+            PipelineCancelled: 被 cancel() 取消
         """
-        # 方案C：实现真正的流式处理
-        # 当前方案A：简单yield结果
-        result = self.process(data_stream, **kwargs)
-        yield result
+        if not self.stages:
+            yield from data_stream
+            return
+
+        run = _Run()
+        with self._runs_lock:
+            self._runs.add(run)
+
+        default_size = self.config.get("queue_size", 8)
+        queues = [
+            queue.Queue(maxsize=stage["queue_size"] or default_size)
+            for stage in self.stages
+        ]
+        output = queue.Queue(maxsize=default_size)
+        queues.append(output)
+
+        threads = [
+            threading.Thread(
+                target=self._feed, args=(run, data_stream, queues[0]), daemon=True
+            )
+        ]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage["concurrency"]]
+            for n in range(stage["concurrency"]):
+                threads.append(
+                    threading.Thread(
+                        target=self._work,
+                        args=(run, stage, queues[index], queues[index + 1], remaining),
+                        kwargs=kwargs,
+                        name=f"pipeline-{stage['name']}-{n}",
+                        daemon=True,
+                    )
+                )
+        for t in threads:
+            t.start()
+
+        ordered = self.config.get("ordered", True)
+        pending = []  # (seq, result) 小顶堆，用于恢复输入顺序
+        next_seq = 0
+        try:
+            while True:
+                item = run.get(output)
+                if item is _END:
+                    break
+                if not ordered:
+                    yield item[1]
+                    continue
+                heapq.heappush(pending, item)
+                while pending and pending[0][0] == next_seq:
+                    yield heapq.heappop(pending)[1]
+                    next_seq += 1
+
+            if run.error is not None:
+                raise run.error
+            while pending:
+                yield heapq.heappop(pending)[1]
+        finally:
+            # 正常结束、异常或调用方提前关闭生成器，都要停止所有工作线程
+            run.cancel_event.set()
+            for t in threads:
+                t.join(timeout=1.0)
+            with self._runs_lock:
+                self._runs.discard(run)
+
+    def cancel(self):
+        """取消所有正在运行的 process_stream"""
+        with self._runs_lock:
+            runs = list(self._runs)
+        for run in runs:
+            run.fail(PipelineCancelled("管道已取消"))
+
+    def _run_stage(self, stage, data, **kwargs):
+        """执行单个阶段并记录统计"""
+        stats = stage["stats"]
+        stats.begin()
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = stage["processor"](data, **kwargs)
+            ok = True
+            return result
+        finally:
+            stats.end(time.perf_counter() - start, ok)
+
+    def _feed(self, run, data_stream, first_queue):
+        """输入线程：把数据流写入第一个阶段"""
+        try:
+            for seq, data in enumerate(data_stream):
+                if not run.put(first_queue, (seq, data)):
+                    return
+        except Exception as e:
+            run.fail(e)
+            return
+        run.put(first_queue, _END)
+
+    def _work(self, run, stage, in_queue, out_queue, remaining, **kwargs):
+        """阶段工作线程"""
+        while True:
+            item = run.get(in_queue)
+            if item is _END:
+                # 结束标记放回，通知同阶段的其他工作线程；最后一个线程向下游传递
+                with run.lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    run.put(out_queue, _END)
+                else:
+                    run.put(in_queue, _END)
+                return
+
+            seq, data = item
+            try:
+                result = self._run_stage(stage, data, **kwargs)
+            except Exception as e:
+                run.fail(e)
+                return
+            if not run.put(out_queue, (seq, result)):
+                return
 
     def get_stats(self):
         """
         获取管道统计信息
 
         Returns:
-            dict: 各阶段统计
-        """
-        stats = {}
-        for stage in self.stages:
-            s = stage["stats"]
-            avg_time = s["total_time"] / s["count"] if s["count"] > 0 else 0
-            stats[stage["name"]] = {
-                "count": s["count"],
-                "avg_time": f"{avg_time:.3f}s",
-                "total_time": f"{s['total_time']:.3f}s",
+            dict: 各阶段统计（数值，时间单位为秒）
+            {
+                "asr": {
+                    "count": int, "errors": int, "in_flight": int,
+                    "total_time": float, "avg_time": float,
+                    "p50": float, "p90": float, "p99": float, "max": float,
+                    "throughput_10s": float,   # 最近 10 秒每秒处理数
+                    "throughput_60s": float,
+                    "throughput_300s": float
+                },
+                ...
             }
-        return stats
+        """
+        return {stage["name"]: stage["stats"].snapshot() for stage in self.stages}
 
     def reset_stats(self):
         """重置统计信息"""
         for stage in self.stages:
-            stage["stats"] = {"count": 0, "total_time": 0}
+            stage["stats"].reset()
 
 
 class AsyncPipeline(Pipeline):
     """
-    异步处理管道（方案C实现）
+    异步处理管道（asyncio）
 
     支持：
-    - 异步IO
-    - 并发处理
-    - 背压控制
+    - 异步IO：协程阶段（如 Ollama HTTP 调用）直接在事件循环中运行
+    - 并发处理：阻塞阶段（如 SenseVoice/CosyVoice 推理）交给独立的线程池或进程池
+    - 背压控制：阶段之间通过 asyncio.Queue(maxsize) 连接
+
+    单个进程即可同时处理大量请求，无需每个请求占用一个线程
+
+    Example:
+        pipeline = AsyncPipeline(config["advanced"]["concurrency"])
+        pipeline.add_stage("asr", asr.transcribe, executor="thread", concurrency=1)
+        pipeline.add_stage("llm", llm_coroutine)
+        pipeline.add_stage("tts", tts.synthesize_bytes, executor="thread")
+        result = await pipeline.process_async(audio_bytes)
     """
 
+    def __init__(self, config=None):
+        """
+        初始化异步管道
+
+        Args:
+            config: 配置字典（通常为 advanced.concurrency）
+                - max_workers: 每个阶段默认并发数（默认 4）
+                - timeout: 单个请求超时时间（秒，0 表示不限制，默认 60）
+                - queue_size: 阶段间队列默认容量（默认 8）
+                - ordered: process_stream_async 是否按输入顺序输出（默认 True）
+        """
+        super().__init__(config)
+        self.max_workers = max(1, int(self.config.get("max_workers", 4)))
+        self.timeout = self.config.get("timeout", 60) or None
+
+    def add_stage(
+        self, name, processor, concurrency=None, queue_size=None, executor=None
+    ):
+        """
+        添加处理阶段
+
+        Args:
+            name: 阶段名称
+            processor: 处理器（协程函数或普通函数）
+            concurrency: 该阶段最大并发数（默认 max_workers）
+            queue_size: 该阶段输入队列容量（默认使用 config.queue_size）
+            executor: 阻塞函数的执行方式
+                - None: 协程函数直接运行，普通函数使用线程池
+                - "thread": 独立线程池
+                - "process": 独立进程池（processor 及数据需可 pickle）
+                - concurrent.futures.Executor: 使用传入的执行器
+        """
+        super().add_stage(
+            name, processor, concurrency or self.max_workers, queue_size
+        )
+        stage = self.stages[-1]
+        stage["is_coroutine"] = asyncio.iscoroutinefunction(processor)
+        stage["executor"] = executor
+        stage["pool"] = None if isinstance(executor, (str, type(None))) else executor
+        stage["owns_pool"] = False
+        stage["semaphore"] = None
+
     async def process_async(self, data, **kwargs):
-        """异步处理"""
-        # 方案C实现
-        return self.process(data, **kwargs)
+        """
+        异步处理单条数据（依次经过所有阶段）
+
+        Args:
+            data: 输入数据
+            **kwargs: 传给每个处理器的额外参数
+
+        Returns:
+            处理结果
+
+        Raises:
+            asyncio.TimeoutError: 超过 timeout
+        """
+
+        async def run_all():
+            result = data
+            for stage in self.stages:
+                async with self._semaphore(stage):
+                    result = await self._call_stage(stage, result, **kwargs)
+            return result
+
+        return await asyncio.wait_for(run_all(), self.timeout)
+
+    async def process_stream_async(self, data_stream, **kwargs):
+        """
+        异步流式处理（多阶段流水线）
+
+        每个阶段启动 concurrency 个 worker 任务，阶段之间通过有界
+        asyncio.Queue 连接；下游处理不过来时上游 put 会挂起
+
+        Args:
+            data_stream: 输入数据（可迭代对象或异步可迭代对象）
+            **kwargs: 传给每个处理器的额外参数
+
+        Yields:
+            每条输入数据经过全部阶段后的结果
+
+        Raises:
+            任一阶段抛出的异常（包括单条数据单阶段超时 asyncio.TimeoutError）
+        """
+        if not self.stages:
+            async for item in _aiter(data_stream):
+                yield item
+            return
+
+        default_size = self.config.get("queue_size", 8)
+        queues = [
+            asyncio.Queue(maxsize=stage["queue_size"] or default_size)
+            for stage in self.stages
+        ]
+        output = asyncio.Queue(maxsize=default_size)
+        queues.append(output)
+
+        async def feed():
+            seq = 0
+            async for data in _aiter(data_stream):
+                await queues[0].put((seq, data))
+                seq += 1
+            await queues[0].put(_END)
+
+        async def work(stage, in_queue, out_queue, remaining):
+            while True:
+                item = await in_queue.get()
+                if item is _END:
+                    remaining[0] -= 1
+                    await (out_queue if remaining[0] == 0 else in_queue).put(_END)
+                    return
+                seq, data = item
+                result = await asyncio.wait_for(
+                    self._call_stage(stage, data, **kwargs), self.timeout
+                )
+                await out_queue.put((seq, result))
+
+        tasks = [asyncio.ensure_future(feed())]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage["concurrency"]]
+            for _ in range(stage["concurrency"]):
+                tasks.append(
+                    asyncio.ensure_future(
+                        work(stage, queues[index], queues[index + 1], remaining)
+                    )
+                )
+
+        # 任一任务出错时向输出队列投递结束标记，唤醒消费方
+        failed = []
+
+        def on_done(task):
+            if not task.cancelled() and task.exception() is not None:
+                failed.append(task.exception())
+                if not output.full():
+                    output.put_nowait(_END)
+
+        for task in tasks:
+            task.add_done_callback(on_done)
+
+        ordered = self.config.get("ordered", True)
+        pending = []
+        next_seq = 0
+        try:
+            while True:
+                item = await output.get()
+                if failed:
+                    raise failed[0]
+                if item is _END:
+                    break
+                if not ordered:
+                    yield item[1]
+                    continue
+                heapq.heappush(pending, item)
+                while pending and pending[0][0] == next_seq:
+                    yield heapq.heappop(pending)[1]
+                    next_seq += 1
+        finally:
+            # Python 3.11 及以前，wait_for 的内部任务恰好完成时会吞掉取消，worker 随后
+            # 阻塞在已满的队列上；重复取消直到所有任务结束
+            remaining_tasks = set(tasks)
+            while remaining_tasks:
+                for task in remaining_tasks:
+                    task.cancel()
+                _, remaining_tasks = await asyncio.wait(remaining_tasks, timeout=0.1)
+
+    def shutdown(self, wait=True):
+        """关闭本管道创建的线程池/进程池"""
+        for stage in self.stages:
+            if stage.get("owns_pool") and stage["pool"] is not None:
+                stage["pool"].shutdown(wait=wait)
+                stage["pool"] = None
+                stage["owns_pool"] = False
+
+    def _semaphore(self, stage):
+        """获取阶段并发信号量（按事件循环创建）"""
+        loop = asyncio.get_running_loop()
+        cached = stage["semaphore"]
+        if cached is None or cached[0] is not loop:
+            cached = (loop, asyncio.Semaphore(stage["concurrency"]))
+            stage["semaphore"] = cached
+        return cached[1]
+
+    def _get_pool(self, stage):
+        """获取阶段执行器（首次使用时创建）"""
+        if stage["pool"] is None:
+            if stage["executor"] == "process":
+                stage["pool"] = ProcessPoolExecutor(max_workers=stage["concurrency"])
+            else:
+                stage["pool"] = ThreadPoolExecutor(
+                    max_workers=stage["concurrency"],
+                    thread_name_prefix=f"pipeline-{stage['name']}",
+                )
+            stage["owns_pool"] = True
+        return stage["pool"]
+
+    async def _call_stage(self, stage, data, **kwargs):
+        """执行单个阶段并记录统计"""
+        stats = stage["stats"]
+        stats.begin()
+        start = time.perf_counter()
+        ok = False
+        try:
+            if stage["is_coroutine"] and stage["executor"] is None:
+                result = await stage["processor"](data, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._get_pool(stage),
+                    functools.partial(stage["processor"], data, **kwargs),
+                )
+            ok = True
+            return result
+        finally:
+            stats.end(time.perf_counter() - start, ok)
+
+
+async def _aiter(data_stream):
+    """将普通可迭代对象和异步可迭代对象统一为异步迭代"""
+    if hasattr(data_stream, "__aiter__"):
+        async for item in data_stream:
+            yield item
+    else:
+        for item in data_stream:
+            yield item
+
+
+def stream_reply(llm, tts, message, voice=None, history=None, segmenter=None, **llm_kwargs):
+    """
+    流水线式回复：LLM 流式生成与逐句 TTS 并行
+
+    LLM 在后台线程中流式生成并断句，主线程逐句进行流式合成，
+    第 1 句的音频在 LLM 生成第 2 句时就已开始输出
+
+    Args:
+        llm: LLM 插件（需支持 stream_chat）
+        tts: TTS 插件（需支持 synthesize_stream）
+        message: 用户消息
+        voice: 音色名称
+        history: 历史对话
+        segmenter: 断句器（默认 SentenceSegmenter()）
+        **llm_kwargs: 传给 stream_chat 的生成参数
+
+    Yields:
+        tuple: (sentence, chunk) 句子文本和对应的音频片段
+    """
+    from .segmenter import SentenceSegmenter
+    from .tracing import mark
+
+    segmenter = segmenter or SentenceSegmenter()
+    sentences = queue.Queue()
+    stop_event = threading.Event()
+
+    def emit(sentence):
+        mark("llm.first_sentence")
+        sentences.put(sentence)
+
+    def produce():
+        try:
+            stream = llm.stream_chat(message, history, **llm_kwargs)
+            try:
+                for piece in stream:
+                    if stop_event.is_set():
+                        return
+                    mark("llm.first_token")
+                    for sentence in segmenter.feed(piece):
+                        emit(sentence)
+            finally:
+                # 提前结束时关闭 HTTP 流
+                if hasattr(stream, "close"):
+                    stream.close()
+            for sentence in segmenter.flush():
+                emit(sentence)
+        except Exception as e:
+            sentences.put(e)
+        finally:
+            sentences.put(None)
+
+    # 在调用方上下文的副本中运行，使追踪上下文传递到 LLM 线程
+    producer = threading.Thread(
+        target=contextvars.copy_context().run, args=(produce,), name="llm-stream", daemon=True
+    )
+    producer.start()
+
+    try:
+        while True:
+            item = sentences.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            for chunk in tts.synthesize_stream(item, voice):
+                yield item, chunk
+    finally:
+        # 调用方中途退出（如客户端断开）时通知 LLM 线程停止
+        stop_event.set()
@@ -7,16 +7,107 @@ Plugin Manager - 插件管理模块
 - 插件发现：自动识别可用插件
 - 版本管理：插件依赖检查
 - 热加载：运行时更新
+- 生命周期：首次使用时加载（lazy）、空闲超时卸载、内存预算内按 LRU 淘汰
+
+对应配置：
+    plugins:
+      lazy: false          # 首次使用时才加载模型
+      idle_timeout: 0      # 空闲多少秒后卸载（0 表示不卸载，可在 models.<type> 中单独配置）
+    models.<type>:
+      memory_mb: 0         # 插件内存占用（0 表示加载时实测；实测的加载逐个进行，指定后可与其他插件并行加载）
+    advanced.gpu:
+      memory_fraction: 0.8 # 插件可用内存占设备总内存的比例（CUDA 为显存，否则为内存）
+      memory_budget_mb: 0  # 直接指定预算（优先于 memory_fraction）
 
 方案A状态：预留框架，基础功能
 """
 
+import functools
+import gc
+import inspect
 import os
 import sys
 import importlib
 import importlib.util
+import threading
+import time
+from contextlib import contextmanager
 from typing import Dict, Type, Any
 
+from .metrics import process_memory, total_memory
+
+# 代理直接转发、不触发加载的方法
+_PASSTHROUGH = {
+    "name",
+    "model",
+    "config",
+    "version",
+    "get_supported_languages",
+    "get_supported_formats",
+    "prepare_audio",
+}
+
+
+class ManagedPlugin:
+    """
+    插件代理
+
+    调用插件方法时确保模型已加载并记录使用时间，
+    调用期间（含流式生成器）插件不会被卸载
+    """
+
+    def __init__(self, manager: "PluginManager", key: str):
+        self._manager = manager
+        self._key = key
+        self._instance = manager._entries[key]["instance"]
+
+    def __getattr__(self, attr):
+        value = getattr(self._instance, attr)
+        if attr.startswith("_") or attr in _PASSTHROUGH or not callable(value):
+            return value
+
+        manager, key = self._manager, self._key
+
+        @functools.wraps(value)
+        def call(*args, **kwargs):
+            manager._acquire(key)
+            try:
+                result = getattr(self._instance, attr)(*args, **kwargs)
+            except BaseException:
+                manager._release(key)
+                raise
+            if inspect.isgenerator(result):
+                return manager._hold(key, result)
+            manager._release(key)
+            return result
+
+        return call
+
+    def load(self, config: dict = None) -> bool:
+        """加载模型（已加载时直接返回）"""
+        return self._manager.activate(self._key)
+
+    def is_loaded(self) -> bool:
+        """
+        插件是否可用
+
+        lazy 模式下未加载的插件也视为可用（首次调用时加载）
+        """
+        return self._manager._entries[self._key]["state"] != "failed" and (
+            self._manager.lazy or self._instance.is_loaded()
+        )
+
+    def is_resident(self) -> bool:
+        """模型是否已在内存中"""
+        return self._instance.is_loaded()
+
+    def cleanup(self):
+        """卸载模型（空闲时）"""
+        self._manager.deactivate(self._key)
+
+    def __repr__(self):
+        return f"<ManagedPlugin {self._key}>"
+
 
 class PluginManager:
     """
@@ -27,6 +118,12 @@ class PluginManager:
     - 自动发现插件
     - 动态加载
     - 依赖管理
+
+    Example:
+        manager = PluginManager({"lazy": True, "idle_timeout": 600})
+        manager.register("asr", "sensevoice", SenseVoiceASR)
+        asr = manager.load("asr", "sensevoice", asr_config)
+        asr.transcribe(audio)  # 首次调用时加载模型
     """
 
     def __init__(self, config=None):
@@ -35,14 +132,31 @@ class PluginManager:
 
         Args:
             config: 配置字典
+                - lazy: 首次使用时加载
+                - idle_timeout: 默认空闲卸载时间（秒）
+                - memory_fraction: 内存预算占设备总内存比例
+                - memory_budget_mb: 内存预算（MB，优先）
         """
         self.config = config or {}
+        self.lazy = self.config.get("lazy", False)
+        self.idle_timeout = self.config.get("idle_timeout", 0) or 0
+        self.memory_fraction = self.config.get("memory_fraction", 0) or 0
+        self.memory_budget = int((self.config.get("memory_budget_mb", 0) or 0) * 1024 * 1024)
+
         self.plugins = {
             "asr": {},  # name -> class
             "tts": {},
             "llm": {},
         }
-        self.instances = {}  # name -> instance
+        self.instances = {}  # name -> ManagedPlugin
+        self._entries = {}  # name -> 生命周期状态
+        self._lock = threading.Lock()
+        # 加载计数：实测内存的加载独占进行，避免把同时加载的其他插件计入增量
+        self._load_cond = threading.Condition()
+        self._loading = 0
+        self._measuring = False
+        self._reaper = None
+        self._stop = threading.Event()
 
     def register(self, plugin_type: str, name: str, plugin_class: Type):
         """
@@ -69,7 +183,7 @@ class PluginManager:
             config: 插件配置
 
         Returns:
-            插件实例
+            ManagedPlugin: 插件代理（模型在 activate 或首次调用时加载）
         """
         instance_key = f"{plugin_type}:{name}"
 
@@ -82,17 +196,309 @@ class PluginManager:
             raise ValueError(f"插件未注册: [{plugin_type}] {name}")
 
         plugin_class = self.plugins[plugin_type][name]
+        config = config or {}
 
         # 创建实例
         try:
-            instance = plugin_class(config or {})
-            self.instances[instance_key] = instance
-            print(f"✅ 插件加载成功: [{plugin_type}] {name}")
-            return instance
+            instance = plugin_class(config)
         except Exception as e:
             print(f"❌ 插件加载失败: [{plugin_type}] {name} - {e}")
             raise
 
+        idle_timeout = config.get("idle_timeout", self.idle_timeout) or 0
+        self._entries[instance_key] = {
+            "instance": instance,
+            "config": config,
+            "state": "unloaded",  # unloaded/loaded/unloading/failed
+            "lock": threading.Lock(),  # 加载/卸载锁
+            "active": 0,  # 进行中的调用数
+            "last_used": time.time(),
+            "idle_timeout": idle_timeout,
+            # 内存占用：配置值优先，否则使用加载时测得的增量
+            "memory": int(config.get("memory_mb", 0) * 1024 * 1024),
+            "memory_fixed": bool(config.get("memory_mb")),
+            "loads": 0,
+            "unloads": 0,
+        }
+        proxy = ManagedPlugin(self, instance_key)
+        self.instances[instance_key] = proxy
+        if idle_timeout:
+            self._start_reaper()
+        print(f"✅ 插件注册实例: [{plugin_type}] {name}" + ("（首次使用时加载）" if self.lazy else ""))
+        return proxy
+
+    # ==================== 生命周期 ====================
+
+    def activate(self, instance_key: str) -> bool:
+        """
+        加载插件模型（必要时先按 LRU 淘汰其他空闲插件以满足内存预算）
+
+        Returns:
+            bool: 是否加载成功
+        """
+        entry = self._entries[instance_key]
+        with entry["lock"]:
+            if entry["state"] == "loaded":
+                return True
+
+            measure = not entry["memory_fixed"]
+            start = time.perf_counter()
+            with self._load_slot(measure):
+                self._reserve(instance_key, entry["memory"])
+                before = self._memory_used()
+                try:
+                    ok = entry["instance"].load(entry["config"])
+                except Exception as e:
+                    print(f"❌ 插件加载失败: {instance_key} - {e}")
+                    ok = False
+                if ok is not False and measure:
+                    entry["memory"] = max(0, self._memory_used() - before)
+            if ok is False:
+                with self._lock:
+                    entry["state"] = "failed"
+                return False
+
+            with self._lock:
+                entry["state"] = "loaded"
+                entry["last_used"] = time.time()
+                entry["loads"] += 1
+            print(
+                f"✅ 插件已加载: {instance_key}（{time.perf_counter() - start:.1f}s，"
+                f"约 {entry['memory'] / 1024 / 1024:.0f}MB）"
+            )
+
+        # 实测占用可能超出预估，加载后再检查一次预算
+        self._reserve(instance_key, 0)
+        return True
+
+    @contextmanager
+    def _load_slot(self, measure: bool):
+        """
+        加载期间占用加载名额
+
+        内存按加载前后的进程（或显存）占用差计算，同时进行的加载会互相计入；
+        实测的加载等其他加载完成后独占进行，指定了 memory_mb 的插件之间仍可并行加载
+        """
+        with self._load_cond:
+            self._load_cond.wait_for(
+                lambda: not self._measuring and not (measure and self._loading)
+            )
+            self._loading += 1
+            self._measuring = measure
+        try:
+            yield
+        finally:
+            with self._load_cond:
+                self._loading -= 1
+                self._measuring = False
+                self._load_cond.notify_all()
+
+    def deactivate(self, instance_key: str, force: bool = False) -> bool:
+        """
+        卸载插件模型（保留实例，下次调用时重新加载）
+
+        Args:
+            instance_key: 插件键
+            force: 忽略进行中的调用强制卸载
+
+        Returns:
+            bool: 是否已卸载
+        """
+        entry = self._entries.get(instance_key)
+        if entry is None:
+            return False
+        with entry["lock"]:
+            return self._unload_locked(instance_key, entry, force)
+
+    def _unload_locked(self, instance_key: str, entry: dict, force: bool = False) -> bool:
+        """卸载（调用方持有 entry["lock"]）"""
+        with self._lock:
+            if entry["state"] != "loaded" or (entry["active"] and not force):
+                return False
+            # 之后开始的调用会看到 unloading，等待卸载完成后重新加载
+            entry["state"] = "unloading"
+
+        try:
+            entry["instance"].cleanup()
+        except Exception as e:
+            print(f"⚠️ 插件清理失败: {instance_key} - {e}")
+        self._free_memory()
+
+        with self._lock:
+            entry["state"] = "unloaded"
+            entry["unloads"] += 1
+        print(f"🔄 插件已卸载: {instance_key}")
+        return True
+
+    def _acquire(self, instance_key: str):
+        """开始一次调用：计数并确保模型已加载"""
+        entry = self._entries[instance_key]
+        with self._lock:
+            entry["active"] += 1
+            entry["last_used"] = time.time()
+            loaded = entry["state"] == "loaded"
+        if not loaded and not self.activate(instance_key):
+            self._release(instance_key)
+            raise RuntimeError(f"插件加载失败: {instance_key}")
+
+    def _release(self, instance_key: str):
+        entry = self._entries[instance_key]
+        with self._lock:
+            entry["active"] -= 1
+            entry["last_used"] = time.time()
+
+    def _hold(self, instance_key: str, generator):
+        """流式调用：生成器结束（或被关闭）时才释放"""
+        try:
+            yield from generator
+        finally:
+            self._release(instance_key)
+
+    # ==================== 内存预算 ====================
+
+    def _device(self) -> str:
+        torch = sys.modules.get("torch")
+        try:
+            if torch is not None and torch.cuda.is_available():
+                return "cuda"
+        except Exception:
+            pass
+        return "cpu"
+
+    def _budget(self) -> int:
+        """内存预算（字节，0 表示不限制）"""
+        if self.memory_budget:
+            return self.memory_budget
+        if not self.memory_fraction:
+            return 0
+        return int(total_memory(self._device()) * self.memory_fraction)
+
+    def _memory_used(self) -> int:
+        """当前设备的内存占用（CUDA 为 torch 已分配显存，否则为进程常驻内存）"""
+        memory = process_memory()
+        if self._device() == "cuda":
+            return memory.get("torch_allocated_bytes", 0)
+        return memory.get("rss_bytes", 0)
+
+    def _reserve(self, instance_key: str, needed: int):
+        """按 LRU 卸载空闲插件，直到已加载插件占用 + needed 不超过预算"""
+        budget = self._budget()
+        if not budget:
+            return
+
+        while True:
+            with self._lock:
+                loaded = [
+                    (k, e)
+                    for k, e in self._entries.items()
+                    if e["state"] == "loaded" and k != instance_key
+                ]
+                used = sum(e["memory"] for _, e in loaded)
+                if instance_key in self._entries and self._entries[instance_key]["state"] == "loaded":
+                    used += self._entries[instance_key]["memory"]
+                if used + needed <= budget:
+                    return
+                idle = sorted(
+                    ((k, e) for k, e in loaded if not e["active"]),
+                    key=lambda item: item[1]["last_used"],
+                )
+            if not idle:
+                print(
+                    f"⚠️ 内存预算不足: 已用 {used / 1024 / 1024:.0f}MB + "
+                    f"需要 {needed / 1024 / 1024:.0f}MB > 预算 {budget / 1024 / 1024:.0f}MB"
+                )
+                return
+
+            # 正在加载/卸载的插件跳过（避免两个插件互相淘汰时死锁）
+            for victim_key, victim in idle:
+                if victim["lock"].acquire(blocking=False):
+                    try:
+                        evicted = self._unload_locked(victim_key, victim)
+                    finally:
+                        victim["lock"].release()
+                    if evicted:
+                        print(f"   ↳ 为 {instance_key} 腾出内存，淘汰 {victim_key}")
+                        break
+            else:
+                return
+
+    @staticmethod
+    def _free_memory():
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            try:
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except Exception:
+                pass
+
+    # ==================== 空闲卸载 ====================
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        self._reaper = threading.Thread(
+            target=self._reap_loop, name="plugin-reaper", daemon=True
+        )
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._stop.is_set():
+            timeouts = [e["idle_timeout"] for e in self._entries.values() if e["idle_timeout"]]
+            interval = max(1.0, min(timeouts) / 4) if timeouts else 5.0
+            if self._stop.wait(interval):
+                return
+            self.unload_idle()
+
+    def unload_idle(self) -> int:
+        """
+        卸载空闲超时的插件
+
+        Returns:
+            int: 卸载的插件数
+        """
+        now = time.time()
+        with self._lock:
+            expired = [
+                k
+                for k, e in self._entries.items()
+                if e["idle_timeout"]
+                and e["state"] == "loaded"
+                and not e["active"]
+                and now - e["last_used"] > e["idle_timeout"]
+            ]
+        return sum(1 for key in expired if self.deactivate(key))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取插件生命周期统计
+
+        Returns:
+            dict: 预算、已用内存及各插件状态
+        """
+        now = time.time()
+        with self._lock:
+            plugins = {
+                key: {
+                    "state": e["state"],
+                    "active": e["active"],
+                    "memory_mb": round(e["memory"] / 1024 / 1024, 1),
+                    "idle_seconds": round(now - e["last_used"], 1),
+                    "idle_timeout": e["idle_timeout"],
+                    "loads": e["loads"],
+                    "unloads": e["unloads"],
+                }
+                for key, e in self._entries.items()
+            }
+            used = sum(e["memory"] for e in self._entries.values() if e["state"] == "loaded")
+        return {
+            "lazy": self.lazy,
+            "budget_mb": round(self._budget() / 1024 / 1024, 1),
+            "used_mb": round(used / 1024 / 1024, 1),
+            "plugins": plugins,
+        }
+
     def get(self, plugin_type: str, name: str):
         """
         获取已加载的插件实例
@@ -131,15 +537,15 @@ class PluginManager:
         """
         instance_key = f"{plugin_type}:{name}"
         if instance_key in self.instances:
-            # 调用清理方法（如果有）
-            instance = self.instances[instance_key]
-            if hasattr(instance, "cleanup"):
-                instance.cleanup()
+            # 调用清理方法
+            self.deactivate(instance_key, force=True)
             del self.instances[instance_key]
+            del self._entries[instance_key]
             print(f"✅ 插件卸载成功: [{plugin_type}] {name}")
 
     def unload_all(self):
         """卸载所有插件"""
+        self._stop.set()
         for key in list(self.instances.keys()):
             plugin_type, name = key.split(":")
             self.unload(plugin_type, name)
@@ -3,34 +3,304 @@
 Router - 智能路由模块
 
 功能（方案C实现）：
-- 本地/云端路由：自动选择处理后端
-- 负载均衡：多实例分发
-- 故障转移：主备切换
-- 模型选择：根据任务选择最优模型
-
-方案A状态：预留框架，暂未实现
+- 后端注册：进程内插件、本地工作进程池、远程 VoiceForge 节点（HTTP）
+- 健康探测：后台定期探测各后端的健康状态和负载
+- 负载均衡：最少未完成请求（least outstanding requests）
+- 故障转移：连续失败的后端被摘除，冷却后重新探测恢复；失败请求自动重试其他后端
+- 背压：远程节点限流（429 / 带 Retry-After 的 503）不计为故障，仅在 Retry-After 内暂停分发
+- 音色亲和：按音色一致性哈希，同一音色优先落在同一节点，保持说话人缓存热度
+- 模型选择：根据任务选择模型
 """
 
+import bisect
+import hashlib
+import io
+import math
 import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
 from enum import Enum
+from typing import Dict, Optional
 
 
 class BackendType(Enum):
     """后端类型"""
 
-    LOCAL = "local"
+    LOCAL = "local"  # 进程内插件
+    WORKER = "worker"  # 本地工作进程池
+    REMOTE = "remote"  # 远程 VoiceForge 节点
     CLOUD = "cloud"
     EDGE = "edge"
 
 
+class NoBackendError(RuntimeError):
+    """没有可用后端"""
+
+
+class BackendBusy(RuntimeError):
+    """
+    后端限流（背压），不是故障
+
+    Attributes:
+        retry_after: 建议的重试间隔（秒）
+    """
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Backend:
+    """
+    后端基类
+
+    子类实现 invoke（执行任务）和 probe（健康/负载探测）
+    """
+
+    type = BackendType.LOCAL
+
+    def __init__(self, name: str, tasks=("asr", "tts", "llm")):
+        """
+        Args:
+            name: 后端名称（唯一）
+            tasks: 支持的任务类型
+        """
+        self.name = name
+        self.tasks = set(tasks)
+        self.healthy = True
+        self.load = 0  # 探测得到的后端自身负载（进行中请求数）
+        self.outstanding = 0  # 本路由器发往该后端、尚未完成的请求数
+        self.failures = 0  # 连续失败次数
+        self.ejected_until = 0.0
+        self.busy_until = 0.0  # 限流期：Retry-After 到期前不再分发
+        self.latency = 0.0  # 请求耗时 EWMA（秒）
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def invoke(self, task_type: str, method: str, *args, **kwargs):
+        """执行任务"""
+        raise NotImplementedError
+
+    def probe(self) -> dict:
+        """
+        健康/负载探测
+
+        Returns:
+            dict: {"healthy": bool, "load": int}
+        """
+        return {"healthy": True, "load": 0}
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > time.monotonic()
+
+    @property
+    def busy(self) -> bool:
+        return self.busy_until > time.monotonic()
+
+    def available(self, task_type: str) -> bool:
+        return task_type in self.tasks and self.healthy and not self.ejected and not self.busy
+
+    def get_status(self) -> dict:
+        return {
+            "type": self.type.value,
+            "tasks": sorted(self.tasks),
+            "healthy": self.healthy,
+            "ejected": self.ejected,
+            "busy": self.busy,
+            "load": self.load,
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+            "latency": self.latency,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled": self.throttled,
+        }
+
+
+class LocalBackend(Backend):
+    """
+    进程内后端：直接调用插件实例
+
+    Example:
+        LocalBackend("local", {"asr": asr_model, "tts": tts_model})
+    """
+
+    def __init__(self, name: str, plugins: Dict[str, object], backend_type=BackendType.LOCAL):
+        """
+        Args:
+            name: 后端名称
+            plugins: 任务类型 -> 插件实例（也可以是 TTSWorkerPool 等同接口对象）
+            backend_type: LOCAL 或 WORKER
+        """
+        super().__init__(name, tasks=plugins.keys())
+        self.plugins = plugins
+        self.type = backend_type
+
+    def invoke(self, task_type, method, *args, **kwargs):
+        return getattr(self.plugins[task_type], method)(*args, **kwargs)
+
+    def probe(self):
+        healthy = all(
+            plugin.is_loaded() if hasattr(plugin, "is_loaded") else True
+            for plugin in self.plugins.values()
+        )
+        load = 0
+        for plugin in self.plugins.values():
+            # 工作进程池上报各副本未完成任务数
+            if hasattr(plugin, "get_stats"):
+                stats = plugin.get_stats()
+                load += sum(w.get("outstanding", 0) for w in stats.get("workers", []))
+        return {"healthy": healthy, "load": load}
+
+
+class RemoteBackend(Backend):
+    """
+    远程 VoiceForge 节点（通过 REST API 调用）
+
+    支持的方法：
+    - tts: synthesize_bytes(text, voice) -> bytes
+    - asr: transcribe(audio_bytes, language) -> dict
+    - llm: chat(message, history) -> str
+    """
+
+    type = BackendType.REMOTE
+
+    # 转发请求头：接收方直接在本地处理，避免节点之间循环转发
+    FORWARDED_HEADER = "X-VoiceForge-Forwarded"
+
+    def __init__(self, name: str, url: str, tasks=("asr", "tts", "llm"), timeout: float = 60):
+        """
+        Args:
+            name: 后端名称
+            url: 节点地址，如 http://192.168.1.10:7861
+            tasks: 该节点承担的任务类型
+            timeout: 请求超时（秒）
+        """
+        super().__init__(name, tasks=tasks)
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+        import requests
+
+        self.session = requests.Session()
+        self.session.headers[self.FORWARDED_HEADER] = "1"
+
+    def invoke(self, task_type, method, *args, **kwargs):
+        if task_type == "tts" and method == "synthesize_bytes":
+            return self._synthesize(*args, **kwargs)
+        if task_type == "asr" and method == "transcribe":
+            return self._transcribe(*args, **kwargs)
+        if task_type == "llm" and method == "chat":
+            return self._chat(*args, **kwargs)
+        raise NotImplementedError(f"远程节点不支持 {task_type}.{method}")
+
+    def probe(self):
+        response = self.session.get(f"{self.url}/", timeout=min(self.timeout, 5))
+        response.raise_for_status()
+        data = response.json()
+        services = data.get("services", {})
+        healthy = data.get("success", False) and all(
+            services.get(task, {}).get("loaded", True) for task in self.tasks if task != "llm"
+        )
+        return {"healthy": healthy, "load": data.get("load", {}).get("in_flight", 0)}
+
+    def _synthesize(self, text, voice=None, **kwargs):
+        response = self.session.post(
+            f"{self.url}/tts", json={"text": text, "voice": voice}, timeout=self.timeout
+        )
+        self._check(response)
+        return response.content
+
+    def _transcribe(self, audio, language="auto"):
+        response = self.session.post(
+            f"{self.url}/asr",
+            files={"audio": ("audio.wav", io.BytesIO(audio), "audio/wav")},
+            data={"language": language},
+            timeout=self.timeout,
+        )
+        self._check(response)
+        return response.json()
+
+    def _chat(self, message, history=None, **kwargs):
+        response = self.session.post(
+            f"{self.url}/chat",
+            json={"message": message, "history": history or []},
+            timeout=self.timeout,
+        )
+        self._check(response)
+        return response.json().get("response", "")
+
+    @staticmethod
+    def _check(response):
+        status = response.status_code
+        retry_after = response.headers.get("Retry-After")
+        # 429 与带 Retry-After 的 503 是对端准入控制的背压，节点本身是健康的
+        if status == 429 or (status == 503 and retry_after is not None):
+            raise BackendBusy(f"远程节点繁忙 HTTP {status}", _parse_retry_after(retry_after))
+        if status != 200:
+            raise RuntimeError(f"远程节点返回 HTTP {status}")
+
+
+def _parse_retry_after(value) -> int:
+    """解析 Retry-After（秒数或 HTTP 日期），无法解析时为 1 秒"""
+    if value is None:
+        return 1
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return 1
+    return max(1, math.ceil(seconds))
+
+
+class HashRing:
+    """一致性哈希环（带虚拟节点）"""
+
+    def __init__(self, virtual_nodes: int = 64):
+        self.virtual_nodes = virtual_nodes
+        self._keys = []
+        self._nodes = []
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def rebuild(self, names):
+        points = sorted(
+            (self._hash(f"{name}#{i}"), name)
+            for name in names
+            for i in range(self.virtual_nodes)
+        )
+        self._keys = [h for h, _ in points]
+        self._nodes = [name for _, name in points]
+
+    def lookup(self, key: str, allowed) -> Optional[str]:
+        """顺时针查找第一个属于 allowed 的节点"""
+        if not self._keys:
+            return None
+        start = bisect.bisect(self._keys, self._hash(key))
+        for i in range(len(self._nodes)):
+            name = self._nodes[(start + i) % len(self._nodes)]
+            if name in allowed:
+                return name
+        return None
+
+
 class Router:
     """
     智能路由器
 
-    未来功能：
-    - 根据网络状况选择本地/云端
-    - 根据任务复杂度选择模型
-    - 故障自动切换
+    Example:
+        router = Router({"probe_interval": 5})
+        router.add_backend(LocalBackend("local", {"tts": tts_model}))
+        router.add_backend(RemoteBackend("node2", "http://10.0.0.2:7861", tasks=["tts"]))
+        router.start()
+        wav = router.call("tts", "synthesize_bytes", "你好", "中文女", key="中文女")
     """
 
     def __init__(self, config=None):
@@ -38,66 +308,301 @@ class Router:
         初始化路由器
 
         Args:
-            config: 配置字典
+            config: 配置字典（advanced.router）
+                - probe_interval: 健康探测间隔（秒，默认 5）
+                - failure_threshold: 连续失败多少次后摘除（默认 3）
+                - eject_seconds: 摘除时长，到期后重新探测（默认 30）
+                - max_retries: 失败后改投其他后端的次数（默认 2）
+                - voice_affinity: 是否按 key（音色）一致性哈希（默认 True）
+                - affinity_load_factor: 亲和节点负载超过平均值的倍数时改用最少负载（默认 1.5）
+                - virtual_nodes: 哈希环虚拟节点数（默认 64）
         """
         self.config = config or {}
-        self.backends = {
-            BackendType.LOCAL: {"healthy": True, "load": 0},
-            BackendType.CLOUD: {"healthy": False, "load": 0},
-            BackendType.EDGE: {"healthy": False, "load": 0},
+        self.probe_interval = self.config.get("probe_interval", 5)
+        self.failure_threshold = self.config.get("failure_threshold", 3)
+        self.eject_seconds = self.config.get("eject_seconds", 30)
+        self.max_retries = self.config.get("max_retries", 2)
+        self.voice_affinity = self.config.get("voice_affinity", True)
+        self.affinity_load_factor = self.config.get("affinity_load_factor", 1.5)
+
+        self.backends = {}  # name -> Backend
+        self._ring = HashRing(self.config.get("virtual_nodes", 64))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- 后端注册 ----------
+
+    def add_backend(self, backend: Backend):
+        """注册后端"""
+        with self._lock:
+            self.backends[backend.name] = backend
+            self._ring.rebuild(self.backends.keys())
+
+    def remove_backend(self, name: str):
+        """移除后端"""
+        with self._lock:
+            self.backends.pop(name, None)
+            self._ring.rebuild(self.backends.keys())
+
+    # ---------- 健康探测 ----------
+
+    def start(self):
+        """启动后台探测线程"""
+        if self._thread is not None:
+            return
+        self.probe_all()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._probe_loop, name="router-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台探测线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            self.probe_all()
+
+    def probe_all(self):
+        """探测全部后端（摘除期内的后端在到期后才重新探测）"""
+        for backend in list(self.backends.values()):
+            if backend.ejected:
+                continue
+            try:
+                result = backend.probe()
+                healthy, load = result.get("healthy", False), result.get("load", 0)
+            except Exception:
+                healthy, load = False, 0
+            if healthy and not backend.healthy:
+                print(f"✅ 后端恢复: {backend.name}")
+            elif not healthy and backend.healthy:
+                print(f"⚠️ 后端不健康: {backend.name}")
+            self.update_backend_status(backend.name, healthy, load)
+
+    def health_check(self):
+        """
+        健康检查
+
+        Returns:
+            dict: 各后端健康状态（健康且未被摘除）
+        """
+        return {
+            name: backend.healthy and not backend.ejected
+            for name, backend in self.backends.items()
         }
 
-    def route(self, task_type, **kwargs):
+    def update_backend_status(self, name, healthy, load=0):
+        """
+        更新后端状态
+
+        Args:
+            name: 后端名称
+            healthy: 是否健康
+            load: 负载（后端自身进行中请求数）
+        """
+        backend = self.backends.get(name)
+        if backend is None:
+            return
+        with self._lock:
+            backend.healthy = healthy
+            backend.load = load
+            if healthy:
+                backend.failures = 0
+
+    # ---------- 路由 ----------
+
+    def route(self, task_type, key=None, exclude=()) -> Backend:
         """
         路由决策
 
         Args:
             task_type: 任务类型 (asr/tts/llm)
-            **kwargs: 任务参数
+            key: 亲和键（如音色名称），相同 key 优先路由到同一后端
+            exclude: 本次请求已失败的后端名称
 
         Returns:
-            BackendType: 选择的后端类型
+            Backend: 选择的后端
+
+        Raises:
+            NoBackendError: 没有可用后端
         """
-        # 方案A：始终使用本地
-        # 方案C：实现智能路由逻辑
-        return BackendType.LOCAL
+        with self._lock:
+            candidates = [
+                b
+                for b in self.backends.values()
+                if b.available(task_type) and b.name not in exclude
+            ]
+            if not candidates:
+                raise NoBackendError(f"没有可用的 {task_type} 后端")
 
-    def select_model(self, task_type, requirement):
+            def pressure(b):
+                return b.outstanding + b.load
+
+            if key and self.voice_affinity and len(candidates) > 1:
+                # 有界负载一致性哈希：亲和节点负载过高时退回最少负载
+                name = self._ring.lookup(str(key), {b.name for b in candidates})
+                preferred = self.backends[name]
+                average = sum(pressure(b) for b in candidates) / len(candidates)
+                if pressure(preferred) <= max(1.0, average * self.affinity_load_factor):
+                    return preferred
+
+            lowest = min(pressure(b) for b in candidates)
+            best = [b for b in candidates if pressure(b) == lowest]
+            return min(best, key=lambda b: (b.latency, random.random()))
+
+    def call(self, task_type, method, *args, key=None, **kwargs):
         """
-        选择模型
+        路由并执行任务，失败时改投其他后端
 
         Args:
             task_type: 任务类型
-            requirement: 要求 (speed/quality/balance)
+            method: 插件方法名（如 synthesize_bytes）
+            *args / **kwargs: 方法参数
+            key: 亲和键
 
         Returns:
-            str: 模型名称
+            后端方法的返回值
+
+        Raises:
+            BackendBusy: 所有可用后端都在限流（retry_after 为最早可重试的间隔）
+            NoBackendError: 没有可用后端
         """
-        # 方案C：根据要求选择
-        # 当前方案A：返回默认模型
-        defaults = {"asr": "sensevoice", "tts": "cosyvoice", "llm": "gemma3:4b"}
-        return defaults.get(task_type, "default")
+        tried = []
+        last_error = None
+        for _ in range(self.max_retries + 1):
+            try:
+                backend = self.route(task_type, key=key, exclude=tried)
+            except NoBackendError:
+                if last_error is not None:
+                    raise last_error
+                busy = self._busy_error(task_type)
+                if busy is not None:
+                    raise busy
+                raise
+            tried.append(backend.name)
 
-    def health_check(self):
+            with self._lock:
+                backend.outstanding += 1
+            start = time.perf_counter()
+            try:
+                result = backend.invoke(task_type, method, *args, **kwargs)
+            except NotImplementedError:
+                raise
+            except BackendBusy as e:
+                # 背压：不计入失败次数，Retry-After 内改投其他后端
+                last_error = e
+                self._record_busy(backend, e)
+                continue
+            except Exception as e:
+                last_error = e
+                self._record_failure(backend, e)
+                continue
+            finally:
+                with self._lock:
+                    backend.outstanding -= 1
+            self._record_success(backend, time.perf_counter() - start)
+            return result
+        raise last_error
+
+    def _record_success(self, backend, elapsed):
+        with self._lock:
+            backend.requests += 1
+            backend.failures = 0
+            backend.latency = elapsed if backend.latency == 0 else 0.8 * backend.latency + 0.2 * elapsed
+
+    def _record_busy(self, backend, error):
+        with self._lock:
+            backend.requests += 1
+            backend.throttled += 1
+            backend.busy_until = time.monotonic() + error.retry_after
+        print(f"⏳ 后端繁忙 {error.retry_after}s: {backend.name}: {error}")
+
+    def _busy_error(self, task_type):
+        """所有健康后端都处于限流期时，返回带最早重试间隔的 BackendBusy"""
+        with self._lock:
+            waits = [
+                b.busy_until - time.monotonic()
+                for b in self.backends.values()
+                if task_type in b.tasks and b.healthy and not b.ejected and b.busy
+            ]
+        if not waits:
+            return None
+        return BackendBusy(f"{task_type} 后端均繁忙", max(1, math.ceil(min(waits))))
+
+    def _record_failure(self, backend, error):
+        with self._lock:
+            backend.requests += 1
+            backend.errors += 1
+            backend.failures += 1
+            eject = backend.failures >= self.failure_threshold
+            if eject:
+                backend.ejected_until = time.monotonic() + self.eject_seconds
+                backend.failures = 0
+        print(f"⚠️ 后端调用失败: {backend.name}: {error}")
+        if eject:
+            print(f"⚠️ 后端已摘除 {self.eject_seconds}s: {backend.name}")
+
+    def get_stats(self) -> Dict[str, dict]:
         """
-        健康检查
+        获取各后端状态
 
         Returns:
-            dict: 各后端健康状态
+            dict: 后端名称 -> 状态
         """
-        return {
-            backend.value: info["healthy"] for backend, info in self.backends.items()
-        }
+        with self._lock:
+            return {name: b.get_status() for name, b in self.backends.items()}
 
-    def update_backend_status(self, backend_type, healthy, load=0):
+    def select_model(self, task_type, requirement):
         """
-        更新后端状态
+        选择模型
 
         Args:
-            backend_type: 后端类型
-            healthy: 是否健康
-            load: 负载 (0-100)
+            task_type: 任务类型
+            requirement: 要求 (speed/quality/balance)
+
+        Returns:
+            str: 模型名称
         """
-        if backend_type in self.backends:
-            self.backends[backend_type]["healthy"] = healthy
-            self.backends[backend_type]["load"] = load
+        # 当前只有一套模型：返回默认模型
+        defaults = {"asr": "sensevoice", "tts": "cosyvoice", "llm": "gemma3:4b"}
+        return defaults.get(task_type, "default")
+
+
+def build_router(config: dict, local_plugins: Dict[str, object]) -> Router:
+    """
+    根据配置创建路由器
+
+    Args:
+        config: advanced.router 配置
+            - nodes: 远程节点列表，元素为地址字符串或 {"url", "name", "tasks"}
+        local_plugins: 本机插件 {任务类型: 插件实例}
+
+    Returns:
+        Router: 已注册本机与远程节点的路由器（未启动探测）
+    """
+    router = Router(config)
+    plugins = {task: plugin for task, plugin in local_plugins.items() if plugin is not None}
+    if plugins:
+        backend_type = (
+            BackendType.WORKER
+            if any(hasattr(p, "get_stats") and hasattr(p, "replicas") for p in plugins.values())
+            else BackendType.LOCAL
+        )
+        router.add_backend(LocalBackend("local", plugins, backend_type))
+
+    for index, node in enumerate(config.get("nodes") or []):
+        if isinstance(node, str):
+            node = {"url": node}
+        router.add_backend(
+            RemoteBackend(
+                node.get("name") or f"node{index + 1}",
+                node["url"],
+                tasks=node.get("tasks", ("tts",)),
+                timeout=config.get("timeout", 60),
+            )
+        )
+    return router
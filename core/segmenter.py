@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Segmenter - 流式断句模块
+
+功能：
+- 增量断句：LLM 逐片段输出时，一旦凑成完整句子立即交给 TTS
+- 标点规则：与 CosyVoice split_paragraph 使用相同的断句标点
+- 短句合并：过短的句子与下一句合并，避免 TTS 频繁处理碎片
+"""
+
+from typing import List
+
+# 与 cosyvoice.utils.frontend_utils.split_paragraph 保持一致
+ZH_PUNCTUATION = ["。", "？", "！", "；", "：", "、", ".", "?", "!", ";"]
+EN_PUNCTUATION = [".", "?", "!", ";", ":"]
+COMMA_PUNCTUATION = ["，", ","]
+CLOSING_QUOTES = ['"', "”"]
+
+
+class SentenceSegmenter:
+    """
+    流式断句器
+
+    Example:
+        segmenter = SentenceSegmenter()
+        for piece in llm.stream_chat("你好"):
+            for sentence in segmenter.feed(piece):
+                tts.synthesize_stream(sentence)
+        for sentence in segmenter.flush():
+            tts.synthesize_stream(sentence)
+    """
+
+    def __init__(
+        self, min_chars: int = 10, first_min_chars: int = 2, comma_split: bool = False
+    ):
+        """
+        初始化断句器
+
+        Args:
+            min_chars: 句子最小长度，短于此长度的句子与下一句合并
+            first_min_chars: 首句最小长度（首句尽快输出以降低首包延迟）
+            comma_split: 是否在逗号处断句
+        """
+        self.min_chars = min_chars
+        self.first_min_chars = first_min_chars
+        self.punctuation = set(ZH_PUNCTUATION + EN_PUNCTUATION + ["\n"])
+        if comma_split:
+            self.punctuation.update(COMMA_PUNCTUATION)
+
+        self._buffer = ""  # 尚未确定边界的文本
+        self._pending = ""  # 已断句但长度不足、等待合并的文本
+        self._emitted = 0
+
+    def feed(self, text: str) -> List[str]:
+        """
+        输入文本片段
+
+        Args:
+            text: LLM 输出的文本片段
+
+        Returns:
+            list: 本次新产生的完整句子
+        """
+        self._buffer += text
+        sentences = []
+        while True:
+            cut = self._find_boundary()
+            if cut is None:
+                break
+            self._pending += self._buffer[:cut]
+            self._buffer = self._buffer[cut:]
+
+            min_chars = self.first_min_chars if self._emitted == 0 else self.min_chars
+            if len(self._pending.strip()) >= min_chars:
+                sentences.append(self._pending.strip())
+                self._pending = ""
+                self._emitted += 1
+        return sentences
+
+    def flush(self) -> List[str]:
+        """
+        输入结束，返回剩余文本
+
+        Returns:
+            list: 剩余句子（可能为空）
+        """
+        rest = (self._pending + self._buffer).strip()
+        self._pending = ""
+        self._buffer = ""
+        if not rest or all(c in self.punctuation or c.isspace() for c in rest):
+            return []
+        self._emitted += 1
+        return [rest]
+
+    def reset(self):
+        """重置状态"""
+        self._buffer = ""
+        self._pending = ""
+        self._emitted = 0
+
+    def _find_boundary(self):
+        """
+        查找第一个确定的句子边界
+
+        标点后需要至少再看到一个字符才能确认边界（处理连续标点、
+        右引号和小数点），因此最后一个标点要等下一个片段或 flush
+
+        Returns:
+            int: 边界位置（切分点），无则 None
+        """
+        buf = self._buffer
+        for i, c in enumerate(buf):
+            if c not in self.punctuation:
+                continue
+            j = i + 1
+            while j < len(buf) and (buf[j] in self.punctuation or buf[j] in CLOSING_QUOTES):
+                j += 1
+            if j >= len(buf):
+                return None
+            # 小数点（如 3.14）不是句子边界
+            if c == "." and i > 0 and buf[i - 1].isdigit() and buf[j].isdigit():
+                continue
+            return j
+        return None
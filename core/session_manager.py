@@ -2,40 +2,275 @@
 """
 Session Manager - 会话管理模块
 
-功能（方案B/C实现）：
-- 多轮对话上下文管理
-- 会话持久化
-- 用户隔离
-- 过期清理
+功能：
+- 多轮对话上下文管理（deque 保存历史，追加/截断均摊 O(1)）
+- 上下文窗口：按 token 预算选择历史，按块淘汰，保持提示词前缀稳定
+  （前缀逐字节不变时 Ollama 可复用 KV 缓存，省去重复的 prompt 计算）
+- 对话压缩：历史超过阈值时后台调用 LLM 把最早的若干轮总结为摘要，
+  之后发送 摘要 + 最近几轮（不占用请求路径，摘要随会话保存）
+- 淘汰策略：OrderedDict LRU + TTL 过期 + 会话总数上限
+- 会话持久化：追加写日志（JSON Lines）或 SQLite，重启后快速恢复
+- 用户隔离：按会话ID隔离不同对话
 
-方案A状态：预留框架，暂未实现
+对应配置 session：
+    max_history: 10        # 每个会话保留的对话轮数（用户+助手=一轮）
+    history_tokens: 1536   # 发送给 LLM 的历史 token 预算，0 表示只按轮数限制
+    evict_block: 0.25      # 超出限制时一次淘汰的比例（按块淘汰，前缀更稳定）
+    image_tokens: 256      # 每张图片估算的 token 数
+    summary:
+      enabled: false
+      threshold_tokens: 1024  # 未压缩历史超过该值时触发后台摘要
+      keep_rounds: 2          # 保留最近几轮原文不压缩
+      max_tokens: 200         # 摘要长度上限
+    ttl: 3600              # 会话空闲过期时间（秒），0 表示不过期
+    max_sessions: 1000     # 会话总数上限，超出时淘汰最久未使用的会话
+    persist: false         # false / log / sqlite（true 等同 log）
+    path: ./data/sessions  # 持久化文件路径（自动补 .log / .db 后缀）
 """
 
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数（无需加载分词器）
+
+    中日韩字符约 1 字 1 token，其余按约 4 字符 1 token 计算，
+    另加每条消息的模板开销
+
+    Args:
+        text: 文本
+
+    Returns:
+        int: 估算的 token 数
+    """
+    if not text:
+        return 4
+    cjk = sum(1 for ch in text if ch >= "\u2e80")
+    return cjk + (len(text) - cjk + 3) // 4 + 4
+
+
+SUMMARY_PROMPT = (
+    "你是对话记录员。请把下面的对话（可能包含此前的摘要）压缩成一段简洁的摘要，"
+    "保留用户的身份信息、偏好、关键事实、已做出的决定和未完成的问题，"
+    "使用第三人称，不要添加对话中没有的内容，只输出摘要本身。"
+)
+SUMMARY_PREFIX = "以下是此前对话的摘要：\n"
+
+
+class Session:
+    """单个会话：历史消息 + 访问时间"""
+
+    __slots__ = (
+        "session_id",
+        "history",
+        "tokens",
+        "window_start",
+        "created_at",
+        "last_access",
+        "seq",
+        "summary",
+        "summary_seq",
+        "summarizing",
+    )
+
+    def __init__(self, session_id: str, created_at: float = None):
+        self.session_id = session_id
+        self.history = deque()
+        self.tokens = deque()  # 与 history 一一对应，每条消息只计算一次
+        self.window_start = 0  # 上下文窗口起点（消息序号），只向前移动
+        self.created_at = created_at or time.time()
+        self.last_access = self.created_at
+        self.seq = 0  # 已追加的消息总数（持久化时用于定位被截断的消息）
+        self.summary = None  # 对话摘要，覆盖序号 summary_seq 之前的消息
+        self.summary_seq = 0
+        self.summarizing = False  # 是否有后台摘要任务进行中
+
+    @property
+    def first_seq(self) -> int:
+        """history[0] 的消息序号"""
+        return self.seq - len(self.history)
+
+    def append(self, message: dict, tokens: int):
+        self.history.append(message)
+        self.tokens.append(tokens)
+        self.seq += 1
+
+    def trim(self, max_messages: int, block: int) -> int:
+        """
+        超出条数上限时从头部按块删除（对齐到用户消息）
+
+        Returns:
+            int: 删除的消息数
+        """
+        if not max_messages or len(self.history) <= max_messages:
+            return 0
+        keep = max(1, max_messages - block)
+        dropped = 0
+        while len(self.history) > keep or (
+            len(self.history) > 1 and self.history[0].get("role") != "user"
+        ):
+            self.history.popleft()
+            self.tokens.popleft()
+            dropped += 1
+        return dropped
+
+    def clear(self):
+        self.history.clear()
+        self.tokens.clear()
+        self.window_start = self.seq
+        self.summary = None
+        self.summary_seq = self.seq  # 进行中的摘要任务结果将被丢弃
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "messages": len(self.history),
+            "summary": self.summary is not None,
+            "created_at": self.created_at,
+            "last_access": self.last_access,
+        }
+
 
 class SessionManager:
     """
     会话管理器
 
-    未来功能：
-    - 保存对话历史
-    - 支持多用户会话
-    - 会话恢复
-    - 自动过期清理
+    会话按最近访问顺序保存在 OrderedDict 中：访问时移到末尾，
+    淘汰和过期清理都只需从头部弹出，均为 O(1)
+
+    Example:
+        manager = SessionManager({"max_history": 10, "ttl": 3600})
+        sid = manager.create_session()
+        manager.add_message(sid, "user", "你好")
+        history = manager.get_history(sid)
     """
 
-    def __init__(self, config=None):
+    def __init__(self, config=None, llm=None):
         """
         初始化会话管理器
 
         Args:
-            config: 配置字典
+            config: 配置字典（session）
+            llm: LLM 插件（BaseLLMPlugin，启用 summary 时用于生成摘要）
         """
         self.config = config or {}
-        self.sessions = {}  # session_id -> history
+        self.llm = llm
+        self.summary_config = self.config.get("summary") or {}
+        self.summary_enabled = self.summary_config.get("enabled", False)
+        self._summary_pool = None
+        self.max_history = int(self.config.get("max_history", 10))
+        self.history_tokens = int(self.config.get("history_tokens", 0) or 0)
+        self.evict_block = float(self.config.get("evict_block", 0.25))
+        self.image_tokens = int(self.config.get("image_tokens", 256))
+        self.ttl = self.config.get("ttl", 3600) or 0
+        self.max_sessions = int(self.config.get("max_sessions", 1000))
+        self.cleanup_interval = self.config.get("cleanup_interval", 60)
+
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_cleanup = time.time()
+        self._stats = {
+            "created": 0,
+            "expired": 0,
+            "evicted": 0,
+            "summaries": 0,
+            "summary_errors": 0,
+        }
+
+        self.store = self._create_store()
+        if self.store is not None:
+            self._restore()
+
+    @property
+    def max_messages(self) -> int:
+        """每个会话保留的消息条数"""
+        return self.max_history * 2
 
-    def create_session(self, session_id=None):
+    @property
+    def block_messages(self) -> int:
+        """超出条数上限时一次删除的消息数（整轮）"""
+        return max(1, int(self.max_history * self.evict_block)) * 2 if self.evict_block else 0
+
+    def count_tokens(self, message: dict) -> int:
+        """估算单条消息的 token 数"""
+        tokens = estimate_tokens(message.get("content") or "")
+        if message.get("image"):
+            tokens += self.image_tokens
+        return tokens
+
+    # ==================== 持久化 ====================
+
+    def _create_store(self):
+        persist = self.config.get("persist", False)
+        if not persist:
+            return None
+        backend = "log" if persist is True else str(persist).lower()
+        path = self.config.get("path", "./data/sessions")
+        try:
+            if backend == "sqlite":
+                return SQLiteStore(path if path.endswith(".db") else path + ".db")
+            if backend == "log":
+                return AppendLogStore(path if path.endswith(".log") else path + ".log")
+            print(f"⚠️ 未知的会话持久化方式: {persist}，已禁用持久化")
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ 会话持久化初始化失败: {e}")
+        return None
+
+    def _restore(self):
+        """从持久化存储恢复会话（跳过已过期的会话）"""
+        now = time.time()
+        restored = OrderedDict()
+        try:
+            for session_id, created_at, last_access, messages, seq, summary in self.store.load():
+                if self.ttl and now - last_access > self.ttl:
+                    continue
+                session = Session(session_id, created_at)
+                session.seq = seq - len(messages)
+                for message in messages:
+                    session.append(message, self.count_tokens(message))
+                session.trim(self.max_messages, 0)
+                if summary:
+                    session.summary_seq, session.summary = summary
+                session.window_start = max(session.first_seq, session.summary_seq)
+                session.last_access = last_access
+                restored[session_id] = session
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"⚠️ 会话恢复失败: {e}")
+            return
+
+        # 按最近访问排序，保留最新的 max_sessions 个
+        ordered = sorted(restored.values(), key=lambda s: s.last_access)
+        for session in ordered[-self.max_sessions :] if self.max_sessions else ordered:
+            self.sessions[session.session_id] = session
+
+        # 启动时整理存储，丢弃过期和被截断的记录
+        self.store.compact(self.sessions.values())
+        if self.sessions:
+            print(f"✅ 已恢复 {len(self.sessions)} 个会话")
+
+    def _persist(self, method: str, *args):
+        if self.store is None:
+            return
+        try:
+            getattr(self.store, method)(*args)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ 会话写入失败: {e}")
+
+    # ==================== 会话操作 ====================
+
+    def create_session(self, session_id: str = None) -> str:
         """
-        创建新会话
+        创建新会话（已存在时直接返回）
 
         Args:
             session_id: 会话ID（可选，自动生成）
@@ -43,10 +278,52 @@ class SessionManager:
         Returns:
             str: 会话ID
         """
-        # 方案A：简单返回空会话
-        return session_id or "default"
+        with self._lock:
+            session_id = session_id or uuid.uuid4().hex[:8]
+            self._get(session_id, create=True)
+            return session_id
+
+    def _get(self, session_id: str, create: bool = False) -> Optional[Session]:
+        """取出会话并标记为最近使用（调用方持有锁）"""
+        now = time.time()
+        self._maybe_cleanup(now)
+
+        session = self.sessions.get(session_id)
+        if session is not None and self.ttl and now - session.last_access > self.ttl:
+            self._drop(session_id)
+            self._stats["expired"] += 1
+            session = None
+
+        if session is None:
+            if not create:
+                return None
+            session = Session(session_id, now)
+            self.sessions[session_id] = session
+            self._stats["created"] += 1
+            while self.max_sessions and len(self.sessions) > self.max_sessions:
+                oldest = next(iter(self.sessions))
+                self._drop(oldest)
+                self._stats["evicted"] += 1
+        else:
+            self.sessions.move_to_end(session_id)
+
+        session.last_access = now
+        return session
+
+    def _drop(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self._persist("delete", session)
 
-    def get_history(self, session_id):
+    def has_session(self, session_id: str) -> bool:
+        """会话是否存在（且未过期）"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            return session is not None and not (
+                self.ttl and time.time() - session.last_access > self.ttl
+            )
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
         """
         获取会话历史
 
@@ -54,37 +331,511 @@ class SessionManager:
             session_id: 会话ID
 
         Returns:
-            list: 对话历史
+            list: 对话历史 [{"role": ..., "content": ...}, ...]（副本）
         """
-        # 方案A：返回空列表
-        return []
+        with self._lock:
+            session = self._get(session_id)
+            if session is None:
+                return []
+            return [dict(msg) for msg in session.history]
 
-    def add_message(self, session_id, role, content):
+    def add_message(self, session_id: str, role: str, content: str, **extra):
         """
-        添加消息到会话
+        添加消息到会话（会话不存在时自动创建）
 
         Args:
             session_id: 会话ID
             role: 角色 (user/assistant)
             content: 内容
+            **extra: 附加字段（如 image 图片路径）
+
+        Returns:
+            dict: 保存的消息
         """
-        # 方案B/C 实现
-        pass
+        message = {"role": role, "content": content}
+        message.update({k: v for k, v in extra.items() if v is not None})
+        with self._lock:
+            session = self._get(session_id, create=True)
+            session.append(message, self.count_tokens(message))
+            dropped = session.trim(self.max_messages, self.block_messages)
+            self._persist("append", session, message, dropped)
+            self._maybe_summarize(session)
+            if self.store is not None and self.store.should_compact():
+                self._persist("compact", self.sessions.values())
+        return message
 
-    def clear_session(self, session_id):
+    def get_context(self, session_id: str, budget: int = None) -> List[Dict[str, Any]]:
         """
-        清除会话
+        获取发送给 LLM 的历史窗口
+
+        窗口起点只在超出 token 预算时向前移动，且一次移出一整块
+        （降到预算的 1 - evict_block），其余轮次窗口前缀保持不变，
+        Ollama 可直接复用上一轮的 KV 缓存
 
         Args:
             session_id: 会话ID
+            budget: token 预算（默认 session.history_tokens，0 表示不限）
+
+        Returns:
+            list: 窗口内的消息（副本）
         """
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        budget = self.history_tokens if budget is None else budget
+        with self._lock:
+            session = self._get(session_id)
+            if session is None:
+                return []
+
+            base = session.first_seq
+            start = max(session.window_start, base, session.summary_seq)
+            prefix = []
+            if session.summary:
+                prefix.append({"role": "system", "content": SUMMARY_PREFIX + session.summary})
+            if budget:
+                total = sum(islice(session.tokens, start - base, None))
+                if prefix:
+                    total += estimate_tokens(prefix[0]["content"])
+                if total > budget:
+                    target = budget * (1 - self.evict_block)
+                    last = session.seq - 1
+                    while start < last and (
+                        total > target or session.history[start - base].get("role") != "user"
+                    ):
+                        total -= session.tokens[start - base]
+                        start += 1
+            session.window_start = start
+            return prefix + [dict(msg) for msg in islice(session.history, start - base, None)]
+
+    # ==================== 对话压缩 ====================
+
+    def set_llm(self, llm):
+        """设置用于生成摘要的 LLM 插件（模型加载晚于会话管理器时使用）"""
+        self.llm = llm
+
+    def _maybe_summarize(self, session: Session):
+        """未压缩的历史超过阈值时提交后台摘要任务（调用方持有锁）"""
+        if not self.summary_enabled or self.llm is None or session.summarizing:
+            return
+
+        base = session.first_seq
+        start = max(base, session.summary_seq)
+        threshold = self.summary_config.get("threshold_tokens", 1024)
+        if sum(islice(session.tokens, start - base, None)) <= threshold:
+            return
+
+        # 保留最近 keep_rounds 轮原文，摘要终点对齐到用户消息
+        end = session.seq - max(1, self.summary_config.get("keep_rounds", 2)) * 2
+        while end > start and session.history[end - base].get("role") != "user":
+            end -= 1
+        if end <= start:
+            return
+
+        messages = [dict(msg) for msg in islice(session.history, start - base, end - base)]
+        session.summarizing = True
+        if self._summary_pool is None:
+            self._summary_pool = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="session-summary"
+            )
+        self._summary_pool.submit(
+            self._summarize, session, session.summary, messages, end
+        )
+
+    def _summarize(self, session: Session, previous: str, messages: list, end: int):
+        """后台线程：调用 LLM 生成摘要，完成后替换会话中被覆盖的消息"""
+        lines = [f"【此前摘要】{previous}"] if previous else []
+        for msg in messages:
+            speaker = "用户" if msg.get("role") == "user" else "助手"
+            content = msg.get("content") or ""
+            if msg.get("image"):
+                content = f"[图片] {content}"
+            lines.append(f"{speaker}：{content}")
+
+        try:
+            summary = self.llm.chat(
+                "\n".join(lines),
+                None,
+                system_prompt=self.summary_config.get("prompt", SUMMARY_PROMPT),
+                max_tokens=self.summary_config.get("max_tokens", 200),
+                temperature=0.3,
+            )
+            summary = (summary or "").strip()
+        except Exception as e:
+            summary = None
+            print(f"⚠️ 对话摘要失败: {e}")
+
+        with self._lock:
+            session.summarizing = False
+            if not summary:
+                self._stats["summary_errors"] += 1
+                return
+            # 期间会话被清空或删除时丢弃结果
+            if end <= session.summary_seq or self.sessions.get(session.session_id) is not session:
+                return
+            session.summary = summary
+            session.summary_seq = end
+            self._stats["summaries"] += 1
+            self._persist("summarize", session)
+
+    def get_message_count(self, session_id: str) -> int:
+        """获取指定会话的消息数量"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            return len(session.history) if session else 0
+
+    def clear_session(self, session_id: str):
+        """
+        清空会话历史（保留会话）
+
+        Args:
+            session_id: 会话ID
+        """
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self._persist("clear", session)
+                session.clear()
+
+    def delete_session(self, session_id: str):
+        """删除会话"""
+        with self._lock:
+            if session_id in self.sessions:
+                self._drop(session_id)
+
+    def set_max_history(self, max_history: int):
+        """
+        修改保留轮数（热更新，超出的会话在下次追加消息时截断）
+
+        Args:
+            max_history: 最大对话轮数
+        """
+        with self._lock:
+            self.max_history = int(max_history)
+
+    def _maybe_cleanup(self, now: float):
+        if self.ttl and now - self._last_cleanup >= self.cleanup_interval:
+            self._last_cleanup = now
+            self._cleanup(now)
+
+    def _cleanup(self, now: float) -> int:
+        # OrderedDict 按最近访问排序：头部最旧，遇到未过期的即可停止
+        removed = 0
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.last_access <= self.ttl:
+                break
+            self._drop(session_id)
+            removed += 1
+        self._stats["expired"] += removed
+        return removed
+
+    def cleanup_expired(self) -> int:
+        """
+        清理过期会话
+
+        Returns:
+            int: 清理的会话数
+        """
+        if not self.ttl:
+            return 0
+        with self._lock:
+            self._last_cleanup = time.time()
+            return self._cleanup(self._last_cleanup)
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """列出所有会话（按最近访问排序）"""
+        with self._lock:
+            return [s.to_dict() for s in self.sessions.values()]
+
+    def get_session_count(self) -> int:
+        """获取会话数量"""
+        return len(self.sessions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                "sessions": len(self.sessions),
+                "max_sessions": self.max_sessions,
+                "max_history": self.max_history,
+                "history_tokens": self.history_tokens,
+                "ttl": self.ttl,
+                "persist": type(self.store).__name__ if self.store else None,
+                **self._stats,
+            }
+
+    def close(self):
+        """整理并关闭持久化存储"""
+        if self._summary_pool is not None:
+            self._summary_pool.shutdown(wait=True)
+            self._summary_pool = None
+        with self._lock:
+            if self.store is not None:
+                self._persist("compact", self.sessions.values())
+                self._persist("close")
+                self.store = None
+
+
+# ==================== 持久化存储 ====================
+
+
+class AppendLogStore:
+    """
+    追加写日志存储（JSON Lines）
+
+    每条操作一行（add / clear / delete），启动时回放；
+    被截断、清空或删除的失效记录累积过多时重写为快照
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._records = 0
+        self._garbage = 0  # 日志中已失效的记录数
+
+    def _write(self, record: dict):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._records += 1
+
+    def load(self):
+        """回放日志，返回 [(session_id, created_at, last_access, messages, seq, summary)]"""
+        if not os.path.exists(self.path):
+            return []
+        # session_id -> [created_at, last_access, messages, seq, summary]
+        sessions = OrderedDict()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 异常退出时最后一行可能不完整
+                session_id, op, ts = record.get("s"), record.get("op"), record.get("t", 0)
+                if op == "delete":
+                    sessions.pop(session_id, None)
+                    continue
+                entry = sessions.setdefault(session_id, [record.get("c", ts), ts, [], 0, None])
+                entry[1] = ts
+                if op == "clear":
+                    entry[2] = []
+                    entry[3] = record.get("q", entry[3])
+                    entry[4] = None
+                elif op == "add":
+                    entry[2].append(record["m"])
+                    entry[3] = record.get("q", entry[3] + 1)
+                elif op == "summary":
+                    entry[4] = (record["u"], record["sum"])
+        return [(sid, *e) for sid, e in sessions.items()]
+
+    def append(self, session: Session, message: dict, dropped: int):
+        self._write(
+            {
+                "op": "add",
+                "s": session.session_id,
+                "t": session.last_access,
+                "q": session.seq,
+                "m": message,
+            }
+        )
+        self._garbage += dropped
+
+    def clear(self, session: Session):
+        self._write(
+            {"op": "clear", "s": session.session_id, "t": time.time(), "q": session.seq}
+        )
+        self._garbage += len(session.history) + 1
+
+    def summarize(self, session: Session):
+        self._write(
+            {
+                "op": "summary",
+                "s": session.session_id,
+                "t": session.last_access,
+                "u": session.summary_seq,
+                "sum": session.summary,
+            }
+        )
+        self._garbage += 1
+
+    def delete(self, session: Session):
+        self._write({"op": "delete", "s": session.session_id, "t": time.time()})
+        self._garbage += len(session.history) + 2
+
+    def should_compact(self) -> bool:
+        return self._garbage > 1024 and self._garbage * 2 > self._records
+
+    def compact(self, sessions):
+        """重写为快照：每个会话一条 clear（携带时间）+ 当前保留的消息"""
+        self.close()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        records = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for session in sessions:
+                lines = [
+                    {
+                        "op": "clear",
+                        "s": session.session_id,
+                        "t": session.last_access,
+                        "c": session.created_at,
+                        "q": session.first_seq,
+                    }
+                ]
+                if session.summary:
+                    lines.append(
+                        {
+                            "op": "summary",
+                            "s": session.session_id,
+                            "t": session.last_access,
+                            "u": session.summary_seq,
+                            "sum": session.summary,
+                        }
+                    )
+                lines.extend(
+                    {
+                        "op": "add",
+                        "s": session.session_id,
+                        "t": session.last_access,
+                        "q": session.first_seq + i + 1,
+                        "m": m,
+                    }
+                    for i, m in enumerate(session.history)
+                )
+                for record in lines:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                records += len(lines)
+        os.replace(tmp_path, self.path)
+        self._records = records
+        self._garbage = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SQLiteStore:
+    """
+    SQLite 存储
+
+    每条消息一行，按 (session_id, seq) 定位；
+    deque 截断时同步删除最旧的行，库中只保留有效消息
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 调用方持有 SessionManager 的锁，可跨线程共享连接
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, created_at REAL, last_access REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "session_id TEXT, seq INTEGER, message TEXT, PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "session_id TEXT PRIMARY KEY, upto INTEGER, summary TEXT)"
+        )
+
+    def load(self):
+        """读取所有会话，返回 [(session_id, created_at, last_access, messages, seq, summary)]"""
+        sessions = OrderedDict()
+        for session_id, created_at, last_access in self._conn.execute(
+            "SELECT session_id, created_at, last_access FROM sessions"
+        ):
+            sessions[session_id] = [created_at, last_access, [], 0, None]
+        for session_id, upto, summary in self._conn.execute(
+            "SELECT session_id, upto, summary FROM summaries"
+        ):
+            if session_id in sessions:
+                sessions[session_id][3] = upto
+                sessions[session_id][4] = (upto, summary)
+        for session_id, seq, message in self._conn.execute(
+            "SELECT session_id, seq, message FROM messages ORDER BY session_id, seq"
+        ):
+            entry = sessions.get(session_id)
+            if entry is not None:
+                entry[2].append(json.loads(message))
+                entry[3] = seq
+        return [(sid, *e) for sid, e in sessions.items()]
+
+    def append(self, session: Session, message: dict, dropped: int):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (session.session_id, session.created_at, session.last_access),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?)",
+                (session.session_id, session.seq, json.dumps(message, ensure_ascii=False)),
+            )
+            if dropped:
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq <= ?",
+                    (session.session_id, session.first_seq),
+                )
+
+    def clear(self, session: Session):
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM messages WHERE session_id = ?", (session.session_id,)
+            )
+            self._conn.execute(
+                "DELETE FROM summaries WHERE session_id = ?", (session.session_id,)
+            )
+
+    def summarize(self, session: Session):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)",
+                (session.session_id, session.summary_seq, session.summary),
+            )
+
+    def delete(self, session: Session):
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM messages WHERE session_id = ?", (session.session_id,)
+            )
+            self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session.session_id,)
+            )
+            self._conn.execute(
+                "DELETE FROM summaries WHERE session_id = ?", (session.session_id,)
+            )
+
+    def should_compact(self) -> bool:
+        return False
+
+    def compact(self, sessions):
+        """删除已不在内存中的会话，以及超出保留条数的消息（如 max_history 调小）"""
+        with self._conn:
+            self._conn.execute("DELETE FROM sessions")
+            self._conn.executemany(
+                "INSERT INTO sessions VALUES (?, ?, ?)",
+                [(s.session_id, s.created_at, s.last_access) for s in sessions],
+            )
+            self._conn.execute(
+                "DELETE FROM messages WHERE session_id NOT IN (SELECT session_id FROM sessions)"
+            )
+            self._conn.execute(
+                "DELETE FROM summaries WHERE session_id NOT IN (SELECT session_id FROM sessions)"
+            )
+            self._conn.executemany(
+                "DELETE FROM messages WHERE session_id = ? AND seq <= ?",
+                [(s.session_id, s.first_seq) for s in sessions],
+            )
 
-    def cleanup_expired(self):
-        """清理过期会话"""
-        # 方案B/C 实现
-        pass
+    def close(self):
+        self._conn.close()
 
 
 # 全局会话管理器实例（单例模式）
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Startup - 启动编排模块
+
+功能：
+- 并行加载：ASR / TTS / LLM 同时加载，启动耗时取决于最慢的模型而非总和
+- 预热：每个组件加载完成后立即预热（音色短句合成、1 秒静音识别、Ollama 预加载），
+  首个真实请求不再承担延迟初始化和首次算子选择的耗时
+- 就绪状态：供 /health/live、/health/ready 使用，负载均衡只在预热完成后转发流量
+- 后台启动：服务可先开始监听，加载期间 /health/ready 返回 503
+
+对应配置 advanced.startup：
+    parallel: true         # 并行加载
+    background: false      # 后台加载（服务先启动，就绪前拒绝推理请求）
+    preimport: [torch]     # 并行加载前先在主线程导入的公共依赖
+    warmup:
+      enabled: true
+      text: 你好。         # TTS 预热文本
+      voices: []           # 预热的音色，空表示全部
+      asr_seconds: 1.0     # ASR 预热静音时长
+      llm: true            # 预加载 Ollama 模型
+"""
+
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class StartupManager:
+    """
+    启动编排器
+
+    Example:
+        startup = StartupManager(config["advanced"].get("startup"))
+        startup.add("asr", lambda: asr.load(asr_config), asr.warmup)
+        startup.add("tts", lambda: tts.load(tts_config), tts.warmup)
+        startup.run()
+        startup.is_ready()
+    """
+
+    def __init__(self, config: dict = None):
+        """
+        初始化启动编排器
+
+        Args:
+            config: 配置字典（advanced.startup）
+        """
+        self.config = config or {}
+        self.parallel = self.config.get("parallel", True)
+        self.background = self.config.get("background", False)
+        self.preimport = self.config.get("preimport", ["torch"])
+        self.warmup_config = self.config.get("warmup") or {}
+        self.warmup_enabled = self.warmup_config.get("enabled", True)
+
+        self._components: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self.started_at = None
+        self.finished_at = None
+
+    def add(
+        self,
+        name: str,
+        load: Callable[[], Any],
+        warmup: Optional[Callable[[], Any]] = None,
+        required: bool = True,
+    ):
+        """
+        注册组件
+
+        Args:
+            name: 组件名称
+            load: 加载函数（返回 False 表示加载失败）
+            warmup: 预热函数（可选，warmup.enabled 为 false 时跳过）
+            required: 是否为就绪的必要条件
+        """
+        self._components[name] = {
+            "load": load,
+            "warmup": warmup,
+            "required": required,
+            "state": "pending",  # pending/loading/warming/ready/failed
+            "load_time": None,
+            "warmup_time": None,
+            "error": None,
+        }
+
+    def run(self) -> bool:
+        """
+        加载并预热全部组件（阻塞直到完成）
+
+        Returns:
+            bool: 是否就绪
+        """
+        self.started_at = time.time()
+        self._preimport()
+
+        names = list(self._components)
+        if self.parallel and len(names) > 1:
+            with ThreadPoolExecutor(
+                max_workers=len(names), thread_name_prefix="startup"
+            ) as pool:
+                list(pool.map(self._start_component, names))
+        else:
+            for name in names:
+                self._start_component(name)
+
+        self.finished_at = time.time()
+        self._done.set()
+
+        elapsed = self.finished_at - self.started_at
+        if self.is_ready():
+            print(f"✅ 启动完成，耗时 {elapsed:.1f}s")
+        else:
+            failed = [n for n, c in self._components.items() if c["state"] == "failed"]
+            print(f"⚠️ 启动完成（{elapsed:.1f}s），以下组件失败: {', '.join(failed)}")
+        return self.is_ready()
+
+    def start(self) -> threading.Thread:
+        """在后台线程中启动（服务可先开始监听）"""
+        self._thread = threading.Thread(target=self.run, name="startup", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        等待启动完成
+
+        Returns:
+            bool: 是否就绪
+        """
+        self._done.wait(timeout)
+        return self.is_ready()
+
+    def is_done(self) -> bool:
+        """是否已完成（无论成功与否）"""
+        return self._done.is_set()
+
+    def is_ready(self) -> bool:
+        """是否就绪：启动完成且所有必要组件已加载并预热"""
+        if not self._done.is_set():
+            return False
+        return all(
+            c["state"] == "ready" for c in self._components.values() if c["required"]
+        )
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        获取启动状态
+
+        Returns:
+            dict: 各组件状态、耗时及是否就绪
+        """
+        with self._lock:
+            components = {
+                name: {
+                    "state": c["state"],
+                    "required": c["required"],
+                    "load_time": c["load_time"],
+                    "warmup_time": c["warmup_time"],
+                    "error": c["error"],
+                }
+                for name, c in self._components.items()
+            }
+        end = self.finished_at or time.time()
+        return {
+            "ready": self.is_ready(),
+            "done": self.is_done(),
+            "elapsed": end - self.started_at if self.started_at else 0.0,
+            "components": components,
+        }
+
+    # ==================== 内部方法 ====================
+
+    def _preimport(self):
+        """
+        在主线程中先导入公共依赖
+
+        多个线程同时首次导入 torch 等大型包时会串行等待导入锁，
+        且部分扩展模块的初始化不是线程安全的
+        """
+        for module in self.preimport or []:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+
+    def _set(self, name: str, **fields):
+        with self._lock:
+            self._components[name].update(fields)
+
+    def _start_component(self, name: str):
+        """加载并预热单个组件（加载完成后立即预热，不等待其他组件）"""
+        component = self._components[name]
+
+        self._set(name, state="loading")
+        start = time.perf_counter()
+        try:
+            result = component["load"]()
+        except Exception as e:
+            result = False
+            self._set(name, error=str(e))
+        self._set(name, load_time=round(time.perf_counter() - start, 3))
+        if result is False:
+            self._set(name, state="failed", error=component["error"] or "加载失败")
+            print(f"❌ {name} 加载失败")
+            return
+
+        if self.warmup_enabled and component["warmup"] is not None:
+            self._set(name, state="warming")
+            start = time.perf_counter()
+            try:
+                component["warmup"]()
+            except Exception as e:
+                # 预热失败不影响就绪：模型已加载，只是首个请求会慢一些
+                self._set(name, error=f"预热失败: {e}")
+                print(f"⚠️ {name} 预热失败: {e}")
+            self._set(name, warmup_time=round(time.perf_counter() - start, 3))
+
+        self._set(name, state="ready")
+        print(
+            f"✅ {name} 就绪（加载 {component['load_time']}s"
+            + (f"，预热 {component['warmup_time']}s）" if component["warmup_time"] is not None else "）")
+        )
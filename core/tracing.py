@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Tracing - 请求追踪模块
+
+功能：
+- 追踪 ID：每个请求分配 trace_id，通过 contextvars 在 ASR→LLM→TTS 之间传递
+- 阶段 span：记录嵌套的耗时区间（含 CosyVoice 内部 llm_job/flow/HiFT）
+- 首包事件：记录首个语音 token、首个音频块等时间点（相对请求开始）
+- 导出：JSON Lines 或 Chrome Trace（chrome://tracing / Perfetto）
+- 采样：按比例采样，生产环境可常开
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+# 当前活动的 (trace, parent_span_id)
+_current = contextvars.ContextVar("voiceforge_trace", default=None)
+
+
+class Trace:
+    """一次请求的追踪记录"""
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str = None, **attrs):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.root_id = self._new_id()
+        self.start_ns = time.perf_counter_ns()
+        self.start_wall = time.time()
+        self.spans = []
+        self.marks = {}
+        self._lock = threading.Lock()
+        self._finished = False
+
+    @staticmethod
+    def _new_id() -> str:
+        return uuid.uuid4().hex[:8]
+
+    def offset_ms(self, ns: int) -> float:
+        """perf_counter_ns 时间点相对请求开始的毫秒数"""
+        return (ns - self.start_ns) / 1e6
+
+    def add_span(self, name, span_id, parent_id, start_ns, end_ns, attrs=None):
+        with self._lock:
+            self.spans.append(
+                {
+                    "name": name,
+                    "span_id": span_id,
+                    "parent_id": parent_id,
+                    "start_ns": start_ns,
+                    "end_ns": end_ns,
+                    "thread": threading.get_ident(),
+                    "attrs": attrs or {},
+                }
+            )
+
+    def mark(self, name: str, **attrs) -> bool:
+        """
+        记录时间点事件（同名事件只记录第一次，用于首包延迟）
+
+        Returns:
+            bool: 是否为首次记录
+        """
+        now = time.perf_counter_ns()
+        with self._lock:
+            if name in self.marks:
+                return False
+            self.marks[name] = {
+                "ns": now,
+                "thread": threading.get_ident(),
+                "attrs": attrs,
+            }
+        return True
+
+    def attach(self):
+        """
+        在当前上下文中激活本追踪
+
+        Returns:
+            恢复用的令牌（传给 detach）
+        """
+        previous = _current.get()
+        _current.set((self, self.root_id))
+        return previous
+
+    @contextmanager
+    def activate(self):
+        """在当前上下文中激活本追踪（流式响应的生成器中需要重新激活）"""
+        previous = self.attach()
+        try:
+            yield self
+        finally:
+            detach(previous)
+
+    def finish(self):
+        """结束追踪并导出"""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        self.add_span(
+            self.name, self.root_id, None, self.start_ns, time.perf_counter_ns(), self.attrs
+        )
+        self.tracer.export(self)
+
+
+class Tracer:
+    """
+    追踪器
+
+    Example:
+        tracer = Tracer({"enabled": True, "sample_rate": 0.1})
+        with tracer.trace("complete"):
+            with span("asr"):
+                ...
+            mark("first_audio_chunk")
+    """
+
+    def __init__(self, config: dict = None):
+        """
+        初始化追踪器
+
+        Args:
+            config: 配置字典（advanced.tracing）
+                - enabled: 是否启用
+                - sample_rate: 采样比例 0-1（默认 1.0）
+                - format: jsonl / chrome（默认 jsonl）
+                - path: 输出文件路径（默认 ./logs/traces.jsonl）
+                - cuda_sync: span 结束时同步 CUDA，使 GPU 阶段耗时准确（有额外开销）
+        """
+        self.config = config or {}
+        self.enabled = self.config.get("enabled", False)
+        self.sample_rate = float(self.config.get("sample_rate", 1.0))
+        self.format = self.config.get("format", "jsonl")
+        self.path = self.config.get("path", "./logs/traces.jsonl")
+        self.cuda_sync = self.config.get("cuda_sync", False)
+        self._lock = threading.Lock()
+
+    def start(self, name: str, force: bool = False, **attrs) -> Optional[Trace]:
+        """
+        开始追踪（未启用或未被采样时返回 None）
+
+        Args:
+            name: 追踪名称（通常为路由）
+            force: 忽略采样比例强制追踪（如请求头 X-Trace: 1）
+            **attrs: 附加属性
+        """
+        if not self.enabled:
+            return None
+        if not force and random.random() >= self.sample_rate:
+            return None
+        return Trace(self, name, **attrs)
+
+    @contextmanager
+    def trace(self, name: str, force: bool = False, **attrs):
+        """开始追踪并在当前上下文中激活，退出时导出"""
+        trace = self.start(name, force=force, **attrs)
+        if trace is None:
+            yield None
+            return
+        try:
+            with trace.activate():
+                yield trace
+        finally:
+            trace.finish()
+
+    def export(self, trace: Trace):
+        """写入追踪文件"""
+        if self.format == "chrome":
+            lines = self._chrome_events(trace)
+        else:
+            lines = self._jsonl_records(trace)
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                with open(self.path, "a", encoding="utf-8") as f:
+                    # Chrome Trace 数组格式允许省略结尾的 ]，便于追加写入
+                    if self.format == "chrome" and new_file:
+                        f.write("[\n")
+                    for line in lines:
+                        f.write(line + (",\n" if self.format == "chrome" else "\n"))
+        except OSError as e:
+            print(f"⚠️ 追踪写入失败: {e}")
+
+    def _wall_us(self, trace: Trace, ns: int) -> float:
+        return trace.start_wall * 1e6 + (ns - trace.start_ns) / 1e3
+
+    def _jsonl_records(self, trace: Trace):
+        records = []
+        for s in trace.spans:
+            records.append(
+                {
+                    "trace_id": trace.trace_id,
+                    "span_id": s["span_id"],
+                    "parent_id": s["parent_id"],
+                    "name": s["name"],
+                    "start": self._wall_us(trace, s["start_ns"]) / 1e6,
+                    "start_ms": trace.offset_ms(s["start_ns"]),
+                    "duration_ms": (s["end_ns"] - s["start_ns"]) / 1e6,
+                    "thread": s["thread"],
+                    "attrs": s["attrs"],
+                }
+            )
+        for name, m in trace.marks.items():
+            records.append(
+                {
+                    "trace_id": trace.trace_id,
+                    "event": name,
+                    "start_ms": trace.offset_ms(m["ns"]),
+                    "thread": m["thread"],
+                    "attrs": m["attrs"],
+                }
+            )
+        return [json.dumps(r, ensure_ascii=False, default=str) for r in records]
+
+    def _chrome_events(self, trace: Trace):
+        pid = os.getpid()
+        events = []
+        for s in trace.spans:
+            events.append(
+                {
+                    "name": s["name"],
+                    "ph": "X",
+                    "ts": self._wall_us(trace, s["start_ns"]),
+                    "dur": (s["end_ns"] - s["start_ns"]) / 1e3,
+                    "pid": pid,
+                    "tid": s["thread"],
+                    "args": {"trace_id": trace.trace_id, **s["attrs"]},
+                }
+            )
+        for name, m in trace.marks.items():
+            events.append(
+                {
+                    "name": name,
+                    "ph": "i",
+                    "s": "p",
+                    "ts": self._wall_us(trace, m["ns"]),
+                    "pid": pid,
+                    "tid": m["thread"],
+                    "args": {
+                        "trace_id": trace.trace_id,
+                        "offset_ms": trace.offset_ms(m["ns"]),
+                        **m["attrs"],
+                    },
+                }
+            )
+        return [json.dumps(e, ensure_ascii=False, default=str) for e in events]
+
+
+def detach(previous):
+    """恢复 Trace.attach 之前的追踪上下文"""
+    _current.set(previous)
+
+
+def current_trace() -> Optional[Trace]:
+    """当前上下文中的追踪（无则 None）"""
+    current = _current.get()
+    return current[0] if current else None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    记录一个耗时区间（无活动追踪时几乎无开销）
+
+    Example:
+        with span("asr", language="zh"):
+            result = asr.transcribe(audio)
+    """
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+
+    trace, parent_id = current
+    span_id = Trace._new_id()
+    _current.set((trace, span_id))
+    start = time.perf_counter_ns()
+    try:
+        yield trace
+    finally:
+        if trace.tracer.cuda_sync:
+            _cuda_synchronize()
+        trace.add_span(name, span_id, parent_id, start, time.perf_counter_ns(), attrs)
+        # 不使用 token.reset：生成器中的 span 可能在不同上下文中结束
+        _current.set(current)
+
+
+def mark(name: str, **attrs) -> bool:
+    """在当前追踪中记录时间点事件（同名只记录第一次）"""
+    trace = current_trace()
+    return trace.mark(name, **attrs) if trace else False
+
+
+def traced(name: str):
+    """
+    装饰器：函数调用记录为 span
+
+    Example:
+        model.flow.inference = traced("tts.flow")(model.flow.inference)
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_first(fn, event: str):
+    """包装生成器函数：首次产出时记录事件（如首个语音 token）"""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        iterator = fn(*args, **kwargs)
+        if _current.get() is None:
+            return iterator
+        return _mark_first(iterator, event)
+
+    return wrapper
+
+
+def _mark_first(iterator, event):
+    first = True
+    for item in iterator:
+        if first:
+            mark(event)
+            first = False
+        yield item
+
+
+def _cuda_synchronize():
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+        except Exception:
+            pass
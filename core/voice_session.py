@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Voice Session - 全双工语音会话
+
+功能：
+- 端点检测：客户端持续上传 PCM 帧，检测到一句话结束（静音超过 min_silence_ms）立即开始处理
+  （core/vad.Endpointer）
+- 流水线回复：ASR -> LLM 流式生成 -> 逐句合成，第 1 句的音频在 LLM 生成后续内容时即开始返回
+- 打断：回复播放期间用户再次开口时取消当前回复（interruption.enabled）
+- 多轮上下文：启用 session 时使用服务端会话，否则保存在连接内
+
+与传输协议无关，WebSocket 接入见 api/voice_ws.py
+
+对应配置：
+    streaming:
+      tts_streaming: true  # 逐句流式合成（false 时每句合成完整后一次返回）
+      asr_streaming: true  # 说话期间输出部分识别结果（core/asr_stream.py）
+    interruption:
+      enabled: true        # 用户开口时打断正在播放的回复
+      vad: ...             # 断句参数，见 core/vad.py
+"""
+
+import threading
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+
+import numpy as np
+
+from .audio import float_to_pcm16
+
+
+class VoiceSession:
+    """
+    单个连接的语音会话
+
+    respond() 为同步生成器，产出事件：
+        ("asr", text)          识别结果
+        ("sentence", text)     即将合成的回复句子
+        ("audio", bytes)       16bit PCM 音频（采样率为 TTS 采样率）
+        ("done", reply)        回复结束（被取消时 reply 为已播报的部分）
+
+    Example:
+        session = VoiceSession(asr=run_asr, llm=llm, tts=tts, voice="中文女")
+        for event, data in session.respond(audio, cancel_event):
+            ...
+    """
+
+    def __init__(
+        self,
+        asr: Callable[[np.ndarray], Dict[str, Any]],
+        llm: Any,
+        tts: Any,
+        voice: str = None,
+        sessions: Any = None,
+        session_id: str = None,
+        max_history: int = 10,
+        tts_streaming: bool = True,
+        asr_stream: Callable[[Iterable], Iterator[Dict[str, Any]]] = None,
+    ):
+        """
+        初始化语音会话
+
+        Args:
+            asr: 识别函数，输入音频数组，返回 transcribe 格式的结果
+            llm: LLM 插件（需支持 stream_chat）
+            tts: TTS 插件（需支持 synthesize_stream / synthesize_array）
+            voice: 音色名称
+            sessions: SessionManager（可选，启用时历史保存在服务端会话中）
+            session_id: 会话ID（sessions 不为空时使用，不存在则新建）
+            max_history: 未启用 sessions 时连接内保留的对话轮数
+            tts_streaming: 是否逐句流式合成
+            asr_stream: 流式识别函数（可选，输入音频块迭代器，产出部分结果）
+        """
+        self.asr = asr
+        self.llm = llm
+        self.tts = tts
+        self.voice = voice
+        self.sessions = sessions
+        self.tts_streaming = tts_streaming
+        self.asr_stream = asr_stream
+        self.session_id = None
+        if sessions is not None:
+            if session_id and sessions.has_session(session_id):
+                self.session_id = session_id
+            else:
+                self.session_id = sessions.create_session(session_id)
+        self._history = deque(maxlen=max(1, max_history) * 2)
+
+    def history(self) -> list:
+        """发送给 LLM 的历史消息"""
+        if self.sessions is not None:
+            return self.sessions.get_context(self.session_id)
+        return list(self._history)
+
+    def remember(self, user: str, assistant: str):
+        """保存一轮对话"""
+        if self.sessions is not None:
+            self.sessions.add_message(self.session_id, "user", user)
+            self.sessions.add_message(self.session_id, "assistant", assistant)
+        else:
+            self._history.append({"role": "user", "content": user})
+            self._history.append({"role": "assistant", "content": assistant})
+
+    def transcribe_stream(self, chunks: Iterable) -> Iterator[Dict[str, Any]]:
+        """
+        边说边识别（需提供 asr_stream）
+
+        Args:
+            chunks: 音频块迭代器（ASR 采样率）
+
+        Yields:
+            dict: 部分识别结果，最后一条 final 为 True
+        """
+        return self.asr_stream(chunks)
+
+    def respond(
+        self, audio: np.ndarray, cancel: threading.Event = None, result: dict = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        处理一句话：识别 -> 流式回复 -> 逐句合成
+
+        Args:
+            audio: 一句话的音频（ASR 采样率）
+            cancel: 取消事件（被打断时设置，回复在当前音频块之后停止）
+            result: 已有的识别结果（如流式识别的最终结果，提供时跳过识别）
+
+        Yields:
+            tuple: (event, data)
+        """
+        from .pipeline import stream_reply
+
+        cancel = cancel or threading.Event()
+        if result is None:
+            result = self.asr(audio)
+        text = (result.get("text") or "").strip() if result.get("success") else ""
+        yield ("asr", text)
+        if not text or cancel.is_set():
+            yield ("done", "")
+            return
+
+        # 记录开始合成的句子（同一句的多个音频块只产出一次 sentence 事件）
+        sentences = []
+        spoken = []
+
+        def synthesize_stream(sentence, voice=None):
+            sentences.append(sentence)
+            return self._synthesize(sentence, voice)
+
+        tts = SimpleNamespace(synthesize_stream=synthesize_stream)
+        replies = stream_reply(self.llm, tts, text, self.voice, self.history())
+        try:
+            for _, chunk in replies:
+                if cancel.is_set():
+                    break
+                while len(spoken) < len(sentences):
+                    spoken.append(sentences[len(spoken)])
+                    yield ("sentence", spoken[-1])
+                yield ("audio", float_to_pcm16(chunk))
+        finally:
+            # 提前结束时关闭流水线（同时停止 LLM 生成）
+            replies.close()
+
+        reply = "".join(spoken)
+        if reply:
+            self.remember(text, reply)
+        yield ("done", reply)
+
+    def _synthesize(self, text: str, voice: str = None) -> Iterator:
+        """合成一句（tts_streaming 为 false 时整句合成后一次返回）"""
+        if self.tts_streaming:
+            return self.tts.synthesize_stream(text, voice)
+        return iter([self.tts.synthesize_array(text, voice)])
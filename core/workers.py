@@ -0,0 +1,565 @@
+# -*- coding: utf-8 -*-
+"""
+Workers - TTS 多副本工作池
+
+功能：
+- 多副本：加载 K 个 TTS 模型副本，突破单模型串行推理的吞吐上限
+- 两种模式：线程（共享进程，省内存）/ 进程（独立 GIL，可绑定 CPU 核心）
+- 最少负载分发：任务交给未完成任务最少的副本
+- 结果队列：所有副本通过同一个结果队列返回结果/流式音频片段
+- 共享缓存：音频缓存（advanced.cache）由工作池统一管理，副本不再各自缓存
+"""
+
+import importlib
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# 流式任务结束标记
+_STREAM_END = object()
+
+
+def _load_class(path: str):
+    """按 "module:Class" 加载类"""
+    module_name, class_name = path.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _configure_worker(cores, torch_threads):
+    """
+    绑定 CPU 核心并设置 torch 线程数
+
+    两者都是进程级设置，只在进程模式的副本中调用时传入（线程模式传 None）
+    """
+    if cores:
+        try:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, cores)
+            else:
+                import psutil
+
+                psutil.Process().cpu_affinity(list(cores))
+        except Exception as e:
+            print(f"⚠️ 绑定 CPU 核心失败: {e}")
+
+    if torch_threads:
+        try:
+            import torch
+
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+
+
+def _worker_main(replica_id, plugin_path, plugin_config, jobs, results, cores, torch_threads):
+    """
+    副本主循环（线程模式和进程模式共用）
+
+    消息格式（results）：
+        ("ready", replica_id, None, {"ok", "sample_rate", "voices", "error"})
+        ("chunk", replica_id, job_id, chunk)
+        ("done", replica_id, job_id, result)
+        ("error", replica_id, job_id, message)
+    """
+    _configure_worker(cores, torch_threads)
+
+    try:
+        plugin = _load_class(plugin_path)(plugin_config)
+        ok = plugin.load(plugin_config)
+        info = {
+            "ok": bool(ok),
+            "sample_rate": plugin.sample_rate,
+            "voices": plugin.get_voices() if ok else [],
+            "model_id": getattr(plugin, "model_id", ""),
+            "error": None if ok else "加载失败",
+        }
+    except Exception as e:
+        plugin = None
+        info = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    results.put(("ready", replica_id, None, info))
+    if not info["ok"]:
+        return
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, method, args, kwargs, stream = job
+        try:
+            if stream:
+                for chunk in getattr(plugin, method)(*args, **kwargs):
+                    results.put(("chunk", replica_id, job_id, chunk))
+                results.put(("done", replica_id, job_id, None))
+            else:
+                result = getattr(plugin, method)(*args, **kwargs)
+                results.put(("done", replica_id, job_id, result))
+        except Exception as e:
+            # 进程模式下异常对象不一定能 pickle，统一转为文本
+            results.put(("error", replica_id, job_id, f"{type(e).__name__}: {e}"))
+
+    plugin.cleanup()
+
+
+@contextmanager
+def _without_main_module():
+    """
+    spawn 子进程时不重新执行主模块
+
+    api/rest_api.py 等入口脚本在导入时就会加载模型，spawn 默认会在子进程中
+    重新执行主模块；副本只需要导入 core.workers 和插件模块
+    """
+    main = sys.modules.get("__main__")
+    if main is None:
+        yield
+        return
+
+    spec = getattr(main, "__spec__", None)
+    path = getattr(main, "__file__", None)
+    main.__spec__ = None
+    if path is not None:
+        del main.__file__
+    try:
+        yield
+    finally:
+        main.__spec__ = spec
+        if path is not None:
+            main.__file__ = path
+
+
+def split_cores(replicas: int) -> List[Optional[List[int]]]:
+    """
+    将当前进程可用的 CPU 核心平均分成 replicas 组
+
+    Returns:
+        list: 每个副本的核心列表（无法获取时为 None）
+    """
+    try:
+        if hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+        else:
+            import psutil
+
+            cores = sorted(psutil.Process().cpu_affinity())
+    except Exception:
+        return [None] * replicas
+
+    if len(cores) < replicas:
+        return [None] * replicas
+    size = len(cores) // replicas
+    return [cores[i * size:(i + 1) * size] for i in range(replicas)]
+
+
+class TTSWorkerPool:
+    """
+    TTS 多副本工作池
+
+    对外提供与 TTS 插件相同的接口（synthesize_array / synthesize_stream /
+    synthesize_bytes / get_voices / sample_rate），可直接替换单个插件实例
+
+    Example:
+        pool = TTSWorkerPool(
+            "plugins.tts.cosyvoice:CosyVoiceTTS", tts_config,
+            {"replicas": 4, "mode": "process"},
+        )
+        pool.load()
+        audio = pool.synthesize_array("你好")
+    """
+
+    # 音频缓存（plugin_config["cache"].enabled 时在 load() 中创建，所有副本共用）
+    cache = None
+
+    def __init__(self, plugin: str, plugin_config: dict = None, config: dict = None):
+        """
+        初始化工作池
+
+        Args:
+            plugin: 插件类路径 "module:Class"
+            plugin_config: 传给每个副本插件的配置
+            config: 工作池配置（advanced.tts_workers）
+                - replicas: 副本数（默认 2）
+                - mode: thread / process（默认 thread）
+                - cpu_affinity: 进程模式下是否将 CPU 核心平均分给各副本（默认 True）
+                - torch_threads: 进程模式下每个副本的 torch 线程数（0 表示 可用核心数 / 副本数）；
+                  torch 线程数是进程级设置，线程模式下各副本与 ASR 等共用同一个线程池，不做修改
+                - start_timeout: 等待副本加载完成的时间（秒，默认 600）
+                - timeout: 单个任务超时时间（秒，默认 60）
+
+        plugin_config["cache"] 启用时由工作池统一缓存：进程模式下各副本的独立缓存会
+        在同一目录下互相淘汰文件，统计也无法汇总，因此副本中的缓存关闭
+        """
+        self.plugin = plugin
+        self.plugin_config = plugin_config or {}
+        self.cache_config = self.plugin_config.get("cache") or {}
+        self.config = config or {}
+        self.replicas = max(1, int(self.config.get("replicas", 2)))
+        self.mode = self.config.get("mode", "thread")
+        self.timeout = self.config.get("timeout", 60)
+
+        self._replicas = []
+        self._jobs = {}  # job_id -> (replica_id, Future 或 流式队列)
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._results = None
+        self._collector = None
+        self._running = False
+        self._info = {}
+
+    @property
+    def name(self) -> str:
+        return f"{self.plugin.split(':')[-1]}x{self.replicas}"
+
+    @property
+    def sample_rate(self) -> int:
+        return self._info.get("sample_rate") or self.plugin_config.get("sample_rate", 22050)
+
+    def load(self, config: dict = None) -> bool:
+        """
+        启动全部副本并等待加载完成（副本并行加载）
+
+        Returns:
+            bool: 至少一个副本加载成功
+        """
+        if self._running:
+            return True
+
+        replica_config = self.plugin_config
+        if self.cache_config.get("enabled", False):
+            from .cache import AudioCache
+
+            self.cache = AudioCache(self.cache_config)
+            replica_config = {**self.plugin_config, "cache": {}}
+            print(f"   音频缓存（工作池共用）: {self.cache.directory}")
+
+        if self.mode == "process":
+            ctx = multiprocessing.get_context("spawn")
+            self._results = ctx.Queue()
+            make_queue = ctx.Queue
+        else:
+            self._results = queue.Queue()
+            make_queue = queue.Queue
+
+        if self.mode == "process" and self.config.get("cpu_affinity", True):
+            core_sets = split_cores(self.replicas)
+        else:
+            core_sets = [None] * self.replicas
+
+        torch_threads = None
+        if self.mode == "process":
+            torch_threads = self.config.get("torch_threads", 0)
+            if not torch_threads:
+                torch_threads = max(1, (os.cpu_count() or 1) // self.replicas)
+        elif self.config.get("torch_threads"):
+            print("⚠️ tts_workers.torch_threads 仅在进程模式下生效（线程模式共用进程级 torch 线程池）")
+
+        print(f"🔄 启动 TTS 工作池: {self.replicas} 个副本 ({self.mode})")
+        for replica_id in range(self.replicas):
+            jobs = make_queue()
+            args = (
+                replica_id,
+                self.plugin,
+                replica_config,
+                jobs,
+                self._results,
+                core_sets[replica_id],
+                torch_threads,
+            )
+            if self.mode == "process":
+                handle = ctx.Process(
+                    target=_worker_main, args=args, name=f"tts-replica-{replica_id}", daemon=True
+                )
+                with _without_main_module():
+                    handle.start()
+            else:
+                handle = threading.Thread(
+                    target=_worker_main, args=args, name=f"tts-replica-{replica_id}", daemon=True
+                )
+                handle.start()
+            self._replicas.append(
+                {
+                    "id": replica_id,
+                    "jobs": jobs,
+                    "handle": handle,
+                    "cores": core_sets[replica_id],
+                    "outstanding": 0,
+                    "completed": 0,
+                    "ready": False,
+                    "loaded": None,
+                }
+            )
+
+        self._running = True
+        self._collector = threading.Thread(
+            target=self._collect, name="tts-pool-collector", daemon=True
+        )
+        self._collector.start()
+
+        # 等待全部副本报告加载结果
+        self._ready.wait(self.config.get("start_timeout", 600))
+        ready = [r for r in self._replicas if r["ready"]]
+        print(f"✅ TTS 工作池就绪: {len(ready)}/{self.replicas} 个副本")
+        return bool(ready)
+
+    def is_loaded(self) -> bool:
+        return self._running and any(r["ready"] for r in self._replicas)
+
+    def get_voices(self) -> List[Dict[str, str]]:
+        return self._info.get("voices", [])
+
+    def submit(self, method: str, *args, **kwargs) -> Future:
+        """
+        提交非流式任务
+
+        Args:
+            method: 插件方法名（如 synthesize_array）
+
+        Returns:
+            Future: 结果
+        """
+        future = Future()
+        self._dispatch(method, args, kwargs, stream=False, sink=future)
+        return future
+
+    def stream(self, method: str, *args, **kwargs):
+        """
+        提交流式任务，逐个返回副本产出的片段
+
+        Yields:
+            副本插件方法产出的每个元素
+        """
+        chunks = queue.Queue()
+        job_id = self._dispatch(method, args, kwargs, stream=True, sink=chunks)
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"TTS 副本响应超时 ({self.timeout}s)")
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 调用方提前退出时丢弃后续片段
+            with self._lock:
+                entry = self._jobs.get(job_id)
+                if entry is not None:
+                    self._jobs[job_id] = (entry[0], None)
+
+    def warmup(self, voices: List[str] = None, text: str = "你好。"):
+        """
+        预热全部副本
+
+        每个音色提交 replicas 个任务，按最少未完成任务分发时会均匀落到每个副本
+
+        Args:
+            voices: 音色列表（默认全部音色）
+            text: 预热文本
+        """
+        if voices is None:
+            voices = [v["name"] for v in self.get_voices()]
+        futures = [
+            self.submit("warmup", [voice], text)
+            for voice in voices
+            for _ in range(len(self._replicas))
+        ]
+        for future in futures:
+            future.result(self.timeout)
+
+    def synthesize_array(self, text: str, voice: str = None, **kwargs):
+        cache_key = self._cache_key(text, voice, **kwargs)
+        if cache_key:
+            audio = self.cache.get(cache_key)
+            if audio is not None:
+                return audio
+
+        audio = self.submit("synthesize_array", text, voice, **kwargs).result(self.timeout)
+        if cache_key:
+            self.cache.put(cache_key, audio)
+        return audio
+
+    def synthesize_stream(self, text: str, voice: str = None, **kwargs):
+        # 流式模式下不支持变速（与插件一致），缓存键不含语速
+        kwargs.pop("speed", None)
+        cache_key = self._cache_key(text, voice, **kwargs)
+        if not cache_key:
+            return self.stream("synthesize_stream", text, voice, **kwargs)
+        return self._cached_stream(cache_key, text, voice, **kwargs)
+
+    def _cached_stream(self, cache_key: str, text: str, voice: str = None, **kwargs):
+        """流式合成，命中缓存时整段返回，完整合成后写入缓存"""
+        from .audio import concat_audio
+
+        audio = self.cache.get(cache_key)
+        if audio is not None:
+            yield audio
+            return
+
+        chunks = []
+        for chunk in self.stream("synthesize_stream", text, voice, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # 中途断开的请求不会走到这里
+        self.cache.put(cache_key, concat_audio(chunks))
+
+    def _cache_key(self, text: str, voice: str = None, **kwargs) -> str:
+        """
+        生成缓存键（未启用缓存时返回空字符串）
+
+        与 CosyVoiceTTS._cache_key 的字段一致；未指定音色时使用配置的默认音色
+        """
+        if self.cache is None:
+            return ""
+        from .cache import AudioCache
+
+        return AudioCache.make_key(
+            text,
+            voice=voice or self.plugin_config.get("default_voice", ""),
+            instruction=kwargs.get("instruction", ""),
+            speed=kwargs.get("speed", 1.0),
+            model_id=self._info.get("model_id", ""),
+            sample_rate=self.sample_rate,
+        )
+
+    def synthesize_bytes(self, text: str, voice: str = None, **kwargs) -> bytes:
+        from .audio import encode_wav
+
+        return encode_wav(self.synthesize_array(text, voice, **kwargs), self.sample_rate)
+
+    def synthesize(self, text: str, voice: str = None, **kwargs) -> str:
+        return self.submit("synthesize", text, voice, **kwargs).result(self.timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取各副本负载
+
+        Returns:
+            dict: 副本数、模式、每个副本的就绪状态/进行中任务数/完成数/核心
+        """
+        with self._lock:
+            return {
+                "replicas": self.replicas,
+                "mode": self.mode,
+                "workers": [
+                    {
+                        "id": r["id"],
+                        "ready": r["ready"],
+                        "outstanding": r["outstanding"],
+                        "completed": r["completed"],
+                        "cores": r["cores"],
+                    }
+                    for r in self._replicas
+                ],
+            }
+
+    def cleanup(self):
+        """停止全部副本"""
+        if not self._running:
+            return
+        self._running = False
+        for r in self._replicas:
+            r["jobs"].put(None)
+        for r in self._replicas:
+            r["handle"].join(timeout=10)
+        self._collector.join(timeout=2)
+        self._replicas = []
+
+    def _dispatch(self, method, args, kwargs, stream, sink) -> int:
+        """选择负载最低的副本并发送任务"""
+        with self._lock:
+            candidates = [r for r in self._replicas if r["ready"]]
+            if not candidates:
+                raise RuntimeError("没有可用的 TTS 副本")
+            replica = min(candidates, key=lambda r: r["outstanding"])
+            replica["outstanding"] += 1
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = (replica["id"], sink)
+        replica["jobs"].put((job_id, method, args, kwargs, stream))
+        return job_id
+
+    def _collect(self):
+        """结果收集线程：分发副本返回的消息，并检测退出的副本进程"""
+        while self._running:
+            try:
+                kind, replica_id, job_id, payload = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._check_alive()
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind == "ready":
+                self._on_ready(replica_id, payload)
+                continue
+
+            with self._lock:
+                entry = self._jobs.get(job_id)
+                if kind != "chunk":
+                    self._jobs.pop(job_id, None)
+                    replica = self._replicas[replica_id]
+                    replica["outstanding"] -= 1
+                    replica["completed"] += 1
+            if entry is None or entry[1] is None:
+                continue
+            self._deliver(entry[1], kind, payload)
+
+    def _deliver(self, sink, kind, payload):
+        if isinstance(sink, Future):
+            if kind == "done":
+                sink.set_result(payload)
+            elif kind == "error":
+                sink.set_exception(RuntimeError(payload))
+        elif kind == "chunk":
+            sink.put(payload)
+        elif kind == "done":
+            sink.put(_STREAM_END)
+        else:
+            sink.put(RuntimeError(payload))
+
+    def _on_ready(self, replica_id, info):
+        replica = self._replicas[replica_id]
+        replica["loaded"] = info["ok"]
+        if info["ok"]:
+            replica["ready"] = True
+            if not self._info:
+                self._info = {
+                    "sample_rate": info["sample_rate"],
+                    "voices": info["voices"],
+                    "model_id": info.get("model_id", ""),
+                }
+        else:
+            print(f"❌ TTS 副本 {replica_id} 加载失败: {info['error']}")
+        if all(r["loaded"] is not None for r in self._replicas):
+            self._ready.set()
+
+    def _check_alive(self):
+        """副本异常退出时，标记不可用并让其未完成任务失败"""
+        for replica in self._replicas:
+            if replica["handle"].is_alive() or replica["loaded"] is False:
+                continue
+            # 标记为不可用（加载中退出或运行中退出）
+            replica["loaded"] = False
+            replica["ready"] = False
+            if all(r["loaded"] is not None for r in self._replicas):
+                self._ready.set()
+            with self._lock:
+                failed = [
+                    (job_id, sink)
+                    for job_id, (rid, sink) in self._jobs.items()
+                    if rid == replica["id"]
+                ]
+                for job_id, _ in failed:
+                    self._jobs.pop(job_id)
+                replica["outstanding"] = 0
+            if failed:
+                print(f"❌ TTS 副本 {replica['id']} 已退出，{len(failed)} 个任务失败")
+            for _, sink in failed:
+                if sink is not None:
+                    self._deliver(sink, "error", "TTS 副本已退出")
@@ -17,6 +17,7 @@ from typing import Generator
 import torch
 import numpy as np
 import threading
+import contextvars
 import time
 from torch.nn import functional as F
 from contextlib import nullcontext
@@ -185,7 +186,8 @@ class CosyVoiceModel:
             self.mel_overlap_dict[this_uuid] = torch.zeros(1, 80, 0)
             self.flow_cache_dict[this_uuid] = torch.zeros(1, 80, 0, 2)
         if source_speech_token.shape[1] == 0:
-            p = threading.Thread(target=self.llm_job, args=(text, prompt_text, llm_prompt_speech_token, llm_embedding, this_uuid))
+            # run llm_job in a copy of the caller's context so that contextvars (e.g. tracing) propagate
+            p = threading.Thread(target=contextvars.copy_context().run, args=(self.llm_job, text, prompt_text, llm_prompt_speech_token, llm_embedding, this_uuid))
         else:
             p = threading.Thread(target=self.vc_job, args=(source_speech_token, this_uuid))
         p.start()
@@ -336,7 +338,8 @@ class CosyVoice2Model(CosyVoiceModel):
             self.tts_speech_token_dict[this_uuid], self.llm_end_dict[this_uuid] = [], False
             self.hift_cache_dict[this_uuid] = None
         if source_speech_token.shape[1] == 0:
-            p = threading.Thread(target=self.llm_job, args=(text, prompt_text, llm_prompt_speech_token, llm_embedding, this_uuid))
+            # run llm_job in a copy of the caller's context so that contextvars (e.g. tracing) propagate
+            p = threading.Thread(target=contextvars.copy_context().run, args=(self.llm_job, text, prompt_text, llm_prompt_speech_token, llm_embedding, this_uuid))
         else:
             p = threading.Thread(target=self.vc_job, args=(source_speech_token, this_uuid))
         p.start()
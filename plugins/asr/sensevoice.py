@@ -14,7 +14,7 @@ import re
 from typing import Dict, Any, List
 
 # 导入基类
-from ..base import BaseASRPlugin
+from ..base import AudioInput, BaseASRPlugin
 
 
 class SenseVoiceASR(BaseASRPlugin):
@@ -90,12 +90,12 @@ class SenseVoiceASR(BaseASRPlugin):
             print(f"❌ 加载失败: {e}")
             return False
 
-    def transcribe(self, audio_path: str, language: str = "auto") -> Dict[str, Any]:
+    def transcribe(self, audio: AudioInput, language: str = "auto") -> Dict[str, Any]:
         """
         语音识别
 
         Args:
-            audio_path: 音频文件路径
+            audio: 音频文件路径 / 音频文件字节 / float32 数组
             language: 语言代码
                 - auto: 自动检测
                 - zh: 中文
@@ -117,28 +117,17 @@ class SenseVoiceASR(BaseASRPlugin):
             return {"success": False, "error": "模型未加载", "text": "", "language": ""}
 
         try:
-            # 执行识别
+            # 执行识别（数组输入直接送入模型，不经过临时文件）
             result = self.model.generate(
-                input=audio_path, language=language, use_itn=True
+                input=self.prepare_audio(audio),
+                language=language,
+                use_itn=True,
+                fs=self.sample_rate,
             )
 
             # 解析结果
             if result and len(result) > 0:
-                raw_text = result[0].get("text", "")
-
-                # 移除标签（如 <|zh|><|NEUTRAL|><|Speech|>）
-                text = re.sub(r"<\|[^|]+\|>", "", raw_text).strip()
-
-                # 提取语言标签
-                lang_match = re.search(r"<\|(\w{2})\|>", raw_text)
-                detected_lang = lang_match.group(1) if lang_match else language
-
-                return {
-                    "success": True,
-                    "text": text,
-                    "language": detected_lang,
-                    "raw_result": result[0],
-                }
+                return self._parse_result(result[0], language)
             else:
                 return {
                     "success": False,
@@ -150,6 +139,68 @@ class SenseVoiceASR(BaseASRPlugin):
         except Exception as e:
             return {"success": False, "error": str(e), "text": "", "language": ""}
 
+    def transcribe_batch(
+        self, audio_list: List[AudioInput], language: str = "auto"
+    ) -> List[Dict[str, Any]]:
+        """
+        批量语音识别
+
+        多条音频合并为一次 generate 调用，由 funasr 组批推理
+
+        Args:
+            audio_list: 音频输入列表（格式同 transcribe）
+            language: 语言代码（整批共用）
+
+        Returns:
+            list: 与输入等长的识别结果列表
+        """
+        if not self.is_loaded():
+            return [
+                {"success": False, "error": "模型未加载", "text": "", "language": ""}
+                for _ in audio_list
+            ]
+        if not audio_list:
+            return []
+
+        try:
+            results = self.model.generate(
+                input=[self.prepare_audio(audio) for audio in audio_list],
+                language=language,
+                use_itn=True,
+                batch_size=len(audio_list),
+                fs=self.sample_rate,
+            )
+        except Exception as e:
+            return [
+                {"success": False, "error": str(e), "text": "", "language": ""}
+                for _ in audio_list
+            ]
+
+        if not results or len(results) != len(audio_list):
+            return [
+                {"success": False, "error": "未能识别", "text": "", "language": ""}
+                for _ in audio_list
+            ]
+        return [self._parse_result(item, language) for item in results]
+
+    def _parse_result(self, item: Dict[str, Any], language: str) -> Dict[str, Any]:
+        """解析单条 generate 输出"""
+        raw_text = item.get("text", "")
+
+        # 移除标签（如 <|zh|><|NEUTRAL|><|Speech|>）
+        text = re.sub(r"<\|[^|]+\|>", "", raw_text).strip()
+
+        # 提取语言标签
+        lang_match = re.search(r"<\|(\w{2})\|>", raw_text)
+        detected_lang = lang_match.group(1) if lang_match else language
+
+        return {
+            "success": True,
+            "text": text,
+            "language": detected_lang,
+            "raw_result": item,
+        }
+
     def get_supported_languages(self) -> List[str]:
         """
         获取支持的语言列表
@@ -6,7 +6,10 @@ Plugin Base - 插件基类模块
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
+
+# ASR 音频输入：文件路径 / 音频文件字节 / float32 采样数组
+AudioInput = Union[str, bytes, Any]
 
 # ==================== ASR 插件基类 ====================
 
@@ -27,7 +30,7 @@ class BaseASRPlugin(ABC):
                 # 加载模型
                 return True
 
-            def transcribe(self, audio_path: str, language: str = "auto") -> dict:
+            def transcribe(self, audio, language: str = "auto") -> dict:
                 # 识别语音
                 return {"text": "识别结果", "language": "zh"}
     """
@@ -78,12 +81,15 @@ class BaseASRPlugin(ABC):
         pass
 
     @abstractmethod
-    def transcribe(self, audio_path: str, language: str = "auto") -> Dict[str, Any]:
+    def transcribe(self, audio: AudioInput, language: str = "auto") -> Dict[str, Any]:
         """
         语音识别
 
         Args:
-            audio_path: 音频文件路径
+            audio: 音频输入
+                - str: 音频文件路径
+                - bytes: 音频文件内容（如上传的 wav）
+                - np.ndarray: float32 单声道采样，采样率为 sample_rate
             language: 语言代码 (auto/zh/en/ja/ko/yue/...)
 
         Returns:
@@ -98,6 +104,128 @@ class BaseASRPlugin(ABC):
         """
         pass
 
+    def transcribe_batch(
+        self, audio_list: List[AudioInput], language: str = "auto"
+    ) -> List[Dict[str, Any]]:
+        """
+        批量语音识别（可选重写）
+
+        默认实现逐条调用 transcribe，支持批量推理的插件应重写此方法
+
+        Args:
+            audio_list: 音频输入列表（格式同 transcribe）
+            language: 语言代码
+
+        Returns:
+            list: 与输入等长的识别结果列表，格式同 transcribe
+        """
+        return [self.transcribe(audio, language) for audio in audio_list]
+
+    def transcribe_stream(
+        self,
+        chunks: Iterable,
+        language: str = "auto",
+        decode: Callable[[Any], Dict[str, Any]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        流式识别（可选重写）
+
+        边接收音频边识别：每新增 streaming.chunk_size 毫秒音频输出一次部分结果，
+        停顿处确认已识别的文本，最后输出完整结果。
+        默认实现对滑动窗口重复调用 transcribe，适用于解码很快的非自回归模型；
+        streaming.asr_streaming 为 false 时收完全部音频后只识别一次
+
+        Args:
+            chunks: 音频块迭代器（float32 数组或 16bit PCM 字节，采样率为 sample_rate）
+            language: 语言代码
+            decode: 单次识别函数（默认 transcribe，可传入经由合批队列的识别函数）
+
+        Yields:
+            dict: 识别结果
+            {
+                "success": bool,
+                "final": bool,       # 最后一条为 True
+                "text": str,         # 已确认文本 + 部分结果
+                "committed": str,    # 已确认文本（只会追加，不会再改变）
+                "partial": str,      # 未确认部分
+                "language": str
+            }
+        """
+        from core.asr_stream import StreamingTranscriber
+
+        transcriber = StreamingTranscriber(
+            decode or (lambda audio: self.transcribe(audio, language)),
+            self.sample_rate,
+            self.config.get("streaming"),
+            self.config.get("vad"),
+        )
+        return transcriber.run(chunks)
+
+    def transcribe_long(
+        self,
+        audio: AudioInput,
+        language: str = "auto",
+        decode_batch: Callable[[List[Any]], List[Dict[str, Any]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        长音频识别（可选重写）
+
+        逐块解码音频，按静音切成不超过 long_audio.max_segment_s 的片段，
+        按时长排序组批后并行识别，片段结果完成一个返回一个，最后返回拼接的全文
+
+        Args:
+            audio: 音频输入（格式同 transcribe，另可传入可 seek 的文件对象，逐块读取）
+            language: 语言代码
+            decode_batch: 批量识别函数（默认 transcribe_batch）
+
+        Yields:
+            dict: 片段结果（含 index / start / end / text），
+                  最后一条 final 为 True，含全文和按时间排序的 segments
+        """
+        from core.audio import iter_audio_blocks
+        from core.longform import LongFormTranscriber
+
+        transcriber = LongFormTranscriber(
+            decode_batch or (lambda audio_list: self.transcribe_batch(audio_list, language)),
+            self.sample_rate,
+            self.config.get("long_audio"),
+            self.config.get("vad"),
+        )
+        return transcriber.run(iter_audio_blocks(audio, self.sample_rate))
+
+    @property
+    def sample_rate(self) -> int:
+        """
+        输入音频采样率（数组输入按此采样率解释）
+
+        Returns:
+            int: 采样率，默认 16000
+        """
+        return self.config.get("sample_rate", 16000)
+
+    def prepare_audio(self, audio: AudioInput):
+        """
+        统一音频输入格式
+
+        字节会在内存中解码并重采样到 sample_rate，路径原样返回
+
+        Args:
+            audio: 音频输入
+
+        Returns:
+            str 或 np.ndarray: 文件路径或 float32 数组
+        """
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            from core.audio import decode_audio
+
+            return decode_audio(bytes(audio), self.sample_rate)
+        if isinstance(audio, str):
+            return audio
+
+        from core.audio import to_numpy
+
+        return to_numpy(audio)
+
     def is_loaded(self) -> bool:
         """
         检查模型是否已加载
@@ -116,11 +244,26 @@ class BaseASRPlugin(ABC):
         """
         return ["auto", "zh", "en"]
 
+    def warmup(self, seconds: float = 1.0):
+        """
+        预热（可选重写）
+
+        识别一段静音，触发首次推理的延迟初始化和算子选择，
+        避免第一个真实请求承担这部分耗时
+
+        Args:
+            seconds: 静音时长（秒）
+        """
+        import numpy as np
+
+        self.transcribe(np.zeros(int(self.sample_rate * seconds), dtype=np.float32))
+
     def cleanup(self):
         """
         清理资源（可选重写）
 
-        在插件卸载时调用
+        在插件卸载或空闲超时时调用，释放模型占用的内存；
+        之后可再次调用 load 重新加载
         """
         self.model = None
         self._loaded = False
@@ -213,6 +356,56 @@ class BaseTTSPlugin(ABC):
         """
         pass
 
+    def synthesize_stream(self, text: str, voice: str = None, **kwargs) -> Iterator:
+        """
+        流式语音合成（可选重写）
+
+        Args:
+            text: 要合成的文本
+            voice: 音色名称 (可选)
+            **kwargs: 额外参数
+
+        Yields:
+            np.ndarray: 一维 float32 音频片段，采样率为 sample_rate
+        """
+        raise NotImplementedError(f"{self.name} 不支持流式合成")
+
+    def synthesize_array(self, text: str, voice: str = None, **kwargs):
+        """
+        内存合成，返回完整音频（可选重写）
+
+        默认实现拼接 synthesize_stream 的全部片段
+
+        Returns:
+            np.ndarray: 一维 float32 音频，采样率为 sample_rate
+        """
+        from core.audio import concat_audio
+
+        return concat_audio(list(self.synthesize_stream(text, voice, **kwargs)))
+
+    def synthesize_bytes(self, text: str, voice: str = None, **kwargs) -> bytes:
+        """
+        内存合成，返回 WAV 字节（不落盘）
+
+        Returns:
+            bytes: WAV 文件内容
+        """
+        from core.audio import encode_wav
+
+        return encode_wav(
+            self.synthesize_array(text, voice, **kwargs), self.sample_rate
+        )
+
+    @property
+    def sample_rate(self) -> int:
+        """
+        输出音频采样率（可选重写）
+
+        Returns:
+            int: 采样率，默认 22050
+        """
+        return self.config.get("sample_rate", 22050)
+
     @abstractmethod
     def get_voices(self) -> List[Dict[str, str]]:
         """
@@ -250,29 +443,51 @@ class BaseTTSPlugin(ABC):
         """
         return ["wav"]
 
+    def warmup(self, voices: List[str] = None, text: str = "你好。"):
+        """
+        预热（可选重写）
+
+        每个音色合成一句短文本，触发首次推理的延迟初始化和算子选择
+
+        Args:
+            voices: 音色列表（默认全部音色）
+            text: 预热文本
+        """
+        if voices is None:
+            voices = [v["name"] for v in self.get_voices()]
+        for voice in voices:
+            self.synthesize_array(text, voice)
+
     def cleanup(self):
         """
         清理资源（可选重写）
 
-        在插件卸载时调用
+        在插件卸载或空闲超时时调用，释放模型占用的内存；
+        之后可再次调用 load 重新加载
         """
         self.model = None
         self._loaded = False
 
 
-# ==================== LLM 插件基类（预留） ====================
+# ==================== LLM 插件基类 ====================
 
 
 class BaseLLMPlugin(ABC):
     """
-    LLM (大语言模型) 插件基类（预留）
+    LLM (大语言模型) 插件基类
 
-    方案A中 LLM 通过 Ollama 调用，不需要插件
-    方案B/C 可以实现自定义 LLM 后端
+    所有 LLM 后端（如 Ollama）必须继承此类并实现抽象方法
     """
 
     def __init__(self, config: dict = None):
+        """
+        初始化插件
+
+        Args:
+            config: 插件配置字典
+        """
         self.config = config or {}
+        self._loaded = False
 
     @property
     @abstractmethod
@@ -304,9 +519,39 @@ class BaseLLMPlugin(ABC):
     @abstractmethod
     def stream_chat(self, message: str, history: list = None, **kwargs):
         """
-        流式对话（方案C实现）
+        流式对话
+
+        Args:
+            message: 用户消息
+            history: 历史对话
+            **kwargs: 生成参数（同 chat）
 
         Yields:
             str: 生成的文本片段
         """
         pass
+
+    def is_loaded(self) -> bool:
+        """
+        检查插件是否已加载
+
+        Returns:
+            bool: 是否已加载
+        """
+        return self._loaded
+
+    def warmup(self):
+        """
+        预热（可选重写）
+
+        如让后端提前把模型加载到显存
+        """
+        pass
+
+    def cleanup(self):
+        """
+        清理资源（可选重写）
+
+        在插件卸载时调用
+        """
+        self._loaded = False
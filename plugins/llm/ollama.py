@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Ollama LLM 插件
+
+基于 Ollama 本地大模型服务的对话插件
+支持多轮对话、流式输出、多模态（图片）
+
+GitHub: https://github.com/ollama/ollama
+"""
+
+import json
+from typing import Dict, Iterator, List, Any
+
+# 导入基类
+from ..base import BaseLLMPlugin
+
+
+class OllamaError(RuntimeError):
+    """Ollama 调用失败"""
+
+
+class OllamaLLM(BaseLLMPlugin):
+    """
+    Ollama 对话插件
+
+    特点：
+    - 连接复用：全局共享 requests.Session 连接池，避免每次请求重新建连
+    - 模型常驻：通过 keep_alive 保持模型驻留显存，启动时预加载
+    - 流式输出：逐片段返回生成内容
+    """
+
+    DEFAULT_SYSTEM_PROMPT = "请用简洁的语言回答，确保意思完整。回答要简短精炼，不要冗长。"
+
+    def __init__(self, config: dict = None):
+        super().__init__(config)
+        self.session = None
+
+    @property
+    def name(self) -> str:
+        return "ollama"
+
+    @property
+    def version(self) -> str:
+        return "1.0.0"
+
+    @property
+    def url(self) -> str:
+        return self.config.get("url", "http://localhost:11434").rstrip("/")
+
+    @property
+    def model(self) -> str:
+        return self.config.get("model", "gemma3:4b")
+
+    def load(self, config: dict = None) -> bool:
+        """
+        初始化连接池并预加载模型
+
+        Args:
+            config: 配置字典（models.llm.ollama）
+                - url: Ollama 服务地址
+                - model: 模型名称
+                - keep_alive: 模型驻留时长（如 "30m"，-1 表示永久）
+                - preload: 是否在启动时预加载模型
+                - pool_size: 连接池大小
+
+        Returns:
+            bool: 是否加载成功
+        """
+        if config:
+            self.config = config
+
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+        except ImportError as e:
+            print(f"❌ 导入失败: {e}")
+            print(f"   请确保已安装 requests: pip install requests")
+            return False
+
+        pool_size = self.config.get("pool_size", 8)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._loaded = True
+
+        print(f"✅ Ollama 连接池已创建")
+        print(f"   地址: {self.url}")
+        print(f"   模型: {self.model}")
+
+        if self.config.get("preload", True):
+            self.preload()
+
+        return True
+
+    def warmup(self):
+        """预热：预加载模型（未在 load 中预加载时使用）"""
+        if not self.preload():
+            raise OllamaError(f"模型预加载失败: {self.model}")
+
+    def preload(self) -> bool:
+        """
+        预加载模型到显存
+
+        发送不含 prompt 的请求，Ollama 只加载模型不生成内容，
+        避免首个真实请求承担模型冷启动时间
+
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            response = self.session.post(
+                f"{self.url}/api/generate",
+                json={"model": self.model, "keep_alive": self._keep_alive()},
+                timeout=self.config.get("timeout", 60),
+            )
+            if response.status_code == 200:
+                print(f"✅ Ollama 模型已预加载: {self.model}")
+                return True
+            print(f"⚠️ Ollama 模型预加载失败: HTTP {response.status_code}")
+        except Exception as e:
+            print(f"⚠️ Ollama 模型预加载失败: {e}")
+        return False
+
+    def build_messages(
+        self, message: str, history: list = None, **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        构造消息列表
+
+        Args:
+            message: 用户消息
+            history: 历史对话 [{"role": ..., "content": ...}, ...]
+            **kwargs:
+                - system_prompt: 系统提示词
+                - images: 本轮图片（base64 列表）
+
+        Returns:
+            list: Ollama /api/chat 消息列表
+        """
+        system_prompt = kwargs.get("system_prompt") or self.config.get(
+            "system_prompt", self.DEFAULT_SYSTEM_PROMPT
+        )
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(history or [])
+
+        user_message = {"role": "user", "content": message}
+        if kwargs.get("images"):
+            user_message["images"] = kwargs["images"]
+        messages.append(user_message)
+        return messages
+
+    def chat(self, message: str, history: list = None, **kwargs) -> str:
+        """
+        对话生成
+
+        Args:
+            message: 用户消息
+            history: 历史对话
+            **kwargs: 生成参数
+                - system_prompt: 系统提示词
+                - max_tokens: 最大token数
+                - temperature: 温度
+                - top_p: top-p采样
+
+        Returns:
+            str: AI回复
+
+        Raises:
+            OllamaError: 调用失败
+        """
+        return self.chat_messages(self.build_messages(message, history, **kwargs), **kwargs)
+
+    def stream_chat(self, message: str, history: list = None, **kwargs) -> Iterator[str]:
+        """
+        流式对话
+
+        Yields:
+            str: 生成的文本片段
+
+        Raises:
+            OllamaError: 调用失败
+        """
+        return self.stream_messages(
+            self.build_messages(message, history, **kwargs), **kwargs
+        )
+
+    def chat_messages(self, messages: List[Dict[str, Any]], **kwargs) -> str:
+        """
+        使用完整消息列表对话（调用方自行管理 system/history）
+
+        Args:
+            messages: Ollama /api/chat 消息列表
+            **kwargs: 生成参数（同 chat）
+
+        Returns:
+            str: AI回复
+        """
+        self._check_loaded()
+        try:
+            response = self.session.post(
+                f"{self.url}/api/chat",
+                json=self._payload(messages, stream=False, **kwargs),
+                timeout=self.config.get("timeout", 60),
+            )
+        except Exception as e:
+            raise OllamaError(str(e))
+
+        if response.status_code != 200:
+            raise OllamaError(f"HTTP {response.status_code}")
+        return response.json().get("message", {}).get("content", "")
+
+    def stream_messages(
+        self, messages: List[Dict[str, Any]], **kwargs
+    ) -> Iterator[str]:
+        """
+        使用完整消息列表流式对话
+
+        Yields:
+            str: 生成的文本片段
+        """
+        self._check_loaded()
+        try:
+            response = self.session.post(
+                f"{self.url}/api/chat",
+                json=self._payload(messages, stream=True, **kwargs),
+                timeout=self.config.get("timeout", 60),
+                stream=True,
+            )
+        except Exception as e:
+            raise OllamaError(str(e))
+
+        with response:
+            if response.status_code != 200:
+                raise OllamaError(f"HTTP {response.status_code}")
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise OllamaError(data["error"])
+                    content = data.get("message", {}).get("content", "")
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        break
+            except OllamaError:
+                raise
+            except Exception as e:
+                raise OllamaError(str(e))
+
+    def cleanup(self):
+        """关闭连接池"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        super().cleanup()
+
+    def _check_loaded(self):
+        if not self.is_loaded() or self.session is None:
+            raise OllamaError("Ollama 插件未加载")
+
+    def _keep_alive(self):
+        return self.config.get("keep_alive", "30m")
+
+    def _payload(self, messages, stream: bool, **kwargs) -> Dict[str, Any]:
+        """构造 /api/chat 请求体（kwargs 优先于配置，支持热更新）"""
+        return {
+            "model": kwargs.get("model") or self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self._keep_alive(),
+            "options": {
+                "temperature": kwargs.get(
+                    "temperature", self.config.get("temperature", 0.7)
+                ),
+                "top_p": kwargs.get("top_p", self.config.get("top_p", 0.9)),
+                "num_predict": kwargs.get(
+                    "max_tokens", self.config.get("max_tokens", 80)
+                ),
+            },
+        }
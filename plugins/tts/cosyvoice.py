@@ -15,6 +15,9 @@ from typing import Dict, List, Any
 
 # 导入基类
 from ..base import BaseTTSPlugin
+from core.audio import concat_audio, to_numpy
+from core.cache import AudioCache
+from core.tracing import mark, span, traced, traced_first
 
 
 class CosyVoiceTTS(BaseTTSPlugin):
@@ -40,6 +43,10 @@ class CosyVoiceTTS(BaseTTSPlugin):
         "清新女声",  # CosyVoice2新增
     ]
 
+    # 音频缓存（advanced.cache.enabled 时创建）
+    cache = None
+    model_id = ""
+
     @property
     def name(self) -> str:
         return "cosyvoice"
@@ -97,7 +104,15 @@ class CosyVoiceTTS(BaseTTSPlugin):
                 return False
 
             self.model = CosyVoice(model_path)
+            self.model_id = os.path.basename(os.path.normpath(model_path))
             self._loaded = True
+            self._instrument_model()
+
+            # 音频缓存
+            cache_config = config.get("cache") or {}
+            if cache_config.get("enabled", False):
+                self.cache = AudioCache(cache_config)
+                print(f"   音频缓存: {self.cache.directory}")
 
             # 获取可用音色
             voices = self.get_voices()
@@ -117,23 +132,180 @@ class CosyVoiceTTS(BaseTTSPlugin):
             traceback.print_exc()
             return False
 
+    @property
+    def sample_rate(self) -> int:
+        """输出音频采样率（优先使用模型自身的采样率）"""
+        if self.model is not None and hasattr(self.model, "sample_rate"):
+            return self.model.sample_rate
+        return self.config.get("cosyvoice", {}).get("sample_rate", 22050)
+
     def synthesize(self, text: str, voice: str = None, **kwargs) -> str:
         """
-        语音合成
+        语音合成（文件接口）
+
+        synthesize_bytes 的薄封装，写入唯一命名的临时文件，
+        供需要文件路径的调用方使用（如 Gradio）
 
         Args:
             text: 要合成的文本
             voice: 音色名称（默认使用配置中的默认值）
             **kwargs: 额外参数
-                - speed: 语速 (未使用，CosyVoice暂不支持)
+                - speed: 语速 (0.5-2.0)
                 - instruction: 指令（如"用开心的语气说"）
 
         Returns:
             str: 生成的音频文件路径
         """
+        wav_bytes = self.synthesize_bytes(text, voice, **kwargs)
+
+        # 唯一文件名，避免并发请求相互覆盖
+        fd, output_path = tempfile.mkstemp(prefix="cosyvoice_", suffix=".wav")
+        with os.fdopen(fd, "wb") as f:
+            f.write(wav_bytes)
+        return output_path
+
+    def synthesize_array(self, text: str, voice: str = None, **kwargs):
+        """
+        内存合成，返回完整音频
+
+        文本会被 CosyVoice 按句切分为多段，这里拼接全部片段
+
+        Args:
+            text: 要合成的文本
+            voice: 音色名称（默认使用配置中的默认值）
+            **kwargs: 额外参数
+                - speed: 语速 (0.5-2.0)
+                - instruction: 指令（如"用开心的语气说"）
+
+        Returns:
+            np.ndarray: 一维 float32 音频
+        """
         if not self.is_loaded():
             raise RuntimeError("CosyVoice 模型未加载")
 
+        cache_key = self._cache_key(text, voice, **kwargs)
+        if cache_key:
+            audio = self.cache.get(cache_key)
+            if audio is not None:
+                return audio
+
+        try:
+            with span("tts.synthesize", chars=len(text), stream=False):
+                chunks = [
+                    item["tts_speech"]
+                    for item in self._inference(text, voice, stream=False, **kwargs)
+                ]
+                audio = concat_audio(chunks)
+        except Exception as e:
+            raise RuntimeError(f"语音合成失败: {e}")
+
+        if cache_key:
+            self.cache.put(cache_key, audio)
+        return audio
+
+    def synthesize_stream(self, text: str, voice: str = None, **kwargs):
+        """
+        流式语音合成
+
+        基于 CosyVoice 的 stream=True 模式，模型每生成一个音频块就立即返回，
+        首包延迟约等于第一个块的生成时间，而不是整段文本的合成时间。
+
+        Args:
+            text: 要合成的文本
+            voice: 音色名称（默认使用配置中的默认值）
+            **kwargs: 额外参数
+                - instruction: 指令（如"用开心的语气说"）
+
+        Yields:
+            np.ndarray: 一维 float32 音频片段
+        """
+        if not self.is_loaded():
+            raise RuntimeError("CosyVoice 模型未加载")
+
+        # 流式模式下 CosyVoice 不支持变速
+        kwargs.pop("speed", None)
+
+        # 命中缓存时直接整段返回
+        cache_key = self._cache_key(text, voice, **kwargs)
+        if cache_key:
+            audio = self.cache.get(cache_key)
+            if audio is not None:
+                yield audio
+                return
+
+        chunks = []
+        try:
+            with span("tts.synthesize", chars=len(text), stream=True):
+                for item in self._inference(text, voice, stream=True, **kwargs):
+                    chunk = to_numpy(item["tts_speech"])
+                    chunks.append(chunk)
+                    mark("tts.first_audio_chunk")
+                    yield chunk
+        except Exception as e:
+            raise RuntimeError(f"语音合成失败: {e}")
+
+        # 完整合成后写入缓存（中途断开的请求不会走到这里）
+        if cache_key:
+            self.cache.put(cache_key, concat_audio(chunks))
+
+    def warmup(self, voices: List[str] = None, text: str = "你好。"):
+        """
+        预热：每个音色合成一句短文本（绕过缓存，确保真正执行推理）
+
+        首个音色额外运行一次流式合成，覆盖流式路径的分块推理
+
+        Args:
+            voices: 音色列表（默认全部音色）
+            text: 预热文本
+        """
+        if not self.is_loaded():
+            return
+        if voices is None:
+            voices = [v["name"] for v in self.get_voices()]
+        for voice in voices:
+            for _ in self._inference(text, voice, stream=False):
+                pass
+        if voices:
+            for _ in self._inference(text, voices[0], stream=True):
+                pass
+
+    def _instrument_model(self):
+        """
+        为 CosyVoiceModel 内部阶段添加追踪
+
+        - tts.llm_job: 语音 token 生成（后台线程）
+        - tts.token2wav: token 转波形，其中包含 tts.flow（flow matching）和 tts.hift（声码器）
+        - tts.first_speech_token: 首个语音 token 事件
+
+        没有活动追踪时包装函数只多一次 ContextVar 读取
+        """
+        model = getattr(self.model, "model", None)
+        if model is None:
+            return
+        try:
+            model.llm_job = traced("tts.llm_job")(model.llm_job)
+            model.token2wav = traced("tts.token2wav")(model.token2wav)
+            model.flow.inference = traced("tts.flow")(model.flow.inference)
+            model.hift.inference = traced("tts.hift")(model.hift.inference)
+            model.llm.inference = traced_first(model.llm.inference, "tts.first_speech_token")
+        except AttributeError as e:
+            print(f"⚠️ CosyVoice 追踪未启用: {e}")
+
+    def _cache_key(self, text: str, voice: str = None, **kwargs) -> str:
+        """生成缓存键（未启用缓存时返回空字符串）"""
+        if self.cache is None:
+            return ""
+        return AudioCache.make_key(
+            text,
+            voice=self._resolve_voice(voice),
+            instruction=kwargs.get("instruction", ""),
+            speed=kwargs.get("speed", 1.0),
+            model_id=self.model_id,
+            sample_rate=self.sample_rate,
+        )
+
+    def _resolve_voice(self, voice: str = None) -> str:
+        """获取有效音色（未知音色回退到默认音色）"""
         # 使用默认音色
         voice = voice or self.config.get("default_voice", "中文女")
 
@@ -142,35 +314,29 @@ class CosyVoiceTTS(BaseTTSPlugin):
         if voice not in available_voices:
             print(f"⚠️ 未知音色 '{voice}'，使用默认音色")
             voice = "中文女"
+        return voice
 
-        # 生成临时文件路径
-        output_path = os.path.join(
-            tempfile.gettempdir(), f"cosyvoice_{os.getpid()}_{hash(text) % 10000}.wav"
-        )
-
-        try:
-            import torchaudio
-
-            # 获取指令（如果有）
-            instruction = kwargs.get("instruction", "")
-
-            # 合成语音
-            if instruction:
-                # 使用指令模式
-                result = self.model.inference_instruct(text, voice, instruction)
-            else:
-                # 使用预设音色模式
-                result = self.model.inference_sft(text, voice, stream=False)
+    def _inference(self, text: str, voice: str = None, stream: bool = False, **kwargs):
+        """
+        调用 CosyVoice 推理
 
-            # 保存音频
-            for item in result:
-                torchaudio.save(output_path, item["tts_speech"], 22050)
-                break  # 只取第一个结果
+        Returns:
+            Generator: 逐段产出 {"tts_speech": Tensor}
+        """
+        voice = self._resolve_voice(voice)
 
-            return output_path
+        # 获取指令（如果有）
+        instruction = kwargs.get("instruction", "")
+        speed = kwargs.get("speed", 1.0)
 
-        except Exception as e:
-            raise RuntimeError(f"语音合成失败: {e}")
+        # 合成语音
+        if instruction:
+            # 使用指令模式
+            return self.model.inference_instruct(
+                text, voice, instruction, stream=stream, speed=speed
+            )
+        # 使用预设音色模式
+        return self.model.inference_sft(text, voice, stream=stream, speed=speed)
 
     def get_voices(self) -> List[Dict[str, str]]:
         """
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+core/admission ASGI 桥接冒烟测试：流式请求体、有界响应队列
+
+运行：python -m pytest -q tests
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import tracemalloc
+
+import numpy as np
+import pytest
+from flask import Flask, Response, request, stream_with_context
+
+from core.admission import AdmissionController
+from core.asr_stream import StreamingTranscriber
+
+pytest.importorskip("a2wsgi")
+
+
+def _scope(path, headers=()):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": list(headers),
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 7861),
+    }
+
+
+def _echo_app(events):
+    """逐块读取请求体，每读到一块输出一行"""
+    app = Flask(__name__)
+
+    @app.route("/upload", methods=["POST"])
+    def upload():
+        stream = request.stream
+
+        def generate():
+            while True:
+                data = stream.read(4)
+                if not data:
+                    break
+                events.append(("read", data))
+                yield data + b"\n"
+
+        return Response(stream_with_context(generate()))
+
+    return app
+
+
+def _run(app, path, body_chunks, headers=(), send_gate=None, wait=None, record_sent=True):
+    """
+    在事件循环中驱动 ASGI 应用，记录客户端发送与收到响应的先后顺序
+
+    wait(index) 返回发送第 index 块请求体之前需要收到的响应块数：
+    请求体被整体缓冲时应用拿不到数据，请求在超时后失败
+    """
+    events = []
+
+    async def main():
+        responses = asyncio.Condition()
+        count = {"sent": 0, "response": 0}
+        chunks = iter(body_chunks)
+        pending = [next(chunks)]
+
+        async def receive():
+            index = count["sent"]
+            if wait is not None:
+                async with responses:
+                    await responses.wait_for(lambda: count["response"] >= wait(index))
+            count["sent"] += 1
+            chunk = pending.pop()
+            pending.extend(itertools.islice(chunks, 1))
+            if record_sent:
+                events.append(("sent", chunk))
+            return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+        async def send(message):
+            if send_gate is not None:
+                await send_gate()
+            if message["type"] == "http.response.body" and message.get("body"):
+                events.append(("response", message["body"]))
+                async with responses:
+                    count["response"] += 1
+                    responses.notify_all()
+
+        await asyncio.wait_for(app(_scope(path, headers), receive, send), timeout=5)
+
+    asyncio.run(main())
+    return events
+
+
+def test_request_body_is_streamed_to_wsgi_app():
+    reads = []
+    controller = AdmissionController({"max_workers": 2})
+    app = controller.asgi_app(_echo_app(reads), exempt=())
+    chunks = [b"aaaa", b"bbbb", b"cccc", b"dddd"]
+    length = str(len(b"".join(chunks))).encode()
+
+    events = _run(app, "/upload", chunks, headers=[(b"content-length", length)], wait=lambda i: i)
+
+    # 每块请求体的响应都在下一块发送之前到达：边上传边处理
+    assert events == [
+        event for chunk in chunks for event in (("sent", chunk), ("response", chunk + b"\n"))
+    ]
+
+
+def test_chunked_request_without_content_length():
+    reads = []
+    controller = AdmissionController({"max_workers": 2})
+    app = controller.asgi_app(_echo_app(reads), exempt=())
+
+    events = _run(app, "/upload", [b"aaaa", b"bbbb"])
+
+    # 分块上传没有 Content-Length，请求体仍能读到
+    assert [data for kind, data in reads] == [b"aaaa", b"bbbb"]
+    assert [data for kind, data in events if kind == "response"] == [b"aaaa\n", b"bbbb\n"]
+
+
+def test_response_queue_is_bounded():
+    produced = []
+    released = threading.Event()
+    app = Flask(__name__)
+
+    @app.route("/audio", methods=["POST"])
+    def audio():
+        def generate():
+            for i in range(100):
+                produced.append(i)
+                yield b"x" * 1024
+
+        return Response(generate())
+
+    controller = AdmissionController({"max_workers": 2, "send_queue": 4})
+    asgi = controller.asgi_app(app, exempt=())
+    stalled = []
+
+    async def slow_client():
+        # 客户端暂停读取：生成端只能领先有界队列的长度
+        if not released.is_set():
+            await asyncio.sleep(0.3)
+            stalled.append(len(produced))
+            released.set()
+
+    _run(asgi, "/audio", [b""], send_gate=slow_client)
+
+    assert stalled and stalled[0] < 10
+    assert len(produced) == 100
+
+
+def test_multipart_upload_is_not_buffered_in_memory():
+    app = Flask(__name__)
+
+    @app.route("/asr", methods=["POST"])
+    def asr():
+        # werkzeug 将大文件写入临时文件，视图按块读取
+        stream = request.files["audio"].stream
+        size = 0
+        while True:
+            data = stream.read(1 << 16)
+            if not data:
+                break
+            size += len(data)
+        return {"size": size}
+
+    controller = AdmissionController({"max_workers": 2})
+    asgi = controller.asgi_app(app, exempt=())
+    boundary = b"voiceforge"
+    head = (
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="audio"; filename="long.wav"\r\n'
+        b"Content-Type: audio/wav\r\n\r\n"
+    )
+    tail = b"\r\n--" + boundary + b"--\r\n"
+    size = 32 << 20
+
+    def body():
+        yield head
+        for _ in range(size >> 16):
+            yield bytes(1 << 16)
+        yield tail
+
+    headers = [
+        (b"content-type", b"multipart/form-data; boundary=" + boundary),
+        (b"content-length", str(len(head) + size + len(tail)).encode()),
+    ]
+    tracemalloc.start()
+    try:
+        events = _run(asgi, "/asr", body(), headers=headers, record_sent=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert events == [("response", b'{"size":%d}\n' % size)]
+    # 32MB 的上传在桥接层和表单解析中都不整体驻留内存
+    assert peak < 8 << 20
+
+
+def test_streaming_asr_partial_arrives_before_upload_ends():
+    app = Flask(__name__)
+
+    @app.route("/asr", methods=["POST"])
+    def asr():
+        stream = request.stream
+
+        def chunks():
+            # 与 /asr?stream=1 相同：每次读取 100ms 的 16bit PCM
+            while True:
+                data = stream.read(3200)
+                if not data:
+                    break
+                yield data
+
+        transcriber = StreamingTranscriber(
+            lambda audio: {"success": True, "text": f"{len(audio)}", "language": "zh"},
+            16000,
+            {"chunk_size": 200},
+        )
+
+        def generate():
+            for result in transcriber.run(chunks()):
+                yield json.dumps(result) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    controller = AdmissionController({"max_workers": 2})
+    asgi = controller.asgi_app(app, exempt=())
+    t = np.arange(16000 * 3) / 16000
+    speech = 0.3 * np.sin(2 * np.pi * 200 * t) + 0.15 * np.sin(2 * np.pi * 400 * t)
+    pcm = (speech * 32767).astype("<i2").tobytes()
+    body = [pcm[i : i + 3200] for i in range(0, len(pcm), 3200)]
+
+    # 分块上传（无 Content-Length）；发送 1 秒音频后，收到第一条部分结果才继续发送
+    events = _run(asgi, "/asr", body, wait=lambda i: 1 if i >= 10 else 0)
+
+    kinds = [kind for kind, _ in events]
+    assert kinds.index("response") < len(kinds) - 1 - kinds[::-1].index("sent")
+    lines = [json.loads(data) for kind, data in events if kind == "response"]
+    assert not lines[0]["final"] and lines[-1]["final"]
+    assert all(line["success"] for line in lines)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+core/pipeline 冒烟测试：队列、背压与取消
+
+运行：python -m pytest -q tests
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.pipeline import AsyncPipeline, Pipeline, PipelineCancelled
+
+
+def _counting(items, pulled):
+    """记录被拉取的输入条数"""
+    for item in items:
+        pulled.append(item)
+        yield item
+
+
+# ==================== Pipeline.process_stream ====================
+
+
+def test_process_stream_keeps_input_order():
+    pipeline = Pipeline({"queue_size": 2})
+    # 并发阶段中先到的数据处理得更慢，输出仍按输入顺序
+    pipeline.add_stage("slow", lambda x: (time.sleep(0.02 * (5 - x % 5)), x)[1], concurrency=3)
+    pipeline.add_stage("double", lambda x: x * 2)
+
+    assert list(pipeline.process_stream(range(20))) == [x * 2 for x in range(20)]
+    stats = pipeline.get_stats()
+    assert stats["slow"]["count"] == 20 and stats["double"]["count"] == 20
+
+
+def test_process_stream_stages_overlap():
+    pipeline = Pipeline()
+    pipeline.add_stage("a", lambda x: (time.sleep(0.05), x)[1])
+    pipeline.add_stage("b", lambda x: (time.sleep(0.05), x)[1])
+
+    start = time.perf_counter()
+    assert list(pipeline.process_stream(range(10))) == list(range(10))
+    # 串行需要 1.0s，流水线约 0.55s
+    assert time.perf_counter() - start < 0.85
+
+
+def test_process_stream_backpressure():
+    pipeline = Pipeline({"queue_size": 1})
+    pipeline.add_stage("a", lambda x: x)
+    pulled = []
+
+    results = pipeline.process_stream(_counting(range(1000), pulled))
+    assert next(results) == 0
+    time.sleep(0.3)
+    # 消费方不再读取：输入只被拉取到各级队列加工作线程能容纳的数量
+    assert len(pulled) < 10
+    results.close()
+
+
+def test_process_stream_close_stops_workers():
+    pipeline = Pipeline({"queue_size": 1})
+    pipeline.add_stage("a", lambda x: x, concurrency=2)
+    before = threading.active_count()
+
+    results = pipeline.process_stream(iter(range(1000)))
+    next(results)
+    results.close()
+    time.sleep(0.3)
+    assert threading.active_count() <= before
+
+
+def test_process_stream_propagates_stage_error():
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("bad item")
+        return x
+
+    pipeline = Pipeline()
+    pipeline.add_stage("a", fail_on_three)
+    with pytest.raises(ValueError, match="bad item"):
+        list(pipeline.process_stream(range(10)))
+    assert pipeline.get_stats()["a"]["errors"] == 1
+
+
+def test_process_stream_cancel():
+    pipeline = Pipeline({"queue_size": 1})
+    pipeline.add_stage("a", lambda x: (time.sleep(0.01), x)[1])
+
+    def consume(out):
+        try:
+            for _ in pipeline.process_stream(iter(range(10 ** 6))):
+                pass
+        except PipelineCancelled as e:
+            out.append(e)
+
+    errors = []
+    consumer = threading.Thread(target=consume, args=(errors,))
+    consumer.start()
+    time.sleep(0.1)
+    pipeline.cancel()
+    consumer.join(timeout=3)
+    assert not consumer.is_alive()
+    assert len(errors) == 1
+
+
+# ==================== AsyncPipeline ====================
+
+
+async def _llm(text):
+    await asyncio.sleep(0.01)
+    return text.upper()
+
+
+def _tts(text):
+    time.sleep(0.01)
+    return f"<{text}>"
+
+
+def test_async_process_mixes_coroutine_and_thread_stages():
+    pipeline = AsyncPipeline({"max_workers": 2})
+    pipeline.add_stage("llm", _llm)
+    pipeline.add_stage("tts", _tts, executor="thread")
+    try:
+        assert asyncio.run(pipeline.process_async("hi")) == "<HI>"
+    finally:
+        pipeline.shutdown()
+
+
+def test_async_process_timeout():
+    async def slow(x):
+        await asyncio.sleep(1)
+
+    pipeline = AsyncPipeline({"timeout": 0.05})
+    pipeline.add_stage("slow", slow)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(pipeline.process_async(1))
+
+
+def test_async_stream_order_and_backpressure():
+    pipeline = AsyncPipeline({"max_workers": 3, "queue_size": 1})
+    pipeline.add_stage("llm", _llm)
+    pipeline.add_stage("tts", _tts, executor="thread", concurrency=2)
+    pulled = []
+
+    async def main():
+        results = pipeline.process_stream_async(_counting(["a", "b", "c"] * 100, pulled))
+        first = await results.__anext__()
+        await asyncio.sleep(0.3)
+        # 消费方暂停读取：输入只被拉取到各级队列与 worker 能容纳的数量
+        stalled = len(pulled)
+        rest = [item async for item in results]
+        return [first] + rest, stalled
+
+    try:
+        results, stalled = asyncio.run(main())
+    finally:
+        pipeline.shutdown()
+    assert results == ["<A>", "<B>", "<C>"] * 100
+    assert stalled < 15
+
+
+def test_async_stream_propagates_error_and_cancels_workers():
+    async def fail_on_three(x):
+        if x == 3:
+            raise ValueError("bad item")
+        return x
+
+    pipeline = AsyncPipeline({"max_workers": 2})
+    pipeline.add_stage("a", fail_on_three)
+
+    async def main():
+        with pytest.raises(ValueError, match="bad item"):
+            async for _ in pipeline.process_stream_async(range(100)):
+                pass
+        await asyncio.sleep(0)
+        # 出错后 feed / worker 任务全部被取消
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(main()) == []
+
+
+def test_async_stream_close_cancels_workers():
+    pipeline = AsyncPipeline({"queue_size": 1})
+    pipeline.add_stage("llm", _llm)
+
+    async def main():
+        results = pipeline.process_stream_async(str(i) for i in range(10 ** 6))
+        await results.__anext__()
+        await results.aclose()
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(main()) == []
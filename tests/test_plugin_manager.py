@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+core/plugin_manager 冒烟测试：并行加载时的内存实测与预算
+
+运行：python -m pytest -q tests
+"""
+
+import threading
+import time
+
+from core.plugin_manager import PluginManager
+
+MB = 1024 * 1024
+
+
+class FakeModel:
+    """加载时占用 size_mb 内存，记录加载区间"""
+
+    spans = []
+
+    def __init__(self, config):
+        self.config = config
+        self.data = None
+
+    def load(self, config=None):
+        start = time.monotonic()
+        self.data = b"\x01" * (self.config["size_mb"] * MB)
+        time.sleep(0.2)
+        FakeModel.spans.append((start, time.monotonic()))
+        return True
+
+    def is_loaded(self):
+        return self.data is not None
+
+    def cleanup(self):
+        self.data = None
+
+
+def _load_in_parallel(manager, configs):
+    FakeModel.spans = []
+    for plugin_type in configs:
+        manager.register(plugin_type, "fake", FakeModel)
+    proxies = [manager.load(t, "fake", config) for t, config in configs.items()]
+    threads = [threading.Thread(target=proxy.load) for proxy in proxies]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return proxies
+
+
+def _overlap(spans):
+    (a_start, a_end), (b_start, b_end) = sorted(spans)
+    return b_start < a_end
+
+
+def test_parallel_loads_are_measured_one_at_a_time():
+    # 预算只够两个插件同时驻留：实测互相计入时加载后会淘汰对方
+    manager = PluginManager({"memory_budget_mb": 300})
+    proxies = _load_in_parallel(manager, {"asr": {"size_mb": 100}, "tts": {"size_mb": 100}})
+
+    stats = manager.get_stats()["plugins"]
+    assert not _overlap(FakeModel.spans)
+    for key in ("asr:fake", "tts:fake"):
+        assert stats[key]["state"] == "loaded"
+        assert 80 < stats[key]["memory_mb"] < 150
+    assert all(proxy.is_resident() for proxy in proxies)
+
+
+def test_plugins_with_memory_mb_load_in_parallel():
+    manager = PluginManager({"memory_budget_mb": 300})
+    _load_in_parallel(
+        manager,
+        {"asr": {"size_mb": 10, "memory_mb": 10}, "tts": {"size_mb": 10, "memory_mb": 10}},
+    )
+
+    assert _overlap(FakeModel.spans)
+    assert manager.get_stats()["plugins"]["asr:fake"]["memory_mb"] == 10
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+core/router 冒烟测试：远程节点限流按背压处理，不摘除节点
+
+运行：python -m pytest -q tests
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from core.router import Backend, BackendBusy, RemoteBackend, Router
+
+
+class FakeBackend(Backend):
+    """按顺序返回预设结果，异常实例直接抛出"""
+
+    def __init__(self, name, results):
+        super().__init__(name, tasks=("tts",))
+        self.results = list(results)
+        self.calls = 0
+
+    def invoke(self, task_type, method, *args, **kwargs):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _router(*backends):
+    router = Router({"failure_threshold": 2, "voice_affinity": False})
+    for backend in backends:
+        router.add_backend(backend)
+    return router
+
+
+def test_throttled_backend_is_not_ejected():
+    busy = FakeBackend("busy", [BackendBusy("429", 30)] * 3)
+    idle = FakeBackend("idle", [b"wav"] * 3)
+    busy.latency = 0.001  # 负载相同时优先选中 busy
+    idle.latency = 1.0
+    router = _router(busy, idle)
+
+    assert [router.call("tts", "synthesize_bytes", "你好") for _ in range(3)] == [b"wav"] * 3
+
+    # 只在 Retry-After 内暂停分发：不计失败、不摘除
+    assert busy.calls == 1
+    status = router.get_stats()["busy"]
+    assert status["busy"] and not status["ejected"]
+    assert status["failures"] == 0 and status["errors"] == 0 and status["throttled"] == 1
+
+
+def test_all_backends_throttled_raises_busy():
+    router = _router(
+        FakeBackend("a", [BackendBusy("429", 3)]),
+        FakeBackend("b", [BackendBusy("503", 7)]),
+    )
+
+    with pytest.raises(BackendBusy) as info:
+        router.call("tts", "synthesize_bytes", "你好")
+    assert info.value.retry_after in (3, 7)
+
+    # 限流期内再次调用直接返回最早的重试间隔，不再打到节点上
+    with pytest.raises(BackendBusy) as info:
+        router.call("tts", "synthesize_bytes", "你好")
+    assert info.value.retry_after == 3
+    assert not any(b["ejected"] or b["failures"] for b in router.get_stats().values())
+
+
+def test_failures_still_eject():
+    broken = FakeBackend("broken", [RuntimeError("HTTP 500")] * 2)
+    router = _router(broken)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            router.call("tts", "synthesize_bytes", "你好")
+    assert router.get_stats()["broken"]["ejected"]
+
+
+@pytest.mark.parametrize(
+    "status, headers, busy, retry_after",
+    [
+        (429, {}, True, 1),
+        (429, {"Retry-After": "4"}, True, 4),
+        (503, {"Retry-After": "2.5"}, True, 3),
+        (503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, True, 1),
+        (503, {}, False, None),
+        (500, {"Retry-After": "4"}, False, None),
+    ],
+)
+def test_remote_status_classification(status, headers, busy, retry_after):
+    response = SimpleNamespace(status_code=status, headers=headers)
+    if busy:
+        with pytest.raises(BackendBusy) as info:
+            RemoteBackend._check(response)
+        assert info.value.retry_after == retry_after
+    else:
+        with pytest.raises(RuntimeError) as info:
+            RemoteBackend._check(response)
+        assert not isinstance(info.value, BackendBusy)
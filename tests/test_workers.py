@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+core/workers 冒烟测试：多副本工作池共用音频缓存
+
+运行：python -m pytest -q tests
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from core.workers import TTSWorkerPool
+
+
+class FakeTTS:
+    """副本插件：返回副本进程号，报告自己收到的缓存配置"""
+
+    sample_rate = 22050
+    model_id = "fake-model"
+
+    def __init__(self, config):
+        self.config = config
+
+    def load(self, config=None):
+        return True
+
+    def get_voices(self):
+        cache = (self.config.get("cache") or {}).get("enabled", False)
+        return [{"name": "a", "replica_cache": cache}]
+
+    def synthesize_array(self, text, voice=None, **kwargs):
+        return np.full(8, os.getpid(), dtype=np.float32)
+
+    def synthesize_stream(self, text, voice=None, **kwargs):
+        for _ in range(2):
+            yield np.full(4, os.getpid(), dtype=np.float32)
+
+    def cleanup(self):
+        pass
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_pool_shares_one_cache(tmp_path, mode):
+    pool = TTSWorkerPool(
+        f"{__name__}:FakeTTS",
+        {"default_voice": "a", "cache": {"enabled": True, "directory": str(tmp_path)}},
+        {"replicas": 2, "mode": mode, "cpu_affinity": False, "torch_threads": 1},
+    )
+    assert pool.load()
+    try:
+        # 副本不再各自缓存
+        assert pool.get_voices()[0]["replica_cache"] is False
+
+        first = pool.synthesize_array("你好")
+        for _ in range(3):
+            assert np.array_equal(pool.synthesize_array("你好"), first)
+        # 未指定音色与默认音色命中同一条目
+        assert np.array_equal(pool.synthesize_array("你好", "a"), first)
+
+        streamed = np.concatenate(list(pool.synthesize_stream("再见")))
+        assert np.array_equal(np.concatenate(list(pool.synthesize_stream("再见"))), streamed)
+
+        completed = sum(w["completed"] for w in pool.get_stats()["workers"])
+        stats = pool.cache.get_stats()
+    finally:
+        pool.cleanup()
+
+    assert completed == 2
+    assert stats["hits"] == 5 and stats["misses"] == 2
+    assert len(list(tmp_path.glob("*.npy"))) == 2
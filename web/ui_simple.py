@@ -14,7 +14,6 @@ VoiceForge Web UI - 简化版
 
 import os
 import sys
-import uuid
 from pathlib import Path
 from typing import List, Dict, Any
 
@@ -28,6 +27,10 @@ import gradio as gr
 # 导入插件
 from plugins.asr.sensevoice import SenseVoiceASR
 from plugins.tts.cosyvoice import CosyVoiceTTS
+from plugins.llm.ollama import OllamaError, OllamaLLM
+from core.cache import ImageCache
+from core.session_manager import SessionManager
+from core.startup import StartupManager
 
 # ==================== 配置管理 ====================
 
@@ -105,26 +108,35 @@ class ChatMemory:
 
     功能：
     - 保存对话历史
-    - 支持滑动窗口（限制轮数）
+    - 支持滑动窗口（限制轮数 + token 预算，按块淘汰保持前缀稳定）
     - 按会话ID隔离不同对话
     - 支持清空记忆
     """
 
-    def __init__(self, max_history: int = 10):
+    def __init__(self, session_config: dict = None, image_config: dict = None):
         """
         初始化记忆管理器
 
         Args:
-            max_history: 最大保存的对话轮数（用户+助手算一轮）
+            session_config: 会话配置（session），max_history 为最大保存的对话轮数
+                            （用户+助手算一轮），会话的 LRU/TTL 淘汰与持久化由
+                            SessionManager 负责
+            image_config: 图片编码配置（models.llm.ollama.images）
         """
-        self.max_history = max_history
-        self._sessions: Dict[str, List[Dict[str, Any]]] = {}
+        self.sessions = SessionManager(session_config)
+        self.images = ImageCache(image_config)
+
+    @property
+    def max_history(self) -> int:
+        return self.sessions.max_history
+
+    @max_history.setter
+    def max_history(self, value: int):
+        self.sessions.set_max_history(value)
 
     def create_session(self) -> str:
         """创建新会话，返回会话ID"""
-        session_id = str(uuid.uuid4())[:8]  # 使用短UUID
-        self._sessions[session_id] = []
-        return session_id
+        return self.sessions.create_session()
 
     def add(self, session_id: str, role: str, content: str, image: str = None):
         """
@@ -136,21 +148,12 @@ class ChatMemory:
             content: 消息内容
             image: 图片路径（可选）
         """
-        if session_id not in self._sessions:
-            self._sessions[session_id] = []
-
-        message = {"role": role, "content": content}
+        # 添加时即编码图片，之后每轮对话直接命中缓存
         if image:
-            message["image"] = image
-
-        self._sessions[session_id].append(message)
+            self.images.get(image)
 
-        # 滑动窗口：保留最近 N 轮对话（用户+助手=一轮）
-        # 每轮2条消息，保留 max_history * 2 条
-        max_messages = self.max_history * 2
-        if len(self._sessions[session_id]) > max_messages:
-            # 保留最新的消息
-            self._sessions[session_id] = self._sessions[session_id][-max_messages:]
+        # 滑动窗口：deque 只保留最近 max_history 轮（用户+助手=一轮）
+        self.sessions.add_message(session_id, role, content, image=image or None)
 
     def get(self, session_id: str, include_system: bool = True) -> List[Dict[str, Any]]:
         """
@@ -173,22 +176,15 @@ class ChatMemory:
             )
             messages.append({"role": "system", "content": system_prompt})
 
-        # 添加历史对话
-        if session_id in self._sessions:
-            for msg in self._sessions[session_id]:
-                api_msg = {"role": msg["role"], "content": msg["content"]}
-                # 如果有图片，添加图片信息（用于多模态模型）
-                if "image" in msg and msg["image"]:
-                    # 读取图片并转为base64
-                    try:
-                        import base64
-
-                        with open(msg["image"], "rb") as f:
-                            img_base64 = base64.b64encode(f.read()).decode("utf-8")
-                        api_msg["images"] = [img_base64]
-                    except:
-                        pass
-                messages.append(api_msg)
+        # 添加历史对话（token 预算窗口，前缀在多轮之间保持不变）
+        for msg in self.sessions.get_context(session_id):
+            api_msg = {"role": msg["role"], "content": msg["content"]}
+            # 如果有图片，添加图片信息（用于多模态模型，base64 已缓存）
+            if "image" in msg and msg["image"]:
+                img_base64 = self.images.get(msg["image"])
+                if img_base64:
+                    api_msg["images"] = [img_base64]
+            messages.append(api_msg)
 
         return messages
 
@@ -200,10 +196,7 @@ class ChatMemory:
             Gradio Chatbot 格式的消息列表
         """
         history = []
-        if session_id not in self._sessions:
-            return history
-
-        for msg in self._sessions[session_id]:
+        for msg in self.sessions.get_history(session_id):
             if msg["role"] == "user":
                 # 如果有图片，使用Gradio Chatbot支持的图片格式
                 if "image" in msg and msg["image"] and os.path.exists(msg["image"]):
@@ -234,20 +227,31 @@ class ChatMemory:
 
     def clear(self, session_id: str):
         """清空指定会话的记忆"""
-        if session_id in self._sessions:
-            self._sessions[session_id] = []
+        self.sessions.clear_session(session_id)
 
     def get_session_count(self) -> int:
         """获取会话数量"""
-        return len(self._sessions)
+        return self.sessions.get_session_count()
 
     def get_message_count(self, session_id: str) -> int:
         """获取指定会话的消息数量"""
-        return len(self._sessions.get(session_id, []))
+        return self.sessions.get_message_count(session_id)
+
+
+def web_session_config() -> dict:
+    """Web UI 的会话配置（持久化文件与 API 分开，避免两个进程写同一文件）"""
+    session_config = dict(config_manager.get("session", {}) or {})
+    path = session_config.get("path", "./data/sessions")
+    if not os.path.isabs(path):
+        path = os.path.join(project_root, path)
+    session_config["path"] = path + "_web"
+    return session_config
 
 
 # 全局记忆管理器
-chat_memory = ChatMemory(max_history=10)
+chat_memory = ChatMemory(
+    web_session_config(), config_manager.get("models.llm.ollama.images", {})
+)
 
 
 # ==================== 加载配置 ====================
@@ -263,14 +267,25 @@ print("=" * 60)
 print("🚀 VoiceForge Web UI (简化版)")
 print("=" * 60)
 
+# 启动编排：ASR / TTS / LLM 并行加载，加载完成后立即预热
+startup = StartupManager(config.get("advanced", {}).get("startup", {}))
+warmup_config = startup.warmup_config
+
 # 加载 ASR
 asr_model = None
 if models_config.get("asr", {}).get("enabled", True):
     print("\n🔄 加载 ASR 模型 | Loading ASR Model...")
     asr_config = models_config["asr"].copy()
     asr_config["model_path"] = paths_config.get("models", {}).get("asr")
+    asr_config["sample_rate"] = config.get("advanced", {}).get("audio", {}).get(
+        "input_sample_rate", 16000
+    )
     asr_model = SenseVoiceASR(asr_config)
-    asr_model.load(asr_config)
+    startup.add(
+        "asr",
+        lambda: asr_model.load(asr_config),
+        lambda: asr_model.warmup(warmup_config.get("asr_seconds", 1.0)),
+    )
 
 # 加载 TTS
 tts_model = None
@@ -279,8 +294,39 @@ if models_config.get("tts", {}).get("enabled", True):
     tts_config = models_config["tts"].copy()
     tts_config["model_path"] = paths_config.get("models", {}).get("tts")
     tts_config["cosyvoice_lib"] = paths_config.get("libs", {}).get("cosyvoice")
+    tts_config["cache"] = dict(config.get("advanced", {}).get("cache", {}))
+    cache_dir = tts_config["cache"].get("directory")
+    if cache_dir and not os.path.isabs(cache_dir):
+        tts_config["cache"]["directory"] = os.path.join(project_root, cache_dir)
     tts_model = CosyVoiceTTS(tts_config)
-    tts_model.load(tts_config)
+    startup.add(
+        "tts",
+        lambda: tts_model.load(tts_config),
+        lambda: tts_model.warmup(
+            warmup_config.get("voices") or None, warmup_config.get("text", "你好。")
+        ),
+    )
+
+# 加载 LLM（共享连接池 + 模型预加载）
+llm_model = None
+if models_config.get("llm", {}).get("enabled", True):
+    print("\n🔄 连接 LLM 服务 | Connecting LLM...")
+    ollama_config = models_config["llm"].get("ollama", {})
+    llm_model = OllamaLLM(ollama_config)
+    # 启用预热时由预热阶段预加载模型，避免重复请求
+    llm_warmup = startup.warmup_enabled and warmup_config.get("llm", True)
+    startup.add(
+        "llm",
+        lambda: llm_model.load(
+            {**ollama_config, "preload": False} if llm_warmup else ollama_config
+        ),
+        llm_model.warmup if llm_warmup else None,
+    )
+    # 对话压缩（session.summary）通过 LLM 插件在后台生成摘要
+    chat_memory.sessions.set_llm(llm_model)
+
+# Web UI 在模型就绪后才启动界面（音色列表依赖 TTS 加载结果）
+startup.run()
 
 # 获取音色列表
 voices = ["中文女", "中文男", "日语男", "粤语女", "英文女", "英文男", "韩语女"]
@@ -352,14 +398,11 @@ def chat_with_ai(session_id: str, message: str, image: str = None) -> str:
     if not message.strip() and image is None:
         return "请输入消息或上传图片 | Please enter message or upload image"
 
-    import requests
+    if not llm_model or not llm_model.is_loaded():
+        return "错误 | Error: LLM未加载 | LLM not loaded"
 
     # 获取实时配置（热更新）
     max_tokens = config_manager.get("models.llm.ollama.max_tokens", 80)
-    system_prompt = config_manager.get(
-        "models.llm.ollama.system_prompt",
-        "你必须在限定字数内完整表达。如果内容较长，请精简回答，确保结尾完整、意思清晰。不要说到一半就停止。优先给出核心结论，细节可省略。",
-    )
 
     try:
         # 添加用户消息到记忆
@@ -368,32 +411,20 @@ def chat_with_ai(session_id: str, message: str, image: str = None) -> str:
         # 获取包含历史的完整消息列表
         messages = chat_memory.get(session_id, include_system=True)
 
-        payload = {
-            "model": config_manager.get("models.llm.ollama.model", "gemma3:4b"),
-            "messages": messages,
-            "stream": False,
-            "options": {
-                "temperature": config_manager.get("models.llm.ollama.temperature", 0.7),
-                "num_predict": max_tokens,
-            },
-        }
-
-        response = requests.post(
-            f"{config_manager.get('models.llm.ollama.url', 'http://localhost:11434')}/api/chat",
-            json=payload,
-            timeout=60,
+        ai_response = llm_model.chat_messages(
+            messages,
+            model=config_manager.get("models.llm.ollama.model", "gemma3:4b"),
+            temperature=config_manager.get("models.llm.ollama.temperature", 0.7),
+            max_tokens=max_tokens,
         )
+        ai_response = ai_response or "无回复 | No response"
 
-        if response.status_code == 200:
-            data = response.json()
-            ai_response = data.get("message", {}).get("content", "无回复 | No response")
+        # 添加AI回复到记忆
+        chat_memory.add(session_id, "assistant", ai_response)
 
-            # 添加AI回复到记忆
-            chat_memory.add(session_id, "assistant", ai_response)
-
-            return ai_response
-        else:
-            return f"调用失败 | Request failed: HTTP {response.status_code}"
+        return ai_response
+    except OllamaError as e:
+        return f"调用失败 | Request failed: {str(e)}"
     except Exception as e:
         return f"错误 | Error: {str(e)}"
 
@@ -406,7 +437,7 @@ def update_settings(max_tokens_input, system_prompt_input, max_history_input):
         config_manager.set("models.llm.ollama.system_prompt", system_prompt_input)
 
         # 更新记忆管理器的最大历史轮数
-        global chat_memory
+        config_manager.set("session.max_history", int(max_history_input))
         chat_memory.max_history = int(max_history_input)
 
         # 保存到文件 | Save to file